@@ -0,0 +1,30 @@
+"""add_cv_content_hash
+
+Revision ID: 435a92d01c43
+Revises: 6ac1129cb881
+Create Date: 2026-10-18 11:02:17.284915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '435a92d01c43'
+down_revision: Union[str, Sequence[str], None] = '6ac1129cb881'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cvs', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_cvs_content_hash'), 'cvs', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cvs_content_hash'), table_name='cvs')
+    op.drop_column('cvs', 'content_hash')
@@ -0,0 +1,35 @@
+"""add_letter_history_indexes
+
+Revision ID: a4c8e1f6d2b9
+Revises: f1d7b2c84e39
+Create Date: 2026-10-18 17:41:12.524806
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c8e1f6d2b9'
+down_revision: Union[str, Sequence[str], None] = 'f1d7b2c84e39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('letters', sa.Column('user_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('letters_user_id_fkey', 'letters', 'users', ['user_id'], ['id'])
+    op.execute("UPDATE letters SET user_id = cvs.user_id FROM cvs WHERE cvs.id = letters.cv_id")
+    op.create_index('ix_letters_cv_id_created_at_id', 'letters', ['cv_id', 'created_at', 'id'], unique=False)
+    op.create_index('ix_letters_user_id_created_at_id', 'letters', ['user_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_letters_user_id_created_at_id', table_name='letters')
+    op.drop_index('ix_letters_cv_id_created_at_id', table_name='letters')
+    op.drop_constraint('letters_user_id_fkey', 'letters', type_='foreignkey')
+    op.drop_column('letters', 'user_id')
@@ -0,0 +1,48 @@
+"""add_job_requirements_cache
+
+Revision ID: b7e3f1a9c2d4
+Revises: 435a92d01c43
+Create Date: 2026-10-18 12:20:43.118094
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e3f1a9c2d4'
+down_revision: Union[str, Sequence[str], None] = '435a92d01c43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'job_requirements',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('url_key', sa.String(length=1000), nullable=False),
+        sa.Column('url', sa.String(length=2000), nullable=False),
+        sa.Column('requirements', sa.String(), nullable=False),
+        sa.Column('text_hash', sa.String(length=64), nullable=True),
+        sa.Column('embedding', sa.JSON(), nullable=True),
+        sa.Column('hits', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_job_requirements_url_key'), 'job_requirements', ['url_key'], unique=True)
+    op.create_index(op.f('ix_job_requirements_text_hash'), 'job_requirements', ['text_hash'], unique=False)
+    op.create_index(op.f('ix_job_requirements_expires_at'), 'job_requirements', ['expires_at'], unique=False)
+    op.create_index(op.f('ix_letters_job_url'), 'letters', ['job_url'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_letters_job_url'), table_name='letters')
+    op.drop_index(op.f('ix_job_requirements_expires_at'), table_name='job_requirements')
+    op.drop_index(op.f('ix_job_requirements_text_hash'), table_name='job_requirements')
+    op.drop_index(op.f('ix_job_requirements_url_key'), table_name='job_requirements')
+    op.drop_table('job_requirements')
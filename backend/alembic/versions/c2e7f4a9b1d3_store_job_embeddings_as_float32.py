@@ -0,0 +1,32 @@
+"""store_job_embeddings_as_float32
+
+Revision ID: c2e7f4a9b1d3
+Revises: a4c8e1f6d2b9
+Create Date: 2026-10-18 21:06:37.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e7f4a9b1d3'
+down_revision: Union[str, Sequence[str], None] = 'a4c8e1f6d2b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Cached embeddings and hashes were built from the whole page text; the cache refills itself
+    op.drop_column('job_requirements', 'embedding')
+    op.add_column('job_requirements', sa.Column('embedding', sa.LargeBinary(), nullable=True))
+    op.execute("UPDATE job_requirements SET text_hash = NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('job_requirements', 'embedding')
+    op.add_column('job_requirements', sa.Column('embedding', sa.JSON(), nullable=True))
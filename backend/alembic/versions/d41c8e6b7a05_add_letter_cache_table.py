@@ -0,0 +1,45 @@
+"""add_letter_cache_table
+
+Revision ID: d41c8e6b7a05
+Revises: b7e3f1a9c2d4
+Create Date: 2026-10-18 13:05:09.562731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c8e6b7a05'
+down_revision: Union[str, Sequence[str], None] = 'b7e3f1a9c2d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'letter_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('cv_id', sa.Integer(), nullable=False),
+        sa.Column('model_used', sa.String(length=100), nullable=False),
+        sa.Column('prompt_version', sa.String(length=20), nullable=False),
+        sa.Column('letter_content', sa.String(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['cv_id'], ['cvs.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_letter_cache_cache_key'), 'letter_cache', ['cache_key'], unique=True)
+    op.create_index(op.f('ix_letter_cache_cv_id'), 'letter_cache', ['cv_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_letter_cache_cv_id'), table_name='letter_cache')
+    op.drop_index(op.f('ix_letter_cache_cache_key'), table_name='letter_cache')
+    op.drop_table('letter_cache')
@@ -0,0 +1,30 @@
+"""add_cv_profile
+
+Revision ID: e92a5f3c1b68
+Revises: d41c8e6b7a05
+Create Date: 2026-10-18 14:11:52.640317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e92a5f3c1b68'
+down_revision: Union[str, Sequence[str], None] = 'd41c8e6b7a05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('cvs', sa.Column('profile', sa.JSON(), nullable=True))
+    op.add_column('cvs', sa.Column('profile_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('cvs', 'profile_hash')
+    op.drop_column('cvs', 'profile')
@@ -0,0 +1,47 @@
+"""add_letter_batches_table
+
+Revision ID: f1d7b2c84e39
+Revises: e92a5f3c1b68
+Create Date: 2026-10-18 15:02:36.907214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1d7b2c84e39'
+down_revision: Union[str, Sequence[str], None] = 'e92a5f3c1b68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'letter_batches',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cv_id', sa.Integer(), nullable=False),
+        sa.Column('source_id', sa.String(length=255), nullable=False),
+        sa.Column('openai_batch_id', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('error', sa.String(), nullable=True),
+        sa.Column('items', sa.JSON(), nullable=False),
+        sa.Column('results', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['cv_id'], ['cvs.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_letter_batches_cv_id'), 'letter_batches', ['cv_id'], unique=False)
+    op.create_index(op.f('ix_letter_batches_status'), 'letter_batches', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_letter_batches_status'), table_name='letter_batches')
+    op.drop_index(op.f('ix_letter_batches_cv_id'), table_name='letter_batches')
+    op.drop_table('letter_batches')
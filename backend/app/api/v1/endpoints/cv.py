@@ -22,14 +22,15 @@ async def update_cv(
     file_data = await validate_pdf_and_get_path(file)
     
     try:
-        await cv_service.update_cv(
+        chunk_stats = await cv_service.update_cv(
             cv_id=cv_id,
             source_id=source_id,
-            pdf_path=file_data["temp_file_path"],
+            pdf_path=file_data["file_path"],
             filename=file.filename,
             original_filename=file.filename,
-            file_size=len(file_data["file_content"]),
-            content_type=file.content_type or "application/pdf"
+            file_size=file_data["file_size"],
+            content_type=file.content_type or "application/pdf",
+            content_hash=file_data["content_hash"]
         )
 
         return CVUploadResponse(
@@ -38,15 +39,16 @@ async def update_cv(
             source_id=cv_id,
             data={
                 "filename": file.filename,
-                "file_size": len(file_data["file_content"]),
-                "source_id": cv_id
+                "file_size": file_data["file_size"],
+                "source_id": cv_id,
+                "chunks": chunk_stats
             }
         )
     finally:
         # Clean up temporary file
         import os
-        if os.path.exists(file_data["temp_file_path"]):
-            os.unlink(file_data["temp_file_path"])
+        if os.path.exists(file_data["file_path"]):
+            os.unlink(file_data["file_path"])
 
 
 @router.delete("/{cv_id}")
@@ -1,34 +1,71 @@
+import json
 import logging
+import os
 
-from typing import Annotated, Optional
-from fastapi import APIRouter, Request, UploadFile, File, Form, HTTPException, Depends
+from typing import Annotated, AsyncIterator, Optional
+from fastapi import APIRouter, Request, UploadFile, File, Form, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import HttpUrl
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.letter import (
     LetterResponse,
-    CVUploadResponse
+    CVUploadResponse,
+    GeneralResponse,
+    BulkLetterRequest
 )
+from app.models.letter_batch import LetterBatch
+from app.core.config import settings
+from app.core.container import ServiceContainer, get_service_container
 from app.services.letter import LetterService
 from app.database import get_db
 from app.helper.user import CurrentUser, get_current_user, get_user_repository
 from app.models.user import User
 from app.repository.user_repository import UserRepository
+from app.repository.cv_repository import CVRepository
+from app.repository.ingestion_job_repository import IngestionJobRepository
+from validator.pdf import validate_pdf_and_get_path
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def get_letter_service(db: AsyncSession = Depends(get_db)) -> LetterService:
-    """Dependency to get LetterService instance with database session"""
-    return LetterService(db)
+def get_letter_service(
+    db: AsyncSession = Depends(get_db),
+    container: ServiceContainer = Depends(get_service_container)
+) -> LetterService:
+    """Dependency to get LetterService instance with database session and shared clients"""
+    return LetterService(db, container)
 
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
+# Headers that keep proxies (nginx) from buffering the event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _event_stream(events: AsyncIterator[dict]) -> StreamingResponse:
+    async def _format():
+        # Headers are already sent, so failures must reach the client as an error event
+        try:
+            async for item in events:
+                yield _sse(item["event"], item["data"])
+        except Exception as e:
+            logger.error("Event stream failed", exc_info=True)
+            yield _sse("error", {"message": f"Ошибка при генерации сопроводительного письма: {str(e)}"})
+
+    return StreamingResponse(_format(), media_type="text/event-stream", headers=SSE_HEADERS)
+
 @router.post("/url", response_model=LetterResponse)
 async def create_letter_from_url(
+    request: Request,
     url: str = Form(..., description="URL to extract content from"),
     source_id: int = Form(..., description="Source ID of the CV in the database"),
+    regenerate: bool = Form(False, description="Bypass the letter cache"),
+    user_repo: UserRepository = Depends(get_user_repository),
     letter_service: LetterService = Depends(get_letter_service),
     db: AsyncSession = Depends(get_db)
 ):
@@ -37,13 +74,15 @@ async def create_letter_from_url(
 
     - **url**: URL to extract content from
     - **source_id**: Source ID of the CV in the database
+    - **regenerate**: Generate a new letter even if a cached one exists
     """
+    user = _request_user(request, user_repo)
     try:
         # Validate URL
         http_url = HttpUrl(url)
 
         # Generate cover letter from URL
-        letter_content = await letter_service.generate_by_url(str(http_url), source_id)
+        letter_content = await letter_service.generate_by_url(str(http_url), source_id, user.id, regenerate)
 
         if letter_content.startswith("Ошибка") or letter_content.startswith("Не удалось"):
             raise HTTPException(status_code=500, detail=letter_content)
@@ -51,7 +90,10 @@ async def create_letter_from_url(
         result = {
             "url": str(http_url),
             "source_id": source_id,
-            "letter_content": letter_content
+            "letter_content": letter_content,
+            "letter_id": letter_service.last_letter_id,
+            "usage": letter_service.last_usage,
+            "timings": letter_service.last_timings
         }
 
         return LetterResponse(
@@ -67,9 +109,12 @@ async def create_letter_from_url(
 
 @router.post("/text", response_model=LetterResponse)
 async def create_letter_from_text(
+    request: Request,
     name: str = Form(..., min_length=1, max_length=100, description="Job title"),
     description: str = Form(..., min_length=1, description="Job description"),
     source_id: int = Form(..., description="Source ID of the CV in the database"),
+    regenerate: bool = Form(False, description="Bypass the letter cache"),
+    user_repo: UserRepository = Depends(get_user_repository),
     letter_service: LetterService = Depends(get_letter_service),
     db: AsyncSession = Depends(get_db)
 ):
@@ -79,14 +124,16 @@ async def create_letter_from_text(
     - **name**: Job title
     - **description**: Job description
     - **source_id**: Source ID of the CV in the database
+    - **regenerate**: Generate a new letter even if a cached one exists
     """
+    user = _request_user(request, user_repo)
     try:
         
         job_requirements = (
             name + "\n" + description
         )
         # Generate cover letter using found requirements and CV data
-        letter_content = await letter_service.generate_cover_letter(job_requirements, source_id)
+        letter_content = await letter_service.generate_cover_letter(job_requirements, source_id, user.id, regenerate)
 
         if letter_content.startswith("Ошибка") or letter_content.startswith("Не найдены"):
             raise HTTPException(status_code=500, detail=letter_content)
@@ -94,6 +141,8 @@ async def create_letter_from_text(
         result = {
             "letter_content": letter_content,
             "source_id": source_id,
+            "letter_id": letter_service.last_letter_id,
+            "usage": letter_service.last_usage
         }
 
         return LetterResponse(
@@ -107,6 +156,187 @@ async def create_letter_from_text(
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/url/stream")
+async def stream_letter_from_url(
+    request: Request,
+    url: str = Form(..., description="URL to extract content from"),
+    source_id: int = Form(..., description="Source ID of the CV in the database"),
+    regenerate: bool = Form(False, description="Bypass the letter cache"),
+    user_repo: UserRepository = Depends(get_user_repository),
+    letter_service: LetterService = Depends(get_letter_service)
+):
+    """
+    Stream a cover letter generated from a URL source as server-sent events.
+
+    Events: `stage` (parsing, retrieval, generation), `delta` (letter text as it is
+    generated), then `done` with the full letter or `error`.
+
+    - **url**: URL to extract content from
+    - **source_id**: Source ID of the CV in the database
+    - **regenerate**: Generate a new letter even if a cached one exists
+    """
+    user = _request_user(request, user_repo)
+    try:
+        http_url = HttpUrl(url)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return _event_stream(letter_service.stream_by_url(str(http_url), source_id, user.id, regenerate))
+
+
+@router.post("/text/stream")
+async def stream_letter_from_text(
+    request: Request,
+    name: str = Form(..., min_length=1, max_length=100, description="Job title"),
+    description: str = Form(..., min_length=1, description="Job description"),
+    source_id: int = Form(..., description="Source ID of the CV in the database"),
+    regenerate: bool = Form(False, description="Bypass the letter cache"),
+    user_repo: UserRepository = Depends(get_user_repository),
+    letter_service: LetterService = Depends(get_letter_service)
+):
+    """
+    Stream a cover letter generated from job title and description as server-sent events.
+
+    Events: `stage` (retrieval, generation), `delta`, then `done` or `error`.
+
+    - **name**: Job title
+    - **description**: Job description
+    - **source_id**: Source ID of the CV in the database
+    - **regenerate**: Generate a new letter even if a cached one exists
+    """
+    user = _request_user(request, user_repo)
+    job_requirements = name + "\n" + description
+    return _event_stream(letter_service.stream_cover_letter(job_requirements, source_id, user.id, regenerate))
+
+
+@router.post("/bulk")
+async def create_letters_bulk(
+    request: BulkLetterRequest,
+    http_request: Request,
+    user_repo: UserRepository = Depends(get_user_repository),
+    letter_service: LetterService = Depends(get_letter_service)
+):
+    """
+    Generate cover letters for many vacancies with one CV.
+
+    - **mode=online**: items are parsed and generated concurrently (BULK_CONCURRENCY);
+      results stream as server-sent `item` events in completion order, then `done`
+    - **mode=batch**: prompts are submitted to the OpenAI Batch API (half price, up to
+      24h); poll `GET /letter/bulk/{batch_id}` for the results
+    """
+    if len(request.items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BULK_MAX_ITEMS} items per request")
+    user = _request_user(http_request, user_repo)
+    items = [item.model_dump(mode="json") for item in request.items]
+
+    if request.mode == "batch":
+        try:
+            batch = await letter_service.submit_bulk_batch(items, request.source_id, user.id)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            logging.error("Error submitting letter batch", exc_info=True)
+            raise HTTPException(status_code=500, detail=f"Error submitting letter batch: {str(e)}")
+        return GeneralResponse(success=True, data=_batch_data(batch))
+
+    return _event_stream(letter_service.generate_bulk(items, request.source_id, user.id, request.regenerate))
+
+
+@router.get("/bulk/{batch_id}", response_model=GeneralResponse)
+async def get_bulk_status(
+    batch_id: int,
+    request: Request,
+    user_repo: UserRepository = Depends(get_user_repository),
+    letter_service: LetterService = Depends(get_letter_service)
+):
+    """Poll one of the current user's Batch API letter jobs; results are filled in once OpenAI completes it."""
+    user = _request_user(request, user_repo)
+    batch = await letter_service.poll_bulk_batch(batch_id, user.id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Batch with id {batch_id} not found")
+    return GeneralResponse(success=True, data=_batch_data(batch))
+
+
+def _batch_data(batch: LetterBatch) -> dict:
+    return {
+        "batch_id": batch.id,
+        "source_id": batch.source_id,
+        "status": batch.status,
+        "error": batch.error,
+        "pending": len(batch.items) if batch.status != "completed" else 0,
+        "results": [
+            {"index": int(index), **result}
+            for index, result in sorted(batch.results.items(), key=lambda pair: int(pair[0]))
+        ]
+    }
+
+
+@router.get("/history", response_model=GeneralResponse)
+async def get_letter_history(
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(settings.LETTER_HISTORY_PAGE_SIZE, ge=1, le=settings.LETTER_HISTORY_MAX_PAGE_SIZE),
+    user_repo: UserRepository = Depends(get_user_repository),
+    letter_service: LetterService = Depends(get_letter_service)
+):
+    """
+    List the current user's generated letters, newest first.
+
+    Items carry metadata only; fetch the text with `GET /letter/history/{letter_id}`.
+    Pass `next_cursor` from the response as `cursor` to get the next page.
+    """
+    user = _request_user(request, user_repo)
+    return await _history_response(letter_service, user.id, None, cursor, limit)
+
+
+@router.get("/history/cv/{source_id}", response_model=GeneralResponse)
+async def get_cv_letter_history(
+    source_id: int,
+    request: Request,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(settings.LETTER_HISTORY_PAGE_SIZE, ge=1, le=settings.LETTER_HISTORY_MAX_PAGE_SIZE),
+    user_repo: UserRepository = Depends(get_user_repository),
+    letter_service: LetterService = Depends(get_letter_service)
+):
+    """List letters generated with one of the current user's CVs, newest first (cursor paginated)."""
+    user = _request_user(request, user_repo)
+    return await _history_response(letter_service, user.id, source_id, cursor, limit)
+
+
+@router.get("/history/{letter_id}", response_model=GeneralResponse)
+async def get_history_letter(
+    letter_id: int,
+    request: Request,
+    user_repo: UserRepository = Depends(get_user_repository),
+    letter_service: LetterService = Depends(get_letter_service)
+):
+    """Get a previously generated letter with its text and job requirements."""
+    user = _request_user(request, user_repo)
+    letter = await letter_service.get_letter(user.id, letter_id)
+    if letter is None:
+        raise HTTPException(status_code=404, detail=f"Letter with id {letter_id} not found")
+    return GeneralResponse(success=True, data=letter.model_dump())
+
+
+async def _history_response(letter_service: LetterService, user_id: int, source_id: Optional[int],
+                            cursor: Optional[str], limit: int) -> GeneralResponse:
+    try:
+        page = await letter_service.get_letter_history(user_id, source_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail=f"CV with source_id {source_id} not found")
+    return GeneralResponse(success=True, data=page)
+
+
+def _request_user(request: Request, user_repo: UserRepository) -> User:
+    user_email = getattr(request.state, "user_email", None)
+    user = _get_user_by_mail(user_email, user_repo) if user_email else None
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    return user
+
+
 @router.post("/upload-cv", response_model=CVUploadResponse)
 async def upload_cv(
     request: Request,
@@ -118,65 +348,91 @@ async def upload_cv(
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Upload a CV/resume PDF file to the vector database.
+    Upload a CV/resume PDF file and queue it for ingestion into the vector database.
+
+    Parsing, chunking and embedding run in the background worker (`python -m app.worker`);
+    the response carries the job id and returns as soon as the file is stored.
 
     - **file**: PDF file containing the CV/resume
     - **source_id**: Unique identifier for the CV source (used for later retrieval)
     """
     try:
-        # Validate file type
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail="Only PDF files are allowed")
-
-        # Validate file size (max 10MB)
-        file_content = await file.read()
-        if len(file_content) > 10 * 1024 * 1024:  # 10MB
-            raise HTTPException(status_code=400, detail="File size must be less than 10MB")
-
-        # Save file temporarily
-        import tempfile
-        import os
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(file_content)
-            temp_file_path = temp_file.name
+        # Stream the file to where the ingestion worker can read it
+        file_data = await validate_pdf_and_get_path(file, directory=settings.UPLOAD_DIR)
+        file_path = file_data["file_path"]
 
         try:
             user_email = request.state.user_email
             current_user = _get_user_by_mail(user_email,user_repo)
-            await letter_service.add_cv(
+            job = await letter_service.add_cv(
                 user_id=current_user.id,
-                pdf_path=temp_file_path,
+                pdf_path=file_path,
                 source_id=source_id,
                 filename=file.filename,
                 original_filename=file.filename,
-                file_size=len(file_content),
-                content_type=file.content_type or "application/pdf"
+                file_size=file_data["file_size"],
+                content_type=file.content_type or "application/pdf",
+                content_hash=file_data["content_hash"]
             )
+        except Exception:
+            if os.path.exists(file_path):
+                os.unlink(file_path)
+            raise
 
-            return CVUploadResponse(
-                success=True,
-                message=f"CV uploaded successfully with source_id: {source_id}",
-                source_id=source_id,
-                data={
-                    "filename": file.filename,
-                    "file_size": len(file_content),
-                    "source_id": source_id
-                }
-            )
-
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+        return CVUploadResponse(
+            success=True,
+            message=(
+                f"CV uploaded successfully with source_id: {source_id}" if job.status == "done"
+                else f"CV queued for processing with source_id: {source_id}"
+            ),
+            source_id=source_id,
+            data={
+                "filename": file.filename,
+                "file_size": file_data["file_size"],
+                "source_id": source_id,
+                "cv_id": job.cv_id,
+                "job_id": job.id,
+                "status": job.status
+            }
+        )
 
     except HTTPException:
         raise
+    except PermissionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logging.error("Error uploading CV", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error uploading CV: {str(e)}")
 
 
+@router.get("/upload-cv/{job_id}", response_model=GeneralResponse)
+async def get_upload_status(
+    job_id: int,
+    request: Request,
+    user_repo: UserRepository = Depends(get_user_repository),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get the state of one of the current user's CV ingestion jobs."""
+    user = _request_user(request, user_repo)
+    job = await IngestionJobRepository(db).get_job_by_id(job_id)
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail=f"Job with id {job_id} not found")
+    cv = await CVRepository(db).get_cv_by_id(job.cv_id)
+
+    return GeneralResponse(
+        success=True,
+        data={
+            "job_id": job.id,
+            "cv_id": job.cv_id,
+            "source_id": job.source_id,
+            "status": job.status,
+            "cv_status": cv.status if cv else None,
+            "attempts": job.attempts,
+            "error": job.error
+        }
+    )
+
+
 def _get_user_by_mail(email:str,user_repo: UserRepository):
     current_user = user_repo.get_user_by_email(email)
     return current_user
\ No newline at end of file
@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repository.cv_repository import CVRepository
 from app.services.cv import CVService
+from app.core.container import ServiceContainer, get_service_container
 from app.schemas.general import Option
 from app.schemas.letter import GeneralResponse
 
@@ -32,10 +33,11 @@ def get_cv_repository(session: AsyncSession = Depends(get_db)) -> CVRepository:
     return CVRepository(session)
 
 def get_cv_service(
-    cv_repo: CVRepository = Depends(get_cv_repository)
+    cv_repo: CVRepository = Depends(get_cv_repository),
+    container: ServiceContainer = Depends(get_service_container)
 ) -> CVService:
-    """Dependency to get CVService instance with database session"""
-    return CVService(repo=cv_repo)
+    """Dependency to get CVService instance with database session and shared clients"""
+    return CVService(repo=cv_repo, container=container)
 
 
 @router.get("/cvs")
@@ -35,10 +35,108 @@ class Settings:
 
     # OpenAI
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_TIMEOUT: float = float(os.getenv("OPENAI_TIMEOUT", "120"))
+    OPENAI_CONNECT_TIMEOUT: float = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+    OPENAI_MAX_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    OPENAI_KEEPALIVE_EXPIRY: float = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+
+    # Embeddings
+    EMBED_MODEL: str = os.getenv("EMBED_MODEL", "text-embedding-3-large")
+    EMBED_DIM: int = int(os.getenv("EMBED_DIM", "3072"))  # shortened embeddings need a new QDRANT_COLLECTION
+    EMBED_MAX_BATCH_TOKENS: int = int(os.getenv("EMBED_MAX_BATCH_TOKENS", "32000"))
+    EMBED_MAX_BATCH_SIZE: int = int(os.getenv("EMBED_MAX_BATCH_SIZE", "256"))
+    EMBED_CONCURRENCY: int = int(os.getenv("EMBED_CONCURRENCY", "4"))
+    EMBED_MAX_RETRIES: int = int(os.getenv("EMBED_MAX_RETRIES", "3"))
+    EMBED_CACHE_ENABLED: bool = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+    EMBED_CACHE_SIZE: int = int(os.getenv("EMBED_CACHE_SIZE", "5000"))  # in-memory entries, 12KB each at 3072 dims
+    EMBED_CACHE_PATH: Optional[str] = os.getenv("EMBED_CACHE_PATH") or None  # SQLite file for the persistent tier
+
+    # CV ingestion
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+    MAX_REQUEST_BODY_BYTES: int = int(os.getenv("MAX_REQUEST_BODY_BYTES", str(11 * 1024 * 1024)))  # 10MB PDF + form fields
+    INGEST_WORKER_CONCURRENCY: int = int(os.getenv("INGEST_WORKER_CONCURRENCY", "4"))
+    INGEST_POLL_INTERVAL: float = float(os.getenv("INGEST_POLL_INTERVAL", "1.0"))
+    INGEST_MAX_ATTEMPTS: int = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+    INGEST_LOCK_TIMEOUT: int = int(os.getenv("INGEST_LOCK_TIMEOUT", "600"))  # seconds before a running job is reclaimed
+
+    # PDF parsing
+    PDF_PARSE_MODE: str = os.getenv("PDF_PARSE_MODE", "process")  # process, inline
+    PDF_PARSE_WORKERS: int = int(os.getenv("PDF_PARSE_WORKERS", "0"))  # 0 = number of CPUs
+    PDF_PARSE_TIMEOUT: float = float(os.getenv("PDF_PARSE_TIMEOUT", "120"))
+
+    # Structured CV profile built at ingest time
+    CV_PROFILE_ENABLED: bool = os.getenv("CV_PROFILE_ENABLED", "true").lower() == "true"
+    CV_PROFILE_MODEL: str = os.getenv("CV_PROFILE_MODEL", "gpt-4.1-mini")
+    LETTER_CONTEXT_MODE: str = os.getenv("LETTER_CONTEXT_MODE", "profile")  # profile (falls back to retrieval), retrieval
+
+    # Job requirements cache (parsed vacancy pages)
+    JOB_CACHE_ENABLED: bool = os.getenv("JOB_CACHE_ENABLED", "true").lower() == "true"
+    JOB_CACHE_TTL: int = int(os.getenv("JOB_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+    JOB_CACHE_SIMILARITY: float = float(os.getenv("JOB_CACHE_SIMILARITY", "0.95"))  # cosine, near-duplicate postings
+    JOB_CACHE_EMBED_DIM: int = int(os.getenv("JOB_CACHE_EMBED_DIM", "256"))
+    JOB_CACHE_CANDIDATES: int = int(os.getenv("JOB_CACHE_CANDIDATES", "2000"))  # newest entries compared by embedding
+    JOB_PAGE_TIMEOUT: float = float(os.getenv("JOB_PAGE_TIMEOUT", "10"))
+    JOB_PAGE_MAX_BYTES: int = int(os.getenv("JOB_PAGE_MAX_BYTES", str(2 * 1024 * 1024)))
+    JOB_PAGE_MAX_CONNECTIONS: int = int(os.getenv("JOB_PAGE_MAX_CONNECTIONS", "20"))
+    JOB_PAGE_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("JOB_PAGE_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    # Fetch job pages from private networks and non-default ports (local development only)
+    JOB_PAGE_ALLOW_PRIVATE: bool = os.getenv("JOB_PAGE_ALLOW_PRIVATE", "false").lower() == "true"
+
+    # Local extraction of vacancy pages (web search is used only when it fails)
+    JOB_EXTRACT_ENABLED: bool = os.getenv("JOB_EXTRACT_ENABLED", "true").lower() == "true"
+    JOB_EXTRACT_MODEL: str = os.getenv("JOB_EXTRACT_MODEL", "gpt-4.1-nano")
+    JOB_EXTRACT_MIN_CHARS: int = int(os.getenv("JOB_EXTRACT_MIN_CHARS", "400"))  # less text = JS-only or blocked page
+    JOB_EXTRACT_MAX_CHARS: int = int(os.getenv("JOB_EXTRACT_MAX_CHARS", "12000"))
+
+    # Resume retrieval for letters (one query per requirement statement, merged with MMR)
+    RETRIEVAL_MAX_QUERIES: int = int(os.getenv("RETRIEVAL_MAX_QUERIES", "16"))
+    RETRIEVAL_PER_QUERY_K: int = int(os.getenv("RETRIEVAL_PER_QUERY_K", "5"))
+    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", "10"))
+    RETRIEVAL_MMR_DIVERSITY: float = float(os.getenv("RETRIEVAL_MMR_DIVERSITY", "0.3"))  # 0 = relevance only
+
+    # Letter prompt budget (counted locally with tiktoken)
+    PROMPT_MAX_INPUT_TOKENS: int = int(os.getenv("PROMPT_MAX_INPUT_TOKENS", "3500"))
+    PROMPT_MAX_REQUIREMENTS_TOKENS: int = int(os.getenv("PROMPT_MAX_REQUIREMENTS_TOKENS", "1200"))
+
+    # Generated letter cache (same CV version + requirements + model + prompt)
+    LETTER_CACHE_ENABLED: bool = os.getenv("LETTER_CACHE_ENABLED", "true").lower() == "true"
+    LETTER_CACHE_TTL: int = int(os.getenv("LETTER_CACHE_TTL", str(24 * 3600)))  # seconds
+
+    # Letter history listing (keyset pagination)
+    LETTER_HISTORY_PAGE_SIZE: int = int(os.getenv("LETTER_HISTORY_PAGE_SIZE", "20"))
+    LETTER_HISTORY_MAX_PAGE_SIZE: int = int(os.getenv("LETTER_HISTORY_MAX_PAGE_SIZE", "100"))
+
+    # Bulk letter generation
+    BULK_MAX_ITEMS: int = int(os.getenv("BULK_MAX_ITEMS", "50"))
+    BULK_CONCURRENCY: int = int(os.getenv("BULK_CONCURRENCY", "4"))
+    LETTER_BATCH_COMPLETION_WINDOW: str = os.getenv("LETTER_BATCH_COMPLETION_WINDOW", "24h")
+    LETTER_BATCH_CLAIM_TIMEOUT: int = int(os.getenv("LETTER_BATCH_CLAIM_TIMEOUT", "600"))  # seconds before a stuck save is retried
+
+    # Vector store
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "qdrant")  # qdrant, numpy
+    NUMPY_STORAGE_DIR: str = os.getenv("NUMPY_STORAGE_DIR", "vector_data")
+    NUMPY_INDEX: str = os.getenv("NUMPY_INDEX", "flat")  # flat (exact), ivf
+    NUMPY_IVF_LISTS: int = int(os.getenv("NUMPY_IVF_LISTS", "64"))
+    NUMPY_IVF_PROBES: int = int(os.getenv("NUMPY_IVF_PROBES", "8"))
 
     # Qdrant
     QDRANT_URL: str = os.getenv("QDRANT_URL", "http://localhost:6333")
     QDRANT_API_KEY: str = os.getenv("QDRANT_API_KEY", "")
+    QDRANT_COLLECTION: str = os.getenv("QDRANT_COLLECTION", "cvs")
+    QDRANT_PREFER_GRPC: bool = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+    QDRANT_GRPC_PORT: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    QDRANT_TIMEOUT: int = int(os.getenv("QDRANT_TIMEOUT", "30"))
+    QDRANT_UPSERT_BATCH_BYTES: int = int(os.getenv("QDRANT_UPSERT_BATCH_BYTES", str(4 * 1024 * 1024)))
+    QDRANT_UPSERT_CONCURRENCY: int = int(os.getenv("QDRANT_UPSERT_CONCURRENCY", "4"))
+    VECTOR_PROFILE: str = os.getenv("VECTOR_PROFILE", "full")  # full, scalar, binary
+    VECTOR_ON_DISK: Optional[bool] = (
+        os.getenv("VECTOR_ON_DISK").lower() == "true" if os.getenv("VECTOR_ON_DISK") else None
+    )  # None = profile default
+    VECTOR_RESCORE_OVERSAMPLING: float = float(os.getenv("VECTOR_RESCORE_OVERSAMPLING", "2.0"))
+    QDRANT_TENANCY: bool = os.getenv("QDRANT_TENANCY", "false").lower() == "true"  # per-user HNSW, old points are backfilled
+    QDRANT_TENANT_SHARD_GROUPS: int = int(os.getenv("QDRANT_TENANT_SHARD_GROUPS", "0"))  # custom shard keys (cluster mode)
 
     # Database settings
     DATABASE_ECHO: bool = os.getenv("DATABASE_ECHO", "false").lower() == "true"
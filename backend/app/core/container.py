@@ -0,0 +1,81 @@
+from typing import Optional
+
+import httpx
+from fastapi import Request
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from app.core.config import settings
+from app.services.embedding import EmbeddingService
+from app.services.pdf_parsing import PdfParser, shutdown_process_pool
+from app.services.profile import ProfileService
+from app.storage.repository.qdrant import close_qdrant_clients
+from app.storage.repository.vector_storage import VectorStorage, create_vector_storage
+
+
+class ServiceContainer():
+    """
+    Long-lived clients, readers and splitters shared by every request of a process.
+
+    Built once in the lifespan hook (and once by the ingestion worker); services take
+    their dependencies from here, only the DB session stays request-scoped.
+    """
+
+    def __init__(self):
+        # One keep-alive connection pool for every LLM and embedding call of the process
+        self.openai = AsyncOpenAI(
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            timeout=httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT),
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY
+                )
+            )
+        )
+        # EmbeddingService retries per batch itself, the shared HTTP pool is reused
+        self.embedder = EmbeddingService(client=self.openai.with_options(max_retries=0))
+        # Short embeddings of vacancy pages for near-duplicate detection
+        self.job_embedder = EmbeddingService(
+            client=self.openai.with_options(max_retries=0),
+            dimensions=settings.JOB_CACHE_EMBED_DIM
+        )
+        # Plain HTTP client for fetching vacancy pages; fetch_page_html follows redirects
+        # itself, re-checking every target address
+        self.http = httpx.AsyncClient(
+            timeout=settings.JOB_PAGE_TIMEOUT,
+            follow_redirects=False,
+            limits=httpx.Limits(
+                max_connections=settings.JOB_PAGE_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.JOB_PAGE_MAX_KEEPALIVE_CONNECTIONS
+            ),
+            headers={"User-Agent": "Mozilla/5.0 (compatible; CoverLetterRAG/1.0)"}
+        )
+        self.parser = PdfParser()
+        self.profiler = ProfileService(self.openai)
+        self.storage: VectorStorage = create_vector_storage()
+
+    async def startup(self):
+        await self.storage.setup()
+
+    async def shutdown(self):
+        shutdown_process_pool()
+        await close_qdrant_clients()
+        await self.openai.close()
+        await self.http.aclose()
+
+
+_container: Optional[ServiceContainer] = None
+
+
+def get_container() -> ServiceContainer:
+    """Process-wide container (created on first use outside the app, e.g. in scripts)"""
+    global _container
+    if _container is None:
+        _container = ServiceContainer()
+    return _container
+
+
+def get_service_container(request: Request) -> ServiceContainer:
+    """Dependency returning the container built in the lifespan hook"""
+    return request.app.state.container
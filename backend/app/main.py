@@ -4,7 +4,9 @@ from contextlib import asynccontextmanager
 from app.api.v1.api import api_router
 from app.core.config import settings
 from app.middleware.auth import AuthMiddleware
+from app.middleware.body_limit import BodySizeLimitMiddleware
 from app.database import init_db, check_db_connection
+from app.core.container import get_container
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -28,11 +30,17 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
+
+    # Long-lived clients shared by all requests
+    container = get_container()
+    await container.startup()
+    app.state.container = container
     
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
+    await container.shutdown()
 
 
 app = FastAPI(
@@ -43,6 +51,7 @@ app = FastAPI(
 )
 
 app.add_middleware(AuthMiddleware)
+app.add_middleware(BodySizeLimitMiddleware, max_body_size=settings.MAX_REQUEST_BODY_BYTES)
 
 # CORS middleware
 app.add_middleware(
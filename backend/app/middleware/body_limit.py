@@ -0,0 +1,49 @@
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class BodySizeLimitMiddleware:
+    """
+    Отклоняет запросы с телом больше max_body_size байт, пока тело еще принимается.
+
+    Starlette сохраняет multipart-тело целиком до вызова эндпоинта, поэтому проверка
+    размера файла в эндпоинте срабатывает слишком поздно. Здесь запрос с большим
+    Content-Length отклоняется сразу, а без него (chunked) - как только принятых
+    байт становится больше лимита.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    # FastAPI пробрасывает HTTPException из чтения тела как есть (-> 413)
+                    raise HTTPException(status_code=413, detail=self._detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    def _detail(self) -> str:
+        return f"Request body must be at most {self.max_body_size // (1024 * 1024)}MB"
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send):
+        response = JSONResponse(status_code=413, content={"detail": self._detail()}, headers={"Connection": "close"})
+        await response(scope, receive, send)
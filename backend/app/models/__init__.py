@@ -3,5 +3,9 @@ from .base import Base, BaseModel
 from .user import User
 from .cv import CV
 from .letter import Letter
+from .ingestion_job import IngestionJob
+from .job_requirements import JobRequirements
+from .letter_cache import LetterCache
+from .letter_batch import LetterBatch
 
-__all__ = ["Base", "BaseModel", "User", "CV", "Letter"]
+__all__ = ["Base", "BaseModel", "User", "CV", "Letter", "IngestionJob", "JobRequirements", "LetterCache", "LetterBatch"]
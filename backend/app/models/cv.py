@@ -1,6 +1,7 @@
 # models/cv.py
 from datetime import datetime
 from typing import Optional, List
+from sqlalchemy import Column, JSON
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -16,7 +17,12 @@ class CV(SQLModel, table=True):
     file_path: Optional[str] = Field(default=None, max_length=500)
     file_size: int = Field(nullable=False)
     content_type: str = Field(nullable=False, max_length=100)
-    status: str = Field(default="uploaded", max_length=50)  # uploaded, processed, error
+    content_hash: Optional[str] = Field(default=None, max_length=64, index=True)  # sha256 of the file
+    status: str = Field(default="uploaded", max_length=50)  # uploaded, processing, processed, error
+
+    # Structured profile (skills, roles, achievements, education) extracted at ingest time
+    profile: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    profile_hash: Optional[str] = Field(default=None, max_length=64)  # content version the profile was built from
 
     # Metadata
     upload_ip: Optional[str] = Field(default=None, max_length=45)
@@ -0,0 +1,28 @@
+# models/ingestion_job.py
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel
+
+
+class IngestionJob(SQLModel, table=True):
+    """Queued CV ingestion (parse -> chunk -> embed -> upsert)"""
+    __tablename__ = "ingestion_jobs"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    cv_id: int = Field(foreign_key="cvs.id", nullable=False, index=True)
+    user_id: int = Field(nullable=False)
+    source_id: str = Field(nullable=False, max_length=255)
+    file_path: str = Field(nullable=False, max_length=500)
+    original_filename: str = Field(nullable=False, max_length=255)
+
+    status: str = Field(default="queued", max_length=50, index=True)  # queued, running, done, error, superseded
+    attempts: int = Field(default=0)
+    error: Optional[str] = Field(default=None)
+    locked_at: Optional[datetime] = Field(default=None)
+
+    # Timestamps
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<IngestionJob(id={self.id}, cv_id={self.cv_id}, status={self.status}, attempts={self.attempts})>"
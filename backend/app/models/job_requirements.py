@@ -0,0 +1,28 @@
+# models/job_requirements.py
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, LargeBinary
+from sqlmodel import Field, SQLModel
+
+
+class JobRequirements(SQLModel, table=True):
+    """Requirements parsed from a vacancy page, cached by normalized URL"""
+    __tablename__ = "job_requirements"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    url_key: str = Field(unique=True, nullable=False, index=True, max_length=1000)  # normalized URL
+    url: str = Field(nullable=False, max_length=2000)
+    requirements: str = Field(nullable=False)
+
+    # Near-duplicate detection (same vacancy on another job board)
+    text_hash: Optional[str] = Field(default=None, max_length=64, index=True)  # sha256 of the posting text
+    embedding: Optional[bytes] = Field(default=None, sa_column=Column(LargeBinary))  # float32
+
+    hits: int = Field(default=0)
+
+    # Timestamps
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<JobRequirements(id={self.id}, url_key={self.url_key[:50]}, hits={self.hits})>"
@@ -1,22 +1,29 @@
 # models/letter.py
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, Relationship, SQLModel
 
 
 class Letter(SQLModel, table=True):
     """Generated cover letter model"""
     __tablename__ = "letters"
+    # History is listed newest first with a (created_at, id) keyset cursor, per CV and per user
+    __table_args__ = (
+        Index("ix_letters_cv_id_created_at_id", "cv_id", "created_at", "id"),
+        Index("ix_letters_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     cv_id: int = Field(foreign_key="cvs.id", nullable=False, index=True)
     source_id: int = Field(nullable=False, index=True)  # Redundant for faster queries
+    user_id: Optional[int] = Field(default=None, foreign_key="users.id")  # Redundant, owner's history without a join
 
     # Job information
     job_title: str = Field(nullable=False, max_length=200)
     job_description: Optional[str] = Field(default=None)
     company_name: Optional[str] = Field(default=None, max_length=200)
-    job_url: Optional[str] = Field(default=None, max_length=500)
+    job_url: Optional[str] = Field(default=None, max_length=500, index=True)  # normalized URL
 
     # Generated content
     letter_content: str = Field(nullable=False)
@@ -0,0 +1,30 @@
+# models/letter_batch.py
+from datetime import datetime
+from typing import Optional, List
+from sqlalchemy import Column, JSON
+from sqlmodel import Field, SQLModel
+
+
+class LetterBatch(SQLModel, table=True):
+    """Bulk letter generation submitted to the OpenAI Batch API"""
+    __tablename__ = "letter_batches"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    cv_id: int = Field(foreign_key="cvs.id", nullable=False, index=True)
+    source_id: str = Field(nullable=False, max_length=255)
+
+    openai_batch_id: Optional[str] = Field(default=None, max_length=100)
+    status: str = Field(default="submitted", max_length=50, index=True)  # submitted, in_progress, completing, completed, failed, expired, cancelled
+    error: Optional[str] = Field(default=None)
+
+    # [{index, custom_id, url, name, job_requirements, cache_key}] and {index: {status, letter_content | error}}
+    items: List[dict] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    results: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+
+    # Timestamps
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: Optional[datetime] = Field(default=None)
+
+    def __repr__(self):
+        return f"<LetterBatch(id={self.id}, cv_id={self.cv_id}, status={self.status}, items={len(self.items)})>"
@@ -0,0 +1,25 @@
+# models/letter_cache.py
+from datetime import datetime
+from typing import Optional
+from sqlmodel import Field, SQLModel
+
+
+class LetterCache(SQLModel, table=True):
+    """Generated letter reused for the same CV version, requirements, model and prompt"""
+    __tablename__ = "letter_cache"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # sha256 of (CV content version, normalized requirements hash, model, prompt version)
+    cache_key: str = Field(unique=True, nullable=False, index=True, max_length=64)
+    cv_id: int = Field(foreign_key="cvs.id", nullable=False, index=True)  # for invalidation
+    model_used: str = Field(nullable=False, max_length=100)
+    prompt_version: str = Field(nullable=False, max_length=20)
+    letter_content: str = Field(nullable=False)
+    hits: int = Field(default=0)
+
+    # Timestamps
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(nullable=False)
+
+    def __repr__(self):
+        return f"<LetterCache(id={self.id}, cv_id={self.cv_id}, model={self.model_used}, hits={self.hits})>"
@@ -2,5 +2,9 @@
 from .user_repository import UserRepository
 from .cv_repository import CVRepository
 from .letter_repository import LetterRepository
+from .ingestion_job_repository import IngestionJobRepository
+from .job_requirements_repository import JobRequirementsRepository
+from .letter_cache_repository import LetterCacheRepository
+from .letter_batch_repository import LetterBatchRepository
 
-__all__ = ["UserRepository", "CVRepository", "LetterRepository"]
+__all__ = ["UserRepository", "CVRepository", "LetterRepository", "IngestionJobRepository", "JobRequirementsRepository", "LetterCacheRepository", "LetterBatchRepository"]
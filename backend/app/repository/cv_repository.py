@@ -13,7 +13,8 @@ class CVRepository:
 
     async def create_cv(self, user_id: int, source_id: int, filename: str, original_filename: str,
                        file_size: int, content_type: str, file_path: Optional[str] = None,
-                       upload_ip: Optional[str] = None, user_agent: Optional[str] = None) -> CV:
+                       upload_ip: Optional[str] = None, user_agent: Optional[str] = None,
+                       content_hash: Optional[str] = None) -> CV:
         """Create a new CV record"""
         cv = CV(
             user_id=user_id,
@@ -23,6 +24,7 @@ class CVRepository:
             file_path=file_path,
             file_size=file_size,
             content_type=content_type,
+            content_hash=content_hash,
             upload_ip=upload_ip,
             user_agent=user_agent
         )
@@ -41,6 +43,19 @@ class CVRepository:
         result = self.session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_processed_cv_by_content_hash(self, user_id: int, content_hash: str,
+                                               exclude_cv_id: Optional[int] = None) -> Optional[CV]:
+        """Get an already processed CV of the user with byte-identical content"""
+        stmt = select(CV).where(
+            CV.user_id == user_id,
+            CV.content_hash == content_hash,
+            CV.status == "processed"
+        )
+        if exclude_cv_id is not None:
+            stmt = stmt.where(CV.id != exclude_cv_id)
+        result = self.session.execute(stmt.limit(1))
+        return result.scalar_one_or_none()
+
     async def get_cv_by_id(self, cv_id: int) -> Optional[CV]:
         """Get CV by ID"""
         stmt = select(CV).where(CV.id == cv_id)
@@ -62,12 +77,20 @@ class CVRepository:
         result = self.session.execute(stmt)
         return list(result.scalars().all())
 
+    async def set_cv_profile(self, cv: CV, profile: dict, profile_hash: str) -> CV:
+        """Attach a structured profile to the CV (committed by the caller)"""
+        cv.profile = profile
+        cv.profile_hash = profile_hash
+        self.session.add(cv)
+        return cv
+
     async def update_cv_status(self, cv_id: int, status: str) -> bool:
         """Update CV status"""
         cv = await self.get_cv_by_id(cv_id)
         if cv:
             cv.status = status
-            await self.session.commit()
+            self.session.add(cv)
+            self.session.commit()
             return True
         return False
     def delete_cv(self, cv: CV):
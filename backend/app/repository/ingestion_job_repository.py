@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_, and_, delete, exists
+from sqlalchemy.orm import aliased
+from typing import Optional
+
+from ..models.ingestion_job import IngestionJob
+
+
+class IngestionJobRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def enqueue(self, cv_id: int, user_id: int, source_id: str, file_path: str,
+                      original_filename: str, status: str = "queued") -> IngestionJob:
+        """Create an ingestion job (status="done" records work that needed no processing)"""
+        job = IngestionJob(
+            cv_id=cv_id,
+            user_id=user_id,
+            source_id=source_id,
+            file_path=file_path,
+            original_filename=original_filename,
+            status=status
+        )
+        self.session.add(job)
+        self.session.commit()
+        self.session.refresh(job)
+        return job
+
+    async def claim_next(self, lock_timeout: int, max_attempts: int) -> Optional[IngestionJob]:
+        """
+        Atomically take the oldest runnable job.
+
+        Uses SELECT ... FOR UPDATE SKIP LOCKED so concurrent workers never receive the
+        same row. Jobs stuck in `running` longer than `lock_timeout` seconds (crashed
+        worker) are picked up again whatever their attempt count, so a job lost on its
+        last attempt comes back with attempts > max_attempts for the caller to fail.
+        Jobs of a CV that another worker is still processing wait for it, so uploads of
+        one CV are applied in order.
+        """
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=lock_timeout)
+        other = aliased(IngestionJob)
+        cv_busy = exists().where(
+            other.cv_id == IngestionJob.cv_id,
+            other.id != IngestionJob.id,
+            other.status == "running",
+            other.locked_at >= stale,
+        )
+        stmt = (
+            select(IngestionJob)
+            .where(
+                or_(
+                    and_(
+                        IngestionJob.status == "queued",
+                        IngestionJob.attempts < max_attempts,
+                    ),
+                    and_(
+                        IngestionJob.status == "running",
+                        IngestionJob.locked_at < stale,
+                    ),
+                ),
+                ~cv_busy,
+            )
+            .order_by(IngestionJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = self.session.execute(stmt).scalar_one_or_none()
+        if job is None:
+            self.session.rollback()
+            return None
+
+        job.status = "running"
+        job.attempts += 1
+        job.locked_at = now
+        job.updated_at = now
+        self.session.add(job)
+        self.session.commit()
+        self.session.refresh(job)
+        return job
+
+    async def mark_done(self, job: IngestionJob) -> IngestionJob:
+        job.status = "done"
+        job.error = None
+        job.locked_at = None
+        job.updated_at = datetime.utcnow()
+        self.session.add(job)
+        self.session.commit()
+        return job
+
+    async def mark_failed(self, job: IngestionJob, error: str, max_attempts: int) -> IngestionJob:
+        """Requeue the job, or mark it as failed once attempts are exhausted"""
+        job.status = "queued" if job.attempts < max_attempts else "error"
+        job.error = error
+        job.locked_at = None
+        job.updated_at = datetime.utcnow()
+        self.session.add(job)
+        self.session.commit()
+        return job
+
+    async def mark_superseded(self, job: IngestionJob) -> IngestionJob:
+        """Drop the outcome of a job whose CV was uploaded again meanwhile"""
+        job.status = "superseded"
+        job.error = "Replaced by a newer upload"
+        job.locked_at = None
+        job.updated_at = datetime.utcnow()
+        self.session.add(job)
+        self.session.commit()
+        return job
+
+    async def supersede_queued(self, cv_id: int) -> list[IngestionJob]:
+        """Mark not yet started jobs of a CV as superseded and return them"""
+        stmt = select(IngestionJob).where(IngestionJob.cv_id == cv_id, IngestionJob.status == "queued")
+        jobs = list(self.session.execute(stmt).scalars().all())
+        now = datetime.utcnow()
+        for job in jobs:
+            job.status = "superseded"
+            job.error = "Replaced by a newer upload"
+            job.updated_at = now
+            self.session.add(job)
+        self.session.commit()
+        return jobs
+
+    async def has_running_job(self, cv_id: int) -> bool:
+        stmt = select(IngestionJob.id).where(IngestionJob.cv_id == cv_id, IngestionJob.status == "running").limit(1)
+        return self.session.execute(stmt).first() is not None
+
+    async def has_newer_job(self, job: IngestionJob) -> bool:
+        """Whether the CV of the job was uploaded again after it was queued"""
+        stmt = select(IngestionJob.id).where(
+            IngestionJob.cv_id == job.cv_id,
+            IngestionJob.id > job.id,
+            IngestionJob.status != "superseded"
+        ).limit(1)
+        return self.session.execute(stmt).first() is not None
+
+    async def get_job_by_id(self, job_id: int) -> Optional[IngestionJob]:
+        """Get job by ID"""
+        stmt = select(IngestionJob).where(IngestionJob.id == job_id)
+        result = self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    def delete_by_cv_id(self, cv_id: int) -> None:
+        """Drop all jobs of a CV (committed by the caller together with the CV deletion)"""
+        self.session.execute(delete(IngestionJob).where(IngestionJob.cv_id == cv_id))
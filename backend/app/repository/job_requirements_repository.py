@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import List, Optional, Tuple
+
+from ..models.job_requirements import JobRequirements
+
+
+class JobRequirementsRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_fresh_by_url_key(self, url_key: str) -> Optional[JobRequirements]:
+        """Get a non-expired entry by normalized URL"""
+        stmt = select(JobRequirements).where(
+            JobRequirements.url_key == url_key,
+            JobRequirements.expires_at > datetime.utcnow()
+        )
+        result = self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_fresh_by_text_hash(self, text_hash: str) -> Optional[JobRequirements]:
+        """Get a non-expired entry parsed from an identical page text"""
+        stmt = (
+            select(JobRequirements)
+            .where(JobRequirements.text_hash == text_hash, JobRequirements.expires_at > datetime.utcnow())
+            .order_by(JobRequirements.created_at.desc())
+            .limit(1)
+        )
+        result = self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_fresh_embeddings(self, limit: int) -> List[Tuple[int, bytes]]:
+        """(id, float32 embedding) of the newest non-expired entries that carry one"""
+        stmt = (
+            select(JobRequirements.id, JobRequirements.embedding)
+            .where(JobRequirements.embedding.is_not(None), JobRequirements.expires_at > datetime.utcnow())
+            .order_by(JobRequirements.created_at.desc())
+            .limit(limit)
+        )
+        result = self.session.execute(stmt)
+        return [(row.id, row.embedding) for row in result]
+
+    async def get_by_id(self, entry_id: int) -> Optional[JobRequirements]:
+        """Get entry by ID"""
+        stmt = select(JobRequirements).where(JobRequirements.id == entry_id)
+        result = self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def save(self, url_key: str, url: str, requirements: str, ttl: int,
+                   text_hash: Optional[str] = None, embedding: Optional[bytes] = None) -> JobRequirements:
+        """Insert or refresh the entry for a normalized URL"""
+        now = datetime.utcnow()
+        stmt = select(JobRequirements).where(JobRequirements.url_key == url_key)
+        entry = self.session.execute(stmt).scalar_one_or_none()
+        if entry is None:
+            entry = JobRequirements(url_key=url_key, url=url, requirements=requirements, expires_at=now)
+        entry.url = url
+        entry.requirements = requirements
+        entry.text_hash = text_hash
+        entry.embedding = embedding
+        entry.created_at = now
+        entry.expires_at = now + timedelta(seconds=ttl)
+        self.session.add(entry)
+        self.session.commit()
+        self.session.refresh(entry)
+        return entry
+
+    async def record_hit(self, entry: JobRequirements) -> JobRequirements:
+        entry.hits += 1
+        self.session.add(entry)
+        self.session.commit()
+        return entry
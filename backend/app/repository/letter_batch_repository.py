@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, update, or_
+from typing import Optional
+
+from ..models.letter_batch import LetterBatch
+
+
+class LetterBatchRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def create_batch(self, cv_id: int, source_id: str, items: list, results: dict,
+                           openai_batch_id: Optional[str] = None, status: str = "submitted") -> LetterBatch:
+        """Create a bulk letter batch record"""
+        batch = LetterBatch(
+            cv_id=cv_id,
+            source_id=source_id,
+            openai_batch_id=openai_batch_id,
+            status=status,
+            items=items,
+            results=results,
+            completed_at=datetime.utcnow() if status == "completed" else None
+        )
+        self.session.add(batch)
+        self.session.commit()
+        self.session.refresh(batch)
+        return batch
+
+    async def get_batch_by_id(self, batch_id: int) -> Optional[LetterBatch]:
+        """Get batch by ID"""
+        stmt = select(LetterBatch).where(LetterBatch.id == batch_id)
+        result = self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def claim_completion(self, batch_id: int, stale_after: int) -> bool:
+        """
+        Atomically mark a batch as `completing` so only one poll saves its results.
+
+        A claim older than `stale_after` seconds (the poll died while saving) can be taken over.
+        """
+        now = datetime.utcnow()
+        stmt = (
+            update(LetterBatch)
+            .where(
+                LetterBatch.id == batch_id,
+                LetterBatch.status.not_in(("completed", "failed", "expired", "cancelled")),
+                or_(
+                    LetterBatch.status != "completing",
+                    LetterBatch.updated_at < now - timedelta(seconds=stale_after),
+                ),
+            )
+            .values(status="completing", updated_at=now)
+        )
+        claimed = self.session.execute(stmt).rowcount == 1
+        self.session.commit()
+        return claimed
+
+    async def update_batch(self, batch: LetterBatch, data: dict) -> LetterBatch:
+        """Update status/results of a batch"""
+        batch.sqlmodel_update({**data, "updated_at": datetime.utcnow()})
+        self.session.add(batch)
+        self.session.commit()
+        self.session.refresh(batch)
+        return batch
+
+    def delete_by_cv_id(self, cv_id: int) -> None:
+        """Drop all batches of a CV (committed by the caller together with the CV deletion)"""
+        self.session.execute(delete(LetterBatch).where(LetterBatch.cv_id == cv_id))
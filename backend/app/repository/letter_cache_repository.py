@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete
+from typing import Optional
+
+from ..models.letter_cache import LetterCache
+
+
+class LetterCacheRepository:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_fresh(self, cache_key: str) -> Optional[LetterCache]:
+        """Get a non-expired cached letter"""
+        stmt = select(LetterCache).where(
+            LetterCache.cache_key == cache_key,
+            LetterCache.expires_at > datetime.utcnow()
+        )
+        result = self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def save(self, cache_key: str, cv_id: int, model_used: str, prompt_version: str,
+                   letter_content: str, ttl: int) -> LetterCache:
+        """Insert or replace the cached letter for a key"""
+        now = datetime.utcnow()
+        stmt = select(LetterCache).where(LetterCache.cache_key == cache_key)
+        entry = self.session.execute(stmt).scalar_one_or_none()
+        if entry is None:
+            entry = LetterCache(cache_key=cache_key, cv_id=cv_id, model_used=model_used,
+                                prompt_version=prompt_version, letter_content=letter_content, expires_at=now)
+        entry.letter_content = letter_content
+        entry.hits = 0
+        entry.created_at = now
+        entry.expires_at = now + timedelta(seconds=ttl)
+        self.session.add(entry)
+        self.session.commit()
+        self.session.refresh(entry)
+        return entry
+
+    async def record_hit(self, entry: LetterCache) -> LetterCache:
+        entry.hits += 1
+        self.session.add(entry)
+        self.session.commit()
+        return entry
+
+    def delete_by_cv_id(self, cv_id: int) -> None:
+        """Drop all cached letters of a CV (committed by the caller together with the CV change)"""
+        self.session.execute(delete(LetterCache).where(LetterCache.cv_id == cv_id))
@@ -1,8 +1,15 @@
+from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, tuple_
 from typing import List, Optional
 from ..models.letter import Letter
 
+# Columns of a history listing (no letter text or requirements)
+HISTORY_COLUMNS = (
+    Letter.id, Letter.cv_id, Letter.source_id, Letter.job_title, Letter.company_name, Letter.job_url,
+    Letter.model_used, Letter.generation_time, Letter.status, Letter.created_at,
+)
+
 
 class LetterRepository:
     def __init__(self, session: AsyncSession):
@@ -12,10 +19,12 @@ class LetterRepository:
                            letter_content: str, job_description: Optional[str] = None,
                            company_name: Optional[str] = None, job_url: Optional[str] = None,
                            job_requirements: Optional[str] = None, generation_time: Optional[int] = None,
-                           model_used: str = "gpt-4o", status: str = "generated") -> Letter:
+                           model_used: str = "gpt-4o", status: str = "generated",
+                           user_id: Optional[int] = None) -> Letter:
         """Create a new letter record"""
         letter = Letter(
             cv_id=cv_id,
+            user_id=user_id,
             source_id=source_id,
             job_title=job_title,
             job_description=job_description,
@@ -28,24 +37,53 @@ class LetterRepository:
             status=status
         )
         self.session.add(letter)
-        await self.session.commit()
-        await self.session.refresh(letter)
+        self.session.commit()
+        self.session.refresh(letter)
         return letter
 
     async def get_letters_by_source_id(self, source_id: int) -> List[Letter]:
         """Get all letters for a source_id"""
         stmt = select(Letter).where(Letter.source_id == source_id)
-        result = await self.session.execute(stmt)
+        result = self.session.execute(stmt)
         return list(result.scalars().all())
 
     async def get_letter_by_id(self, letter_id: int) -> Optional[Letter]:
         """Get letter by ID"""
         stmt = select(Letter).where(Letter.id == letter_id)
-        result = await self.session.execute(stmt)
+        result = self.session.execute(stmt)
         return result.scalar_one_or_none()
 
     async def get_letters_by_cv_id(self, cv_id: int) -> List[Letter]:
         """Get all letters for a CV"""
         stmt = select(Letter).where(Letter.cv_id == cv_id)
-        result = await self.session.execute(stmt)
+        result = self.session.execute(stmt)
         return list(result.scalars().all())
+
+    async def get_history_page(self, limit: int, cursor: Optional[tuple[datetime, int]] = None,
+                               cv_id: Optional[int] = None, user_id: Optional[int] = None) -> List[dict]:
+        """Letters of a CV or a user, newest first, strictly after the (created_at, id) keyset cursor"""
+        stmt = select(*HISTORY_COLUMNS)
+        if cv_id is not None:
+            stmt = stmt.where(Letter.cv_id == cv_id)
+        if user_id is not None:
+            stmt = stmt.where(Letter.user_id == user_id)
+        if cursor is not None:
+            stmt = stmt.where(tuple_(Letter.created_at, Letter.id) < tuple_(*cursor))
+        stmt = stmt.order_by(Letter.created_at.desc(), Letter.id.desc()).limit(limit)
+        result = self.session.execute(stmt)
+        return [dict(row) for row in result.mappings().all()]
+
+    async def get_recent_job_requirements_by_url(self, job_url: str, max_age: int) -> Optional[str]:
+        """Requirements parsed for the same vacancy URL by an earlier letter (not older than max_age seconds)"""
+        stmt = (
+            select(Letter.job_requirements)
+            .where(
+                Letter.job_url == job_url,
+                Letter.job_requirements.is_not(None),
+                Letter.created_at > datetime.utcnow() - timedelta(seconds=max_age)
+            )
+            .order_by(Letter.created_at.desc())
+            .limit(1)
+        )
+        result = self.session.execute(stmt)
+        return result.scalar_one_or_none()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional
+from pydantic import BaseModel, HttpUrl, Field, model_validator
+from typing import Literal, Optional
 from fastapi import UploadFile
 
 
@@ -26,6 +26,27 @@ class LetterFromTextRequest(BaseModel):
         arbitrary_types_allowed = True
 
 
+class BulkLetterItem(BaseModel):
+    """One vacancy of a bulk request: a URL or a job title with description"""
+    url: Optional[HttpUrl] = Field(None, description="Vacancy URL")
+    name: Optional[str] = Field(None, max_length=100, description="Job title")
+    description: Optional[str] = Field(None, description="Job description")
+
+    @model_validator(mode="after")
+    def check_source(self):
+        if self.url is None and not self.description:
+            raise ValueError("Each item needs either url or description")
+        return self
+
+
+class BulkLetterRequest(BaseModel):
+    """Request schema for bulk letter generation"""
+    source_id: int = Field(..., description="Source ID of the CV in the database")
+    items: list[BulkLetterItem] = Field(..., min_length=1, description="Vacancies to write letters for")
+    mode: Literal["online", "batch"] = Field("online", description="online: stream results; batch: OpenAI Batch API")
+    regenerate: bool = Field(False, description="Bypass the letter cache (online mode)")
+
+
 class CVUploadResponse(BaseModel):
     """Response schema for CV upload operations"""
     success: bool
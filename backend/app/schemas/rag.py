@@ -10,6 +10,7 @@ class RAGUpsertResult(BaseModel):
 class RAGSearchResult(BaseModel):
     contexts:list[str]
     sources:list[dict]
+    scores:list[float]=[]
 
 class RAGQueryResult(BaseModel):
     answer:str
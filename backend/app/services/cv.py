@@ -3,19 +3,24 @@ from datetime import datetime
 
 from requests import session
 from app.repository.cv_repository import CVRepository
-from app.storage.repository.qdrant import QdrantStorage
-from qdrant_client.models import PointStruct
+from app.repository.letter_cache_repository import LetterCacheRepository
+from app.repository.letter_batch_repository import LetterBatchRepository
+from app.repository.ingestion_job_repository import IngestionJobRepository
+from app.core.container import ServiceContainer, get_container
 
 from app.services.pdf import PdfService
 
 logger = logging.getLogger(__name__)
 
 class CVService():
-    def __init__(self,repo:CVRepository):
+    def __init__(self,repo:CVRepository, container: ServiceContainer = None):
+        container = container or get_container()
         self.repo = repo
-        self.storage = QdrantStorage()
-        repo.session
-        self.pdf_service = PdfService(repo.session)
+        self.letter_cache_repository = LetterCacheRepository(repo.session)
+        self.letter_batch_repository = LetterBatchRepository(repo.session)
+        self.job_repository = IngestionJobRepository(repo.session)
+        self.storage = container.storage
+        self.pdf_service = PdfService(repo.session, container)
     
 
     async def get_cvs_by_user(self,user_id:int):
@@ -29,9 +34,12 @@ class CVService():
     
     async def update_cv(self,cv_id:int, pdf_path: str, source_id: str, filename: str = None,
                     original_filename: str = None, file_size: int = 0, content_type: str = "application/pdf",
-                    upload_ip: str = None, user_agent: str = None) -> None:
+                    upload_ip: str = None, user_agent: str = None, content_hash: str = None) -> dict:
         """
-        Обновляет метаданные CV в базе данных
+        Обновляет метаданные CV в базе данных и инкрементально обновляет векторы.
+
+        Новый файл разбивается на чанки, их хэши сравниваются с payload существующих точек:
+        embedding выполняется только для новых/изменённых чанков, удаляются только исчезнувшие.
 
         Args:
             cv_id: ID CV для обновления
@@ -43,14 +51,17 @@ class CVService():
             content_type: MIME тип файла
             upload_ip: IP адрес загрузки
             user_agent: User agent браузера
+            content_hash: sha256 нового файла
+
+        Returns:
+            dict: Статистика чанков (chunks, reused, embedded, deleted)
         """
         cv = await self.repo.get_cv_by_id(cv_id)
         if not cv:
             raise ValueError(f"CV with id {cv_id} not found")
         current_source_id = cv.source_id
-        backup_points = self._get_points_by_source_id(current_source_id)
+        backup_points = await self._get_points_by_source_id(current_source_id, cv.user_id)
         try:
-            self._delete_points_by_source_id(current_source_id)
             data = {
                 "source_id": source_id,
                 "filename": filename or cv.filename,
@@ -60,18 +71,32 @@ class CVService():
                 "content_type": content_type or cv.content_type,
                 "upload_ip": upload_ip or cv.upload_ip,
                 "user_agent": user_agent or cv.user_agent,
-                "updated_at": datetime.now(),
+                "content_hash": content_hash,
+                "updated_at": datetime.utcnow(),
             }
             await self.repo.update_cv(cv, data)
-            self._upsert_points(pdf_path, original_filename or filename, source_id, cv.user_id)
+            stats = await self._upsert_points(pdf_path, original_filename or filename, source_id, cv.user_id,
+                                              existing_points=backup_points, content_hash=content_hash)
+            if current_source_id != source_id:
+                await self._delete_points_by_source_id(current_source_id, cv.user_id)
+                stats["deleted"] += len(backup_points)
+            # Письма из кэша сгенерированы по старой версии CV
+            self.letter_cache_repository.delete_by_cv_id(cv.id)
             self.repo.session.commit()
+            return stats
         except Exception as e:
             logger.error("Error updating CV", exc_info=True)
             # Откатываем БД
-            await self.repo.session.rollback()
+            self.repo.session.rollback()
             # Восстанавливаем данные в Qdrant
-            self._restore_points(backup_points)
-    
+            backup_ids = {str(point.id) for point in backup_points}
+            await self.storage.delete_points(
+                await self.storage.get_point_ids_by_source_id(source_id, user_id=cv.user_id) - backup_ids,
+                user_id=cv.user_id
+            )
+            await self._restore_points(backup_points)
+            raise Exception(f"Failed to update CV: {str(e)}")
+
     async def get_by_user(self,user_id:int):
         """
         Get all CVs for a user.
@@ -93,15 +118,19 @@ class CVService():
             raise ValueError(f"CV with id {cv_id} not found")
         
         source_id = cv.source_id
+        user_id = cv.user_id
         
         # Сохраняем данные из Qdrant для возможного отката
-        backup_points = self._get_points_by_source_id(source_id)
+        backup_points = await self._get_points_by_source_id(source_id, user_id)
         
         try:
             # 1. Удаляем из Qdrant
-            self._delete_points_by_source_id(source_id)
+            await self._delete_points_by_source_id(source_id, user_id)
             
-            # 2. Удаляем из БД
+            # 2. Удаляем из БД (вместе с кэшем писем, batch-задачами и задачами загрузки этого CV)
+            self.letter_cache_repository.delete_by_cv_id(cv.id)
+            self.letter_batch_repository.delete_by_cv_id(cv.id)
+            self.job_repository.delete_by_cv_id(cv.id)
             self.repo.delete_cv(cv)
             
             # 3. Коммитим транзакцию БД
@@ -113,33 +142,29 @@ class CVService():
             self.repo.session.rollback()
             
             # Восстанавливаем данные в Qdrant
-            self._restore_points(backup_points)
+            await self._restore_points(backup_points)
             
             raise Exception(f"Failed to delete CV: {str(e)}")
         
 
-    def _delete_points_by_source_id(self, source_id: int):
+    async def _delete_points_by_source_id(self, source_id: int, user_id: int):
         """Delete all points with given source_id"""
-        self.storage.delete_by_source_id(source_id)
+        await self.storage.delete_by_source_id(source_id, user_id=user_id)
 
-    def _upsert_points(self, pdf_path:str,original_filename: str,source_id:str,user_id:int):
-        self.pdf_service.upsert_vectors(pdf_path=pdf_path,original_filename=original_filename,source_id=source_id,user_id=user_id)
+    async def _upsert_points(self, pdf_path:str,original_filename: str,source_id:str,user_id:int,
+                             existing_points: list = None, content_hash: str = None) -> dict:
+        return await self.pdf_service.upsert_vectors(pdf_path=pdf_path,original_filename=original_filename,source_id=source_id,
+                                                     user_id=user_id,existing_points=existing_points,
+                                                     content_hash=content_hash)
 
-    def _get_points_by_source_id(self, source_id: int):
+    async def _get_points_by_source_id(self, source_id: int, user_id: int):
         """Get all points for potential rollback"""
-        return self.storage.get_points_by_source_id(source_id)
-    def _restore_points(self, points):
+        return await self.storage.get_points_by_source_id(source_id, user_id=user_id)
+    async def _restore_points(self, points):
         """Restore points in Qdrant from backup"""
         if points:
-            restored_points = [
-                PointStruct(
-                    id=point.id,
-                    vector=point.vector,
-                    payload=point.payload
-                )
-                for point in points
-            ]
-            self.storage.client.upsert(
-                collection_name=self.storage.collection,
-                points=restored_points
+            await self.storage.upsert(
+                ids=[point.id for point in points],
+                vectors=[point.vector for point in points],
+                payloads=[point.payload for point in points]
             )
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+import tiktoken
+from openai import AsyncOpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from app.core.config import settings
+from app.storage.cache.embedding_cache import EmbeddingCache, get_embedding_cache
+
+logger = logging.getLogger(__name__)
+
+EMBED_MODEL = settings.EMBED_MODEL
+EMBED_DIM = settings.EMBED_DIM
+
+RETRYABLE_ERRORS = (APIConnectionError, APITimeoutError, InternalServerError, RateLimitError)
+
+
+@dataclass
+class EmbeddingBatchStats:
+    """Timing of a single embeddings request"""
+    batch: int
+    size: int
+    tokens: int
+    latency: float
+    attempts: int
+
+
+class EmbeddingService():
+    """
+    Embeds texts in token-bounded batches, running several batches concurrently.
+
+    Results are returned in the order of the input texts, exactly as a single
+    `embeddings.create` call would return them. Texts already present in the
+    embedding cache are not sent to OpenAI at all. The service is shared by all
+    requests, so per-batch stats are returned by `embed_with_stats` rather than kept.
+    """
+
+    def __init__(self, client: AsyncOpenAI = None, model: str = EMBED_MODEL, dimensions: int = EMBED_DIM,
+                 max_batch_tokens: int = settings.EMBED_MAX_BATCH_TOKENS,
+                 max_batch_size: int = settings.EMBED_MAX_BATCH_SIZE,
+                 max_concurrency: int = settings.EMBED_CONCURRENCY,
+                 max_retries: int = settings.EMBED_MAX_RETRIES,
+                 cache: EmbeddingCache = None):
+        # Retries are handled per batch below, so the client must not retry on its own
+        self.client = client or AsyncOpenAI(max_retries=0)
+        self.model = model
+        self.dimensions = dimensions
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.cache = cache or (get_embedding_cache() if settings.EMBED_CACHE_ENABLED else None)
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts, preserving input order"""
+        vectors, _ = await self.embed_with_stats(texts)
+        return vectors
+
+    async def embed_with_stats(self, texts: list[str]) -> tuple[list[list[float]], list[EmbeddingBatchStats]]:
+        """Embed texts, preserving input order, with stats of the requests sent (cache hits send none)"""
+        if not texts:
+            return [], []
+
+        if self.cache is None:
+            return await self._embed_uncached(texts)
+
+        keys = [EmbeddingCache.make_key(self.model, self.dimensions, text) for text in texts]
+        cached = await self._in_thread_if_persistent(self.cache.get_many, keys)
+
+        # Identical texts within one call are embedded once
+        pending: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in pending:
+                pending[key] = text
+
+        stats = []
+        if pending:
+            fresh, stats = await self._embed_uncached(list(pending.values()))
+            computed = dict(zip(pending.keys(), fresh))
+            await self._in_thread_if_persistent(self.cache.put_many, computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys], stats
+
+    async def _in_thread_if_persistent(self, method, *args):
+        """The SQLite tier does blocking I/O, keep it off the event loop"""
+        if self.cache.persistent:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _embed_uncached(self, texts: list[str]) -> tuple[list[list[float]], list[EmbeddingBatchStats]]:
+        batches = self._pack_batches(texts)
+        vectors: list[list[float]] = [None] * len(texts)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _limited(n, batch):
+            async with semaphore:
+                return await self._embed_batch(n, texts, batch, vectors)
+
+        stats = list(await asyncio.gather(*(_limited(n, batch) for n, batch in enumerate(batches))))
+
+        logger.info(
+            "Embedded %d texts in %d batches (%d tokens, slowest batch %.3fs)",
+            len(texts), len(stats), sum(s.tokens for s in stats), max(s.latency for s in stats)
+        )
+        return vectors, stats
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def _pack_batches(self, texts: list[str]) -> list[list[tuple[int, int]]]:
+        """Greedily group (index, tokens) pairs so each batch fits the token and size limits"""
+        batches = []
+        current = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append((i, tokens))
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _embed_batch(self, n: int, texts: list[str], batch: list[tuple[int, int]],
+                     vectors: list[list[float]]) -> EmbeddingBatchStats:
+        inputs = [texts[i] for i, _ in batch]
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = await self.client.embeddings.create(
+                    model=self.model,
+                    dimensions=self.dimensions,
+                    input=inputs
+                )
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt > self.max_retries:
+                    raise
+                delay = min(2 ** (attempt - 1), 30)
+                logger.warning("Embedding batch %d failed (%s), retrying in %ss", n, e, delay)
+                await asyncio.sleep(delay)
+
+        for item in sorted(response.data, key=lambda d: d.index):
+            vectors[batch[item.index][0]] = item.embedding
+
+        stats = EmbeddingBatchStats(
+            batch=n,
+            size=len(batch),
+            tokens=sum(tokens for _, tokens in batch),
+            latency=time.perf_counter() - started,
+            attempts=attempt
+        )
+        logger.debug("Embedding batch %d: %d texts, %d tokens, %.3fs", n, stats.size, stats.tokens, stats.latency)
+        return stats
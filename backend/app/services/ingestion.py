@@ -0,0 +1,186 @@
+import logging
+import os
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.container import ServiceContainer
+from app.models.cv import CV
+from app.models.ingestion_job import IngestionJob
+from app.repository.cv_repository import CVRepository
+from app.repository.ingestion_job_repository import IngestionJobRepository
+from app.services.pdf import PdfService
+
+logger = logging.getLogger(__name__)
+
+
+class IngestionService():
+    """Queues CV uploads for the background worker and runs queued jobs"""
+
+    def __init__(self, session: AsyncSession, pdf_service: PdfService = None, container: ServiceContainer = None):
+        self.session = session
+        self.container = container
+        self.cv_repository = CVRepository(session)
+        self.job_repository = IngestionJobRepository(session)
+        self._pdf_service = pdf_service
+
+    @property
+    def pdf_service(self) -> PdfService:
+        # Only the worker needs embeddings and Qdrant, the API side just enqueues
+        if self._pdf_service is None:
+            self._pdf_service = PdfService(self.session, self.container)
+        return self._pdf_service
+
+    async def enqueue_cv(self, user_id: int, pdf_path: str, source_id: str, filename: str = None,
+                         original_filename: str = None, file_size: int = 0, content_type: str = "application/pdf",
+                         upload_ip: str = None, user_agent: str = None,
+                         content_hash: str = None) -> IngestionJob:
+        """
+        Сохраняет метаданные CV и ставит обработку файла в очередь.
+
+        Если у пользователя уже есть обработанное CV с тем же content_hash, точки копируются
+        сразу, а задача создаётся в статусе done. Задачи прежних загрузок этого CV, которые
+        ещё ждут в очереди, отменяются (superseded).
+
+        Returns:
+            IngestionJob: Созданная задача
+
+        Raises:
+            PermissionError: source_id занят CV другого пользователя
+        """
+        filename = filename or pdf_path.split('/')[-1]
+        original_filename = original_filename or filename
+        cv = await self.cv_repository.get_cv_by_source_id(source_id=source_id)
+        if cv is not None and cv.user_id != user_id:
+            raise PermissionError(f"source_id {source_id} is already used by another user")
+        busy = False
+        if cv is None:
+            cv = await self.cv_repository.create_cv(
+                user_id=user_id,
+                source_id=source_id,
+                filename=filename,
+                original_filename=original_filename,
+                file_path=pdf_path,
+                file_size=file_size,
+                content_type=content_type,
+                upload_ip=upload_ip,
+                user_agent=user_agent,
+                content_hash=content_hash
+            )
+        else:
+            await self.cv_repository.update_cv(cv, {
+                "filename": filename,
+                "original_filename": original_filename,
+                "file_path": pdf_path,
+                "file_size": file_size,
+                "content_type": content_type,
+                "content_hash": content_hash,
+                "status": "uploaded",
+                "updated_at": datetime.utcnow(),
+            })
+            self.session.commit()
+            for stale in await self.job_repository.supersede_queued(cv.id):
+                _remove_upload(stale.file_path)
+            # A running job would overwrite copied points with the previous file, so the
+            # new job waits for it in the queue (the worker reuses the duplicate then)
+            busy = await self.job_repository.has_running_job(cv.id)
+
+        reused = not busy and await self._reuse_duplicate(cv)
+        if reused:
+            _remove_upload(pdf_path)
+        return await self.job_repository.enqueue(
+            cv_id=cv.id,
+            user_id=user_id,
+            source_id=source_id,
+            file_path=pdf_path,
+            original_filename=original_filename,
+            status="done" if reused else "queued"
+        )
+
+    async def process_job(self, job: IngestionJob) -> None:
+        """Runs parse -> chunk -> embed -> upsert for a claimed job and records the outcome"""
+        cv = await self.cv_repository.get_cv_by_id(job.cv_id)
+        if cv is None:
+            await self.job_repository.mark_failed(job, f"CV with id {job.cv_id} not found", max_attempts=0)
+            _remove_upload(job.file_path)
+            return
+
+        # Reclaimed after its worker died on the last allowed attempt
+        if job.attempts > settings.INGEST_MAX_ATTEMPTS:
+            logger.error("Ingestion job %s lost its worker %s times, giving up", job.id, job.attempts - 1)
+            await self.job_repository.mark_failed(
+                job, "Worker stopped responding while processing the job", settings.INGEST_MAX_ATTEMPTS
+            )
+            await self.cv_repository.update_cv_status(cv.id, "error")
+            _remove_upload(job.file_path)
+            return
+
+        if await self.job_repository.has_newer_job(job):
+            await self.job_repository.mark_superseded(job)
+            _remove_upload(job.file_path)
+            return
+
+        # The original may have finished while this job was waiting in the queue
+        if await self._reuse_duplicate(cv):
+            await self.job_repository.mark_done(job)
+            _remove_upload(job.file_path)
+            return
+
+        await self.cv_repository.update_cv_status(cv.id, "processing")
+        try:
+            await self.pdf_service.upsert_vectors(
+                job.file_path, job.original_filename, job.source_id, job.user_id, content_hash=cv.content_hash
+            )
+        except Exception as e:
+            logger.error("Ingestion job %s failed (attempt %s)", job.id, job.attempts, exc_info=True)
+            if await self.job_repository.has_newer_job(job):
+                await self.job_repository.mark_superseded(job)
+                _remove_upload(job.file_path)
+                return
+            job = await self.job_repository.mark_failed(job, str(e), settings.INGEST_MAX_ATTEMPTS)
+            await self.cv_repository.update_cv_status(cv.id, "error" if job.status == "error" else "uploaded")
+            if job.status == "error":
+                _remove_upload(job.file_path)
+            return
+
+        _remove_upload(job.file_path)
+        # The CV was uploaded again while this job ran; the newer job runs next and sets the status
+        if await self.job_repository.has_newer_job(job):
+            await self.job_repository.mark_superseded(job)
+            return
+        await self.cv_repository.update_cv_status(cv.id, "processed")
+        await self.job_repository.mark_done(job)
+        logger.info("Ingestion job %s done for CV %s", job.id, cv.id)
+
+    async def _reuse_duplicate(self, cv: CV) -> bool:
+        """Copy points of a processed byte-identical CV of the same user, if there is one"""
+        if not cv.content_hash:
+            return False
+        original = await self.cv_repository.get_processed_cv_by_content_hash(
+            cv.user_id, cv.content_hash, exclude_cv_id=cv.id
+        )
+        if original is None:
+            return False
+        try:
+            stats = await self.pdf_service.copy_vectors(original.source_id, cv.source_id, cv.user_id, cv.file_path)
+        except Exception:
+            logger.error("Failed to copy points of CV %s to CV %s", original.id, cv.id, exc_info=True)
+            return False
+        if stats is None:
+            return False
+        if original.profile:
+            await self.cv_repository.set_cv_profile(cv, original.profile, original.profile_hash)
+        await self.cv_repository.update_cv_status(cv.id, "processed")
+        logger.info("CV %s is a duplicate of CV %s, reused %s chunks", cv.id, original.id, stats["reused"])
+        return True
+
+
+def _remove_upload(path: str) -> None:
+    """Delete an uploaded file once its job is finished (done or error)"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        logger.warning("Could not remove uploaded file %s", path, exc_info=True)
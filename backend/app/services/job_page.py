@@ -0,0 +1,475 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import re
+import socket
+from html.parser import HTMLParser
+from typing import Iterator, Optional, Union
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+MAX_REDIRECTS = 5
+
+# Elements whose text is never part of the posting
+SKIP_TAGS = {"script", "style", "noscript", "svg", "template", "head"}
+# Page chrome around the posting
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form", "button", "select", "iframe", "dialog"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+BLOCK_TAGS = {
+    "address", "article", "blockquote", "br", "dd", "div", "dl", "dt", "h1", "h2", "h3", "h4", "h5", "h6",
+    "hr", "li", "main", "ol", "p", "pre", "section", "table", "td", "th", "tr", "ul",
+}
+# Start tags that implicitly close an open element (HTML optional end tags):
+# tag -> (elements it closes, elements the search for them stops at)
+IMPLIED_END_TAGS = {
+    "li": ({"li"}, {"ul", "ol", "menu"}),
+    "dt": ({"dt", "dd"}, {"dl"}),
+    "dd": ({"dt", "dd"}, {"dl"}),
+    "tr": ({"tr"}, {"table", "tbody", "thead", "tfoot"}),
+    "td": ({"td", "th"}, {"tr", "table"}),
+    "th": ({"td", "th"}, {"tr", "table"}),
+    "tbody": ({"tbody", "thead", "tfoot"}, {"table"}),
+    "thead": ({"tbody", "thead", "tfoot"}, {"table"}),
+    "tfoot": ({"tbody", "thead", "tfoot"}, {"table"}),
+    "option": ({"option"}, {"select", "datalist"}),
+}
+# Block start tags that close an open <p> (it cannot contain them)
+CLOSES_P = BLOCK_TAGS - {"br", "td", "th", "tr"} | {"aside", "details", "fieldset", "figure", "footer", "form",
+                                                     "header", "menu", "nav"}
+# The search for an open <p> does not cross these
+P_SCOPE = BLOCK_TAGS - {"p", "br", "hr"} | {"button", "body", "html"} | BOILERPLATE_TAGS
+# Elements whose own text is scored and credited to their parent and grandparent (readability)
+PARAGRAPH_TAGS = {"p", "li", "td", "pre", "dd", "blockquote"}
+NEGATIVE_CLASS = re.compile(
+    r"comment|footer|header|menu|nav|sidebar|cookie|consent|banner|breadcrumb|share|social|related|"
+    r"recommend|similar|promo|advert|popup|modal|subscribe|login|signup",
+    re.IGNORECASE
+)
+POSITIVE_CLASS = re.compile(r"article|content|main|descr|vacanc|job|posting|details|text|body", re.IGNORECASE)
+# Candidate containers prefer structure-bearing tags
+TAG_SCORES = {"article": 10, "main": 10, "section": 5, "div": 5, "td": 3, "pre": 3, "blockquote": 3}
+
+# Readable labels of JSON-LD JobPosting properties, in output order
+JOB_POSTING_FIELDS = (
+    ("title", "Title"),
+    ("hiringOrganization", "Company"),
+    ("jobLocation", "Location"),
+    ("jobLocationType", "Location type"),
+    ("employmentType", "Employment type"),
+    ("baseSalary", "Salary"),
+    ("experienceRequirements", "Experience"),
+    ("educationRequirements", "Education"),
+    ("skills", "Skills"),
+    ("qualifications", "Qualifications"),
+    ("responsibilities", "Responsibilities"),
+    ("description", "Description"),
+)
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip and data.strip():
+            self.parts.append(data.strip())
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of an HTML page with whitespace collapsed"""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return re.sub(r"\s+", " ", " ".join(parser.parts)).strip()
+
+
+class _Node():
+    __slots__ = ("tag", "attrs", "parent", "children", "text_len", "link_len", "score")
+
+    def __init__(self, tag: str, attrs: dict, parent: Optional["_Node"]):
+        self.tag = tag
+        self.attrs = attrs
+        self.parent = parent
+        self.children: list[Union["_Node", str]] = []
+        self.text_len = 0
+        self.link_len = 0
+        self.score = 0.0
+
+
+class _TreeBuilder(HTMLParser):
+    """Lenient DOM tree of a page plus the raw JSON-LD blocks"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = _Node("root", {}, None)
+        self.json_ld: list[str] = []
+        self._current = self.root
+        self._json_ld_parts: Optional[list[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {key: value or "" for key, value in attrs}
+        if tag == "script" and attrs.get("type", "").lower() == "application/ld+json":
+            self._json_ld_parts = []
+        if tag in CLOSES_P:
+            self._close_open("p", {"p"}, P_SCOPE)
+        if tag in IMPLIED_END_TAGS:
+            self._close_open(tag, *IMPLIED_END_TAGS[tag])
+        node = _Node(tag, attrs, self._current)
+        self._current.children.append(node)
+        if tag not in VOID_TAGS:
+            self._current = node
+
+    def handle_endtag(self, tag):
+        if tag == "script" and self._json_ld_parts is not None:
+            self.json_ld.append("".join(self._json_ld_parts))
+            self._json_ld_parts = None
+        node = self._current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        # Stray end tags are ignored, unclosed elements are closed by their ancestor's end tag
+        if node is not self.root:
+            self._current = node.parent
+
+    def _close_open(self, tag: str, closes: set[str], scope: set[str]):
+        """Close the nearest open element from closes, unless a scope element comes first"""
+        node = self._current
+        while node is not self.root and node.tag not in closes:
+            if node.tag in scope:
+                return
+            node = node.parent
+        if node is not self.root:
+            self._current = node.parent
+
+    def handle_data(self, data):
+        if self._json_ld_parts is not None:
+            self._json_ld_parts.append(data)
+        else:
+            self._current.children.append(data)
+
+
+def _is_boilerplate(node: _Node) -> bool:
+    if node.tag in SKIP_TAGS or node.tag in BOILERPLATE_TAGS:
+        return True
+    if "hidden" in node.attrs or node.attrs.get("aria-hidden") == "true":
+        return True
+    if re.search(r"display\s*:\s*none", node.attrs.get("style", "")):
+        return True
+    if node.tag in ("body", "article", "main"):
+        return False
+    marker = f"{node.attrs.get('class', '')} {node.attrs.get('id', '')}"
+    return bool(NEGATIVE_CLASS.search(marker)) and not POSITIVE_CLASS.search(marker)
+
+
+# Tree walks are iterative: real pages nest deeper than the recursion limit
+
+def _measure(root: _Node):
+    """Fill text_len and link_len bottom-up, skipping boilerplate"""
+    order: list[tuple[_Node, bool]] = []
+    stack = [(root, False)]
+    while stack:
+        node, in_link = stack.pop()
+        order.append((node, in_link))
+        for child in node.children:
+            if isinstance(child, _Node) and not _is_boilerplate(child):
+                stack.append((child, in_link or child.tag == "a"))
+    # Descendants come after their ancestors in `order`, so they are summed first
+    for node, in_link in reversed(order):
+        for child in node.children:
+            if isinstance(child, str):
+                length = len(child.strip())
+                node.text_len += length
+                if in_link:
+                    node.link_len += length
+        if node is not root:
+            node.parent.text_len += node.text_len
+            node.parent.link_len += node.link_len
+
+
+def _node_text(node: _Node) -> str:
+    """Text of a subtree, one line per block element"""
+    parts: list[str] = []
+    stack: list[Union[_Node, str]] = list(reversed(node.children))
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+        elif not _is_boilerplate(item):
+            block = item.tag in BLOCK_TAGS
+            if block:
+                stack.append("\n")
+            stack.extend(reversed(item.children))
+            if item.tag == "li":
+                stack.append("- ")
+            if block:
+                stack.append("\n")
+    lines = (re.sub(r"\s+", " ", line).strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line and line != "-")
+
+
+def _walk(root: _Node) -> Iterator[_Node]:
+    """Non-boilerplate descendants in document order"""
+    stack = [child for child in reversed(root.children) if isinstance(child, _Node)]
+    while stack:
+        node = stack.pop()
+        if _is_boilerplate(node):
+            continue
+        yield node
+        stack.extend(child for child in reversed(node.children) if isinstance(child, _Node))
+
+
+def _class_weight(node: _Node) -> int:
+    marker = f"{node.attrs.get('class', '')} {node.attrs.get('id', '')}"
+    return (25 if POSITIVE_CLASS.search(marker) else 0) - (25 if NEGATIVE_CLASS.search(marker) else 0)
+
+
+def main_content(root: _Node, min_chars: int = settings.JOB_EXTRACT_MIN_CHARS) -> str:
+    """
+    Readability-style main content: paragraphs score their parent and grandparent
+    (more text and commas score higher), the best container after a link-density
+    penalty wins. Climbs to the parent while the winner is shorter than min_chars.
+    """
+    _measure(root)
+    candidates: dict[_Node, None] = {}
+    for node in _walk(root):
+        if node.tag not in PARAGRAPH_TAGS or node.text_len < 25:
+            continue
+        text = _node_text(node)
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        for ancestor, share in ((node.parent, 1.0), (node.parent.parent if node.parent else None, 0.5)):
+            if ancestor is None or ancestor is root:
+                continue
+            if ancestor not in candidates:
+                ancestor.score = TAG_SCORES.get(ancestor.tag, 0) + _class_weight(ancestor)
+                candidates[ancestor] = None
+            ancestor.score += score * share
+
+    if not candidates:
+        return _node_text(root)
+    best = max(candidates, key=lambda node: node.score * (1 - node.link_len / max(node.text_len, 1)))
+    while best.text_len < min_chars and best.parent is not None and best.parent is not root:
+        best = best.parent
+    return _node_text(best)
+
+
+def _job_postings(data) -> Iterator[dict]:
+    if isinstance(data, list):
+        for item in data:
+            yield from _job_postings(item)
+    elif isinstance(data, dict):
+        types = data.get("@type")
+        if "JobPosting" in (types if isinstance(types, list) else [types]):
+            yield data
+        if "@graph" in data:
+            yield from _job_postings(data["@graph"])
+
+
+def _ld_text(value) -> str:
+    """Plain text of a JSON-LD property value (HTML strings, lists, nested objects)"""
+    if isinstance(value, str):
+        if "<" in value:
+            builder = _TreeBuilder()
+            builder.feed(value)
+            builder.close()
+            return _node_text(builder.root)
+        return value.strip()
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if isinstance(value, list):
+        return "; ".join(text for text in (_ld_text(item) for item in value) if text)
+    if isinstance(value, dict):
+        if value.get("name"):
+            return _ld_text(value["name"])
+        return ", ".join(
+            text for key, item in value.items()
+            if not key.startswith("@") and (text := _ld_text(item))
+        )
+    return ""
+
+
+def job_posting_from_json_ld(blocks: list[str]) -> Optional[str]:
+    """First schema.org JobPosting among the page's JSON-LD blocks, as labelled text"""
+    for block in blocks:
+        try:
+            data = json.loads(block.strip().rstrip(";"))
+        except (ValueError, RecursionError):
+            continue
+        for posting in _job_postings(data):
+            lines = []
+            for field, label in JOB_POSTING_FIELDS:
+                text = _ld_text(posting.get(field))
+                if text:
+                    lines.append(f"{label}:\n{text}" if "\n" in text else f"{label}: {text}")
+            if lines:
+                return "\n".join(lines)
+    return None
+
+
+def extract_job_posting(html: str, min_chars: int = settings.JOB_EXTRACT_MIN_CHARS,
+                        max_chars: int = settings.JOB_EXTRACT_MAX_CHARS) -> Optional[str]:
+    """
+    Cleaned text of a vacancy page for the extraction model.
+
+    A JSON-LD JobPosting with a full description is used as is; otherwise its fields
+    (if any) are prefixed to the page's main content. Returns None when less than
+    min_chars of text remain - the page is then most likely rendered by JavaScript
+    or blocked, and callers fall back to web search.
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+
+    structured = job_posting_from_json_ld(builder.json_ld)
+    if structured and len(structured) >= min_chars:
+        return structured[:max_chars]
+    text = "\n\n".join(part for part in (structured, main_content(builder.root, min_chars)) if part)
+    if len(text) < min_chars:
+        return None
+    return text[:max_chars]
+
+
+async def job_posting_from_page(url: str, html: Optional[str]) -> Optional[str]:
+    """extract_job_posting off the event loop; None also when the markup breaks the parser"""
+    if not html:
+        return None
+    try:
+        return await asyncio.to_thread(extract_job_posting, html)
+    except Exception as e:
+        logger.warning("Job page extraction failed for %s: %s", url, e)
+        return None
+
+
+class UnsafeURLError(ValueError):
+    """URL is not a public http(s) address on a default port"""
+
+
+def is_public_ip(address: str) -> bool:
+    """True for globally routable unicast addresses (no loopback, private, link-local, metadata, ...)"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def resolve_public_address(url: str, allow_private: Optional[bool] = None) -> Optional[str]:
+    """
+    Check that url may be fetched by the server and return the address to connect to.
+
+    Only http and https on their default ports are allowed, and every address the host
+    resolves to must be public. allow_private lifts the address and port checks (local
+    development and tests only); it defaults to JOB_PAGE_ALLOW_PRIVATE.
+
+    Returns:
+        str: IP address to connect to, None if the host does not resolve
+
+    Raises:
+        UnsafeURLError: Scheme, port or address is not allowed
+    """
+    if allow_private is None:
+        allow_private = settings.JOB_PAGE_ALLOW_PRIVATE
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        raise UnsafeURLError(f"Unsupported URL scheme: {scheme or 'none'}")
+    if not parts.hostname:
+        raise UnsafeURLError("URL has no host")
+    try:
+        port = parts.port or DEFAULT_PORTS[scheme]
+    except ValueError as e:
+        raise UnsafeURLError(str(e)) from e
+    if port != DEFAULT_PORTS[scheme] and not allow_private:
+        raise UnsafeURLError(f"Port {port} is not allowed")
+
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError) as e:
+        logger.info("Could not resolve job page host %s: %s", parts.hostname, e)
+        return None
+    addresses = [info[4][0] for info in infos]
+    if not allow_private:
+        blocked = [address for address in addresses if not is_public_ip(address)]
+        if blocked:
+            raise UnsafeURLError(f"{parts.hostname} resolves to a non-public address {blocked[0]}")
+    return addresses[0] if addresses else None
+
+
+def _pinned_request(client: httpx.AsyncClient, url: str, address: str) -> httpx.Request:
+    """GET url over a connection to the already checked address (no second DNS lookup)"""
+    parts = urlsplit(url)
+    netloc = f"[{address}]" if ":" in address else address
+    host_header = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+    if parts.port is not None:
+        netloc = f"{netloc}:{parts.port}"
+    request = client.build_request(
+        "GET",
+        urlunsplit((parts.scheme, netloc, parts.path or "/", parts.query, "")),
+        headers={"Host": host_header},
+    )
+    # TLS is negotiated and verified for the original host name
+    request.extensions["sni_hostname"] = parts.hostname
+    return request
+
+
+async def fetch_page_html(client: httpx.AsyncClient, url: str, max_bytes: int = settings.JOB_PAGE_MAX_BYTES,
+                          allow_private: Optional[bool] = None) -> Optional[str]:
+    """
+    Download a vacancy page (at most max_bytes of it).
+
+    The URL comes from the user, so every hop (the URL and each redirect target) is
+    checked with resolve_public_address and connected to by the checked IP address.
+
+    Returns None when the page cannot or may not be fetched directly (bot protection,
+    errors, non-HTML responses, non-public addresses); callers then fall back to web search.
+    """
+    current = url
+    for _ in range(MAX_REDIRECTS + 1):
+        try:
+            address = await resolve_public_address(current, allow_private)
+        except UnsafeURLError as e:
+            logger.warning("Refusing to fetch job page %s: %s", current, e)
+            return None
+        if address is None:
+            return None
+
+        try:
+            response = await client.send(_pinned_request(client, current, address), stream=True,
+                                          follow_redirects=False)
+            try:
+                if response.is_redirect:
+                    current = urljoin(current, response.headers["location"])
+                    continue
+                if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+                    logger.info("Job page %s not usable: HTTP %s %s", current, response.status_code,
+                                response.headers.get("content-type", ""))
+                    return None
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body.extend(chunk)
+                    if len(body) > max_bytes:
+                        del body[max_bytes:]
+                        break
+                return body.decode(response.encoding or "utf-8", errors="replace")
+            finally:
+                await response.aclose()
+        except httpx.HTTPError as e:
+            logger.info("Could not fetch job page %s: %s", current, e)
+            return None
+
+    logger.info("Too many redirects for job page %s", url)
+    return None
@@ -0,0 +1,132 @@
+import hashlib
+import logging
+from typing import Awaitable, Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.container import ServiceContainer, get_container
+from app.repository.job_requirements_repository import JobRequirementsRepository
+from app.repository.letter_repository import LetterRepository
+from app.services.job_page import fetch_page_html, job_posting_from_page
+
+logger = logging.getLogger(__name__)
+
+# Query parameters known to only track the click (plus utm_*). Generic names such as
+# source, from or ref select the vacancy on some job boards and are kept.
+TRACKING_PARAMS = {
+    "gclid", "gbraid", "wbraid", "fbclid", "yclid", "msclkid", "dclid", "igshid", "mc_cid", "mc_eid",
+    "_hsenc", "_hsmi", "trk", "trackingid", "hhtmfrom", "hhtmfromlabel",
+}
+
+# Posting text longer than this is cut before embedding (the essentials come first)
+EMBED_MAX_TOKENS = 2000
+
+# Longer normalized URLs are keyed by their hash (bounded url_key and Letter.job_url columns)
+URL_KEY_MAX_LENGTH = 500
+# JobRequirements.url only records where the requirements came from
+URL_MAX_LENGTH = 2000
+
+
+def normalize_job_url(url: str) -> str:
+    """Cache key for a vacancy URL: lowercase host without www, no fragment, no tracking parameters"""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith("utm_")
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def job_url_key(url: str) -> str:
+    """normalize_job_url, or its sha256 when the normalized URL is too long to store"""
+    normalized = normalize_job_url(url)
+    if len(normalized) <= URL_KEY_MAX_LENGTH:
+        return normalized
+    return "sha256:" + hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+
+class JobRequirementsCache():
+    """
+    Requirements parsed from vacancy pages, shared by all users.
+
+    Lookup order: normalized URL, requirements of an earlier letter for the same URL,
+    then the posting itself, fetched directly and cleaned of page chrome: an identical
+    text hash or an embedding within JOB_CACHE_SIMILARITY of a cached posting (the same
+    vacancy on another job board). Only a miss runs the parse, which gets the cleaned
+    posting, so a page is extracted once. Embeddings are stored as float32 bytes.
+    """
+
+    def __init__(self, session: AsyncSession, container: ServiceContainer = None):
+        container = container or get_container()
+        self.http = container.http
+        self.embedder = container.job_embedder
+        self.repository = JobRequirementsRepository(session)
+        self.letter_repository = LetterRepository(session)
+        self.ttl = settings.JOB_CACHE_TTL
+
+    async def get_or_parse(self, job_url: str, parse: Callable[[str, Optional[str]], Awaitable[str]]) -> str:
+        """Cached requirements for job_url, calling parse(job_url, posting) only on a miss"""
+        url_key = job_url_key(job_url)
+        url = job_url[:URL_MAX_LENGTH]
+
+        entry = await self.repository.get_fresh_by_url_key(url_key)
+        if entry is not None:
+            await self.repository.record_hit(entry)
+            return entry.requirements
+
+        requirements = await self.letter_repository.get_recent_job_requirements_by_url(url_key, self.ttl)
+        if requirements:
+            await self.repository.save(url_key, url, requirements, self.ttl)
+            return requirements
+
+        page_hash, embedding = None, None
+        posting = await job_posting_from_page(job_url, await fetch_page_html(self.http, job_url))
+        if posting:
+            page_hash = text_hash(posting)
+            embedding = await self._embed_posting(posting)
+            duplicate = await self._find_duplicate(page_hash, embedding)
+            if duplicate is not None:
+                logger.info("Job page %s matches cached posting %s", url_key, duplicate.url_key)
+                await self.repository.record_hit(duplicate)
+                await self.repository.save(url_key, url, duplicate.requirements, self.ttl, page_hash, embedding)
+                return duplicate.requirements
+
+        requirements = await parse(job_url, posting)
+        if requirements and not requirements.startswith("Ошибка"):
+            await self.repository.save(url_key, url, requirements, self.ttl, page_hash, embedding)
+        return requirements
+
+    async def _embed_posting(self, posting: str) -> bytes:
+        tokens = self.embedder.encoding.encode(posting, disallowed_special=())
+        vector = (await self.embedder.embed([self.embedder.encoding.decode(tokens[:EMBED_MAX_TOKENS])]))[0]
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    async def _find_duplicate(self, page_hash: str, embedding: bytes):
+        entry = await self.repository.get_fresh_by_text_hash(page_hash)
+        if entry is not None:
+            return entry
+
+        candidates = await self.repository.get_fresh_embeddings(settings.JOB_CACHE_CANDIDATES)
+        candidates = [(entry_id, vector) for entry_id, vector in candidates if len(vector) == len(embedding)]
+        if not candidates:
+            return None
+        matrix = np.frombuffer(b"".join(vector for _, vector in candidates), dtype=np.float32)
+        # OpenAI embeddings are unit length, cosine similarity is a dot product
+        scores = matrix.reshape(len(candidates), -1) @ np.frombuffer(embedding, dtype=np.float32)
+        best = int(np.argmax(scores))
+        if scores[best] < settings.JOB_CACHE_SIMILARITY:
+            return None
+        return await self.repository.get_by_id(candidates[best][0])
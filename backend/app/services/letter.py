@@ -1,20 +1,101 @@
-from openai import OpenAI
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import Session
 from app.services.pdf import PdfService
+from app.services.ingestion import IngestionService
+from app.services.job_requirements import JobRequirementsCache, job_url_key
+from app.services.job_page import UnsafeURLError, fetch_page_html, job_posting_from_page, resolve_public_address
+from app.services.retrieval import split_requirements, merge_hits, mmr
+from app.services.prompt import PROMPT_VERSION, get_prompt_builder
+from app.services.profile import profile_sections
+from app.services.stages import StageGraph
+from app.helper.pagination import decode_cursor, encode_cursor
+from app.core.config import settings
+from app.models.ingestion_job import IngestionJob
 from app.schemas.rag import RAGSearchResult
-from app.storage.repository.qdrant import QdrantStorage
+from app.core.container import ServiceContainer, get_container
 from app.repository.cv_repository import CVRepository
 from app.repository.letter_repository import LetterRepository
-from typing import List, Dict, Any
+from app.repository.letter_cache_repository import LetterCacheRepository
+from app.repository.letter_batch_repository import LetterBatchRepository
+from app.services.letter_batch import batch_request_line, parse_batch_output
+from app.models.cv import CV
+from app.models.letter import Letter
+from app.models.letter_batch import LetterBatch
+from datetime import datetime
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Optional
+import asyncio
+import hashlib
 import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+LETTER_MODEL = "gpt-4o"
+PARSE_MODEL = "gpt-4.1-mini"
+
+# Запрос для поиска по резюме, если в требованиях не нашлось отдельных утверждений
+SKILLS_QUERY = "ключевые навыки опыт образование достижения"
+
+NO_RESUME_MESSAGE = "Не найдены данные резюме в базе данных. Сначала загрузите свое резюме."
+
+# Что извлекать из вакансии (и при локальном разборе страницы, и через web search)
+JOB_FIELDS_PROMPT = """
+        Извлеки и суммируй следующую информацию:
+        - Название вакансии
+        - Основные обязанности
+        - Требуемые навыки и компетенции
+        - Требуемый опыт работы
+        - Образование и квалификация
+        - Дополнительные требования
+
+        Представь информацию в структурированном виде.
+        """
+
+# Ответ модели, если в очищенном тексте страницы нет описания вакансии
+NO_JOB_POSTING = "NO_JOB_POSTING"
+
+JOB_EXTRACT_PROMPT = f"""
+        Ниже очищенный текст страницы вакансии.
+        Пиши на том языке, на котором информация на странице вакансии.
+        {JOB_FIELDS_PROMPT}
+        Используй только факты из текста. Если в тексте нет описания вакансии, ответь только {NO_JOB_POSTING}.
+        """
+
+# Версия промпта для кэша писем учитывает источник контекста (профиль CV или retrieval)
+CACHE_PROMPT_VERSION = f"{PROMPT_VERSION}-{settings.LETTER_CONTEXT_MODE}"
+
+
+def cv_version(cv: CV) -> str:
+    """Версия содержимого CV: sha256 файла, для старых записей - время обновления"""
+    return cv.content_hash or f"{cv.id}:{cv.updated_at.isoformat()}"
+
+
+def letter_cache_key(cv_version: str, job_requirements: str, model: str = LETTER_MODEL,
+                     prompt_version: str = CACHE_PROMPT_VERSION) -> str:
+    """Ключ кэша письма: (версия CV, хэш нормализованных требований, модель, версия промпта)"""
+    requirements_hash = hashlib.sha256(" ".join(job_requirements.lower().split()).encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{cv_version}|{requirements_hash}|{model}|{prompt_version}".encode("utf-8")).hexdigest()
+
+
 class LetterService():
-    def __init__(self, session: AsyncSession = None):
-        self.client = OpenAI()
-        self.storage = QdrantStorage()
+    def __init__(self, session: AsyncSession = None, container: ServiceContainer = None):
+        container = container or get_container()
+        self.client = container.openai
+        self.storage = container.storage
         self.session = session
-        self.pdf_service = PdfService(session)
+        self.container = container
+        self.pdf_service = PdfService(session, container)
         self.cv_repository = CVRepository(session) if session else None
         self.letter_repository = LetterRepository(session) if session else None
+        self.letter_cache_repository = LetterCacheRepository(session) if session else None
+        self.letter_batch_repository = LetterBatchRepository(session) if session else None
+        # Токены последней генерации (оценка промпта + фактическое usage из ответа)
+        self.last_usage: Optional[dict] = None
+        # Время этапов последней генерации по URL, секунды (StageGraph.timings)
+        self.last_timings: Optional[dict] = None
+        # id последнего сохраненного в историю письма (None при попадании в кэш)
+        self.last_letter_id: Optional[int] = None
 
     async def search_job_requirements(self, job_title: str, company: str = None) -> str:
         """
@@ -39,7 +120,7 @@ class LetterService():
         ]
 
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model="gpt-5-mini",
                 messages=messages,
                 max_tokens=800,
@@ -51,77 +132,252 @@ class LetterService():
         except Exception as e:
             return f"Ошибка при поиске требований: {str(e)}"
 
-    async def generate_cover_letter(self, job_requirements: str, source_id: int) -> str:
+    async def generate_cover_letter(self, job_requirements: str, source_id: int, user_id: int,
+                                    regenerate: bool = False) -> str:
         """
         Генерирует сопроводительное письмо на основе требований вакансии и данных из резюме
 
         Args:
             job_requirements: Требования к вакансии (полученные из search_job_requirements)
             source_id: ID источника резюме в базе данных
+            user_id: ID пользователя, запросившего письмо (CV должно принадлежать ему)
+            regenerate: Игнорировать кэш писем и сгенерировать заново
 
         Returns:
             str: Сгенерированное сопроводительное письмо
         """
-        # Ищем релевантные данные из резюме в векторной базе
-        def _search_resume_data(query: str, top_k: int = 10):
-            query_vec = self.pdf_service.embed_texts([query])[0]
-            found = self.storage.search(query_vector=query_vec, top_k=top_k)
+        self.last_usage = None
+        if not await self._owns_cv(source_id, user_id):
+            return NO_RESUME_MESSAGE
+        letter_content, self.last_usage = await self._generate_letter(job_requirements, source_id, user_id, regenerate)
+        return letter_content
 
-            # Фильтруем результаты по source_id
-            filtered_contexts = []
-            filtered_sources = []
-            for context, source in zip(found["contexts"], found["sources"]):
-                if str(source.get("source_id")) == str(source_id):
-                    filtered_contexts.append(context)
-                    filtered_sources.append(source)
+    async def _generate_letter(self, job_requirements: str, source_id: int, user_id: int, regenerate: bool = False,
+                               resume_data: RAGSearchResult = None,
+                               job_url: str = None) -> tuple[str, Optional[dict]]:
+        """
+        Письмо и usage генерации; контекст резюме можно передать заранее (bulk)
 
-            return RAGSearchResult(contexts=filtered_contexts, sources=filtered_sources)
+        Новое письмо сохраняется в историю (letters), письмо из кэша - нет: оно уже там.
+        """
+        started = time.perf_counter()
+        self.last_letter_id = None
+        cache_key = await self._letter_cache_key(source_id, job_requirements)
+        if not regenerate:
+            cached = await self._get_cached_letter(cache_key)
+            if cached is not None:
+                return cached, {"cached": True}
 
-        # Получаем ключевые навыки и опыт из резюме
-        skills_query = "ключевые навыки опыт образование достижения"
-        resume_data = _search_resume_data(skills_query)
+        if resume_data is None:
+            resume_data = await self._resume_context(source_id, job_requirements, user_id)
 
         if not resume_data.contexts:
-            return "Не найдены данные резюме в базе данных. Сначала загрузите свое резюме."
+            return NO_RESUME_MESSAGE, None
 
-        # Формируем контекст из резюме
-        resume_context = "\n\n".join(f"- {c}" for c in resume_data.contexts)
-
-        prompt = f"""
-       Ты - помощник по созданию профессиональных сопроводительных писем.
-
-        У тебя есть:
-        1. Требования к вакансии: {job_requirements}
-        2. Данные из резюме кандидата: {resume_context}
-    Задача: на основе этих данных сгенерировать персонализированное сопроводительное письмо, которое
-        Показывает почему мой предыдущий опыт поможет в их работе 
-        Имеет ключевые слова из резюме
-        Сопоставь (там где это максимально корректно) кейсы из моего релевантного опыта  к требованиям в вакансии, но так чтобы технологии соответствовали по смыслу
-        Пиши в профессиональном, но дружелюбном тоне
-        Избегай общих фраз и клише
-        Письмо должно быть на том языке, на котором написаны требования для вакансии. Объемом 200-300 слов.
-    """
+        packed = get_prompt_builder(LETTER_MODEL).build(job_requirements, resume_data.contexts, resume_data.scores)
 
         try:
-            response = self.client.responses.create(
-                model="gpt-4o",
+            response = await self.client.responses.create(
+                model=LETTER_MODEL,
                 max_output_tokens=2048,
-                input=prompt,
+                input=packed.prompt,
                 temperature=1.0
             )
             print("========================== LETTER ==========================")
             print(response.output_text)
             letter_content = response.output_text
-            return letter_content
+            await self._cache_letter(cache_key, letter_content)
+            usage = self._usage(packed, response.usage)
+        except Exception as e:
+            return f"Ошибка при генерации сопроводительного письма: {str(e)}", None
 
+        letter = await self._save_letter(source_id, job_requirements, letter_content, job_url,
+                                         round(time.perf_counter() - started))
+        self.last_letter_id = letter.id if letter else None
+        return letter_content, usage
+
+    async def stream_cover_letter(self, job_requirements: str, source_id: int, user_id: int, regenerate: bool = False,
+                                  resume_data: RAGSearchResult = None, job_url: str = None) -> AsyncIterator[dict]:
+        """
+        Потоковая генерация письма: события этапов, затем токены по мере генерации
+
+        Args:
+            job_requirements: Требования к вакансии
+            source_id: ID источника резюме в базе данных
+            user_id: ID пользователя, запросившего письмо (CV должно принадлежать ему)
+            regenerate: Игнорировать кэш писем и сгенерировать заново
+            resume_data: Уже полученный контекст резюме (иначе профиль или retrieval)
+            job_url: URL вакансии для истории писем
+
+        Yields:
+            dict: {"event": "stage" | "delta" | "done" | "error", "data": {...}}
+        """
+        generation_started = time.perf_counter()
+        self.last_letter_id = None
+        if not await self._owns_cv(source_id, user_id):
+            yield {"event": "error", "data": {"message": NO_RESUME_MESSAGE}}
+            return
+        cache_key = await self._letter_cache_key(source_id, job_requirements)
+        if not regenerate:
+            cached = await self._get_cached_letter(cache_key)
+            if cached is not None:
+                yield {"event": "stage", "data": {"stage": "cache", "status": "hit"}}
+                yield {"event": "delta", "data": {"text": cached}}
+                self.last_usage = {"cached": True}
+                yield {"event": "done", "data": {"letter_content": cached, "source_id": source_id, "cached": True,
+                                                 "letter_id": None, "usage": self.last_usage}}
+                return
+
+        yield {"event": "stage", "data": {"stage": "retrieval", "status": "started"}}
+        started = time.perf_counter()
+        if resume_data is None:
+            resume_data = await self._resume_context(source_id, job_requirements, user_id)
+        mode = "profile" if resume_data.sources and resume_data.sources[0].get("profile") else "retrieval"
+        yield {"event": "stage", "data": {"stage": "retrieval", "status": "finished", "chunks": len(resume_data.contexts),
+                                          "mode": mode, "seconds": round(time.perf_counter() - started, 3)}}
+
+        if not resume_data.contexts:
+            yield {"event": "error", "data": {"message": NO_RESUME_MESSAGE}}
+            return
+
+        packed = get_prompt_builder(LETTER_MODEL).build(job_requirements, resume_data.contexts, resume_data.scores)
+        yield {"event": "stage", "data": {"stage": "generation", "status": "started", "input_tokens": packed.input_tokens}}
+        parts = []
+        self.last_usage = self._usage(packed)
+        try:
+            stream = await self.client.responses.create(
+                model=LETTER_MODEL,
+                max_output_tokens=2048,
+                input=packed.prompt,
+                temperature=1.0,
+                stream=True
+            )
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    parts.append(event.delta)
+                    yield {"event": "delta", "data": {"text": event.delta}}
+                elif event.type == "response.completed":
+                    self.last_usage = self._usage(packed, event.response.usage)
+                elif event.type == "response.failed":
+                    error = getattr(event.response, "error", None)
+                    raise RuntimeError(getattr(error, "message", None) or event.type)
+                elif event.type == "error":
+                    raise RuntimeError(getattr(event, "message", None) or event.type)
         except Exception as e:
-            return f"Ошибка при генерации сопроводительного письма: {str(e)}" 
-        
+            yield {"event": "error", "data": {"message": f"Ошибка при генерации сопроводительного письма: {str(e)}"}}
+            return
+
+        letter_content = "".join(parts)
+        await self._cache_letter(cache_key, letter_content)
+        letter = await self._save_letter(source_id, job_requirements, letter_content, job_url,
+                                         round(time.perf_counter() - generation_started))
+        self.last_letter_id = letter.id if letter else None
+        yield {"event": "done", "data": {"letter_content": letter_content, "source_id": source_id, "cached": False,
+                                         "letter_id": self.last_letter_id, "usage": self.last_usage}}
+
+    @staticmethod
+    def _usage(packed, response_usage=None) -> dict:
+        """Локальный подсчет токенов промпта и, если есть, фактическое usage модели"""
+        usage = {"cached": False, **packed.usage()}
+        if response_usage is not None:
+            usage["api_input_tokens"] = response_usage.input_tokens
+            usage["api_output_tokens"] = response_usage.output_tokens
+        return usage
+
+    async def _owns_cv(self, source_id: int, user_id: int) -> bool:
+        """CV существует и принадлежит пользователю (без БД проверять нечего)"""
+        if self.cv_repository is None:
+            return True
+        cv = await self.cv_repository.get_cv_by_source_id(str(source_id))
+        return cv is not None and cv.user_id == user_id
+
+    async def _letter_cache_key(self, source_id: int, job_requirements: str) -> Optional[tuple[str, int]]:
+        """(ключ кэша, cv_id) или None, если кэш выключен или CV не найдено"""
+        if not settings.LETTER_CACHE_ENABLED or self.cv_repository is None:
+            return None
+        cv = await self.cv_repository.get_cv_by_source_id(str(source_id))
+        if cv is None:
+            return None
+        return letter_cache_key(cv_version(cv), job_requirements), cv.id
+
+    async def _get_cached_letter(self, cache_key: Optional[tuple[str, int]]) -> Optional[str]:
+        if cache_key is None:
+            return None
+        entry = await self.letter_cache_repository.get_fresh(cache_key[0])
+        if entry is None:
+            return None
+        await self.letter_cache_repository.record_hit(entry)
+        return entry.letter_content
+
+    async def _cache_letter(self, cache_key: Optional[tuple[str, int]], letter_content: str):
+        if cache_key is None or not letter_content:
+            return
+        key, cv_id = cache_key
+        await self.letter_cache_repository.save(key, cv_id, LETTER_MODEL, CACHE_PROMPT_VERSION, letter_content,
+                                                settings.LETTER_CACHE_TTL)
+
+    async def _resume_context(self, source_id: int, job_requirements: str, user_id: int) -> RAGSearchResult:
+        """
+        Контекст резюме для промпта
+
+        В режиме LETTER_CONTEXT_MODE=profile используется профиль CV, построенный при загрузке
+        (без embedding и поиска); если профиля нет или он устарел - обычный retrieval.
+        """
+        profile_context = await self._profile_context(source_id)
+        if profile_context is not None:
+            return profile_context
+        return await self._search_resume_data(source_id, job_requirements, user_id)
+
+    async def _profile_context(self, source_id: int) -> Optional[RAGSearchResult]:
+        """Актуальный профиль CV в виде разделов промпта или None (тогда нужен retrieval)"""
+        if settings.LETTER_CONTEXT_MODE != "profile" or self.cv_repository is None:
+            return None
+        cv = await self.cv_repository.get_cv_by_source_id(str(source_id))
+        if not (cv and cv.profile and (not cv.content_hash or cv.profile_hash == cv.content_hash)):
+            return None
+        sections = profile_sections(cv.profile)
+        if not sections:
+            return None
+        return RAGSearchResult(
+            contexts=sections,
+            sources=[{"source_id": str(source_id), "profile": True} for _ in sections],
+            # Разделы уже упорядочены по важности
+            scores=[float(len(sections) - i) for i in range(len(sections))]
+        )
+
+    async def _search_resume_data(self, source_id: int, job_requirements: str, user_id: int,
+                                  top_k: int = settings.RETRIEVAL_TOP_K) -> RAGSearchResult:
+        """
+        Ищет в резюме чанки под каждое требование вакансии (только чанки этого CV)
+
+        Требования разбиваются на отдельные утверждения, все они эмбеддятся одним запросом
+        и ищутся одним batch-запросом к векторной базе; результаты объединяются без дублей
+        и отбираются по MMR, чтобы контекст покрывал разные требования.
+        """
+        # Поиск ограничен данными запросившего пользователя (tenant), а не владельца source_id
+        queries = split_requirements(job_requirements, settings.RETRIEVAL_MAX_QUERIES) or [SKILLS_QUERY]
+        query_vectors = await self.pdf_service.embed_texts(queries)
+        # Фильтр по source_id применяется внутри векторной базы (payload index)
+        hit_lists = await self.storage.search_batch(
+            query_vectors,
+            top_k=settings.RETRIEVAL_PER_QUERY_K,
+            source_id=source_id,
+            user_id=user_id,
+            with_vectors=True
+        )
+        hits = [hit for hit in merge_hits(hit_lists) if hit.payload.get("text")]
+        hits = mmr(hits, top_k, settings.RETRIEVAL_MMR_DIVERSITY)
+        return RAGSearchResult(
+            contexts=[hit.payload["text"] for hit in hits],
+            sources=[hit.payload for hit in hits],
+            scores=[hit.score for hit in hits]
+        )
+
     async def add_cv(self, user_id: int, pdf_path: str, source_id: str, filename: str = None,
                     original_filename: str = None, file_size: int = 0, content_type: str = "application/pdf",
-                    upload_ip: str = None, user_agent: str = None):
+                    upload_ip: str = None, user_agent: str = None, content_hash: str = None) -> IngestionJob:
         """
-        Загружает CV в векторную базу данных и сохраняет метаданные в PostgreSQL
+        Сохраняет метаданные CV в PostgreSQL и ставит загрузку в векторную базу в очередь
 
         Args:
             user_id: ID пользователя, которому принадлежит CV
@@ -133,8 +389,12 @@ class LetterService():
             content_type: MIME тип файла
             upload_ip: IP адрес загрузки
             user_agent: User agent браузера
+            content_hash: sha256 файла (для дедупликации одинаковых загрузок)
+
+        Returns:
+            IngestionJob: Задача обработки, выполняемая воркером (python -m app.worker)
         """
-        await self.pdf_service.add_cv(
+        return await IngestionService(self.session, self.pdf_service).enqueue_cv(
             user_id=user_id,
             pdf_path=pdf_path,
             source_id=source_id,
@@ -143,32 +403,453 @@ class LetterService():
             file_size=file_size,
             content_type=content_type,
             upload_ip=upload_ip,
-            user_agent=user_agent
+            user_agent=user_agent,
+            content_hash=content_hash
         )
     
 
-    async def generate_by_url(self, job_url: str, source_id: int) -> str:
+    async def generate_by_url(self, job_url: str, source_id: int, user_id: int, regenerate: bool = False) -> str:
         """
         Генерирует сопроводительное письмо на основе URL вакансии и данных из резюме
 
+        Этапы выполняются как граф: парсинг вакансии и загрузка профиля CV идут параллельно,
+        кэш писем проверяется сразу после парсинга, retrieval (если профиля нет и письма нет
+        в кэше) ждет требований, генерация - контекста. Время каждого этапа сохраняется
+        в last_timings.
+
         Args:
             job_url: URL страницы с вакансией
             source_id: ID источника резюме в базе данных
+            user_id: ID пользователя, запросившего письмо (CV должно принадлежать ему)
+            regenerate: Игнорировать кэш писем и сгенерировать заново
 
         Returns:
             str: Сгенерированное сопроводительное письмо
         """
-        # Шаг 1: Парсим требования из URL вакансии
-        job_requirements = await self._parse_job_requirements_from_url(job_url)
+        self.last_usage = None
+        self.last_letter_id = None
+        if not await self._owns_cv(source_id, user_id):
+            return NO_RESUME_MESSAGE
+
+        def _parsed(requirements: str) -> bool:
+            return bool(requirements) and not requirements.startswith("Ошибка")
+
+        async def _cached(requirements: str) -> Optional[str]:
+            if regenerate or not _parsed(requirements):
+                return None
+            return await self._get_cached_letter(await self._letter_cache_key(source_id, requirements))
+
+        async def _context(requirements: str, profile: Optional[RAGSearchResult],
+                           cache: Optional[str]) -> Optional[RAGSearchResult]:
+            # При попадании в кэш retrieval не нужен
+            if cache is not None or not _parsed(requirements):
+                return None
+            return profile or await self._search_resume_data(source_id, requirements, user_id)
+
+        async def _letter(requirements: str, cache: Optional[str],
+                          context: Optional[RAGSearchResult]) -> tuple[str, Optional[dict]]:
+            if cache is not None:
+                return cache, {"cached": True}
+            if context is None:
+                return requirements, None
+            # Кэш уже проверен на этапе cache, повторно не читаем
+            return await self._generate_letter(requirements, source_id, user_id, True, context, job_url)
+
+        graph = StageGraph(f"generate_by_url({source_id})")
+        graph.add("requirements", lambda: self._get_job_requirements(job_url))
+        graph.add("profile", lambda: self._profile_context(source_id))
+        graph.add("cache", _cached, depends_on=("requirements",))
+        graph.add("context", _context, depends_on=("requirements", "profile", "cache"))
+        graph.add("letter", _letter, depends_on=("requirements", "cache", "context"))
+        try:
+            results = await graph.run()
+        finally:
+            self.last_timings = graph.timings
+
+        letter_content, self.last_usage = results["letter"]
+        return letter_content
+
+    async def stream_by_url(self, job_url: str, source_id: int, user_id: int,
+                            regenerate: bool = False) -> AsyncIterator[dict]:
+        """
+        Потоковая генерация письма по URL вакансии: сначала этап парсинга, затем stream_cover_letter
+
+        Профиль CV загружается параллельно с парсингом вакансии.
+
+        Yields:
+            dict: События как в stream_cover_letter
+        """
+        if not await self._owns_cv(source_id, user_id):
+            yield {"event": "error", "data": {"message": NO_RESUME_MESSAGE}}
+            return
+        yield {"event": "stage", "data": {"stage": "parsing", "status": "started"}}
+        started = time.perf_counter()
+        profile_task = asyncio.create_task(self._profile_context(source_id))
+        try:
+            job_requirements = await self._get_job_requirements(job_url)
+        except BaseException:
+            profile_task.cancel()
+            raise
+        parsing_seconds = round(time.perf_counter() - started, 3)
+        profile_context = await profile_task
+        if not job_requirements or job_requirements.startswith("Ошибка"):
+            yield {"event": "error", "data": {"message": job_requirements or "Не удалось получить требования вакансии"}}
+            return
+        yield {"event": "stage", "data": {"stage": "parsing", "status": "finished", "seconds": parsing_seconds}}
+
+        async for event in self.stream_cover_letter(job_requirements, source_id, user_id, regenerate, profile_context,
+                                                    job_url):
+            yield event
+
+    async def generate_bulk(self, items: list[dict], source_id: int, user_id: int,
+                            regenerate: bool = False) -> AsyncIterator[dict]:
+        """
+        Генерирует письма для нескольких вакансий с ограничением параллельности (BULK_CONCURRENCY)
+
+        Профиль CV загружается один раз на весь запрос; без профиля контекст ищется под
+        требования каждой вакансии. Каждая вакансия обрабатывается в своей сессии БД:
+        ошибка одной не оставляет общую сессию в сломанной транзакции.
+
+        Args:
+            items: [{"url": ...} или {"name": ..., "description": ...}]
+            source_id: ID источника резюме в базе данных
+            user_id: ID пользователя, запросившего письма (CV должно принадлежать ему)
+            regenerate: Игнорировать кэш писем
+
+        Yields:
+            dict: {"event": "item", "data": {...}} по мере готовности, затем {"event": "done", ...}
+        """
+        if not await self._owns_cv(source_id, user_id):
+            yield {"event": "error", "data": {"message": NO_RESUME_MESSAGE}}
+            return
+        resume_data = await self._profile_context(source_id)
+        semaphore = asyncio.Semaphore(settings.BULK_CONCURRENCY)
+
+        async def _limited(index, item):
+            async with semaphore:
+                try:
+                    return await self._in_own_session(
+                        lambda service: service._bulk_item(index, item, source_id, user_id, regenerate, resume_data)
+                    )
+                except Exception as e:
+                    logger.error("Bulk letter item %s failed", index, exc_info=True)
+                    return {"index": index, "url": item.get("url"), "name": item.get("name"),
+                            "status": "error", "error": f"Ошибка при генерации сопроводительного письма: {str(e)}"}
+
+        tasks = [asyncio.create_task(_limited(index, item)) for index, item in enumerate(items)]
+        succeeded = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                succeeded += result["status"] == "done"
+                yield {"event": "item", "data": result}
+        finally:
+            # Клиент отключился - незавершенные генерации не нужны
+            for task in tasks:
+                task.cancel()
+        yield {"event": "done", "data": {"total": len(items), "succeeded": succeeded, "failed": len(items) - succeeded}}
+
+    async def _in_own_session(self, fn: Callable[["LetterService"], Awaitable[Any]]) -> Any:
+        """Выполняет fn с сервисом на отдельной сессии БД (ошибка одной вакансии не ломает общую сессию)"""
+        if self.session is None:
+            return await fn(self)
+        with Session(self.session.get_bind()) as session:
+            return await fn(LetterService(session, self.container))
+
+    async def _bulk_item(self, index: int, item: dict, source_id: int, user_id: int, regenerate: bool,
+                         resume_data: Optional[RAGSearchResult]) -> dict:
+        started = time.perf_counter()
+        result = {"index": index, "url": item.get("url"), "name": item.get("name")}
+        job_requirements = await self._item_requirements(item)
+        if not job_requirements or job_requirements.startswith("Ошибка"):
+            letter_content = job_requirements or "Не удалось получить требования вакансии"
+            usage = None
+        else:
+            letter_content, usage = await self._generate_letter(job_requirements, source_id, user_id, regenerate,
+                                                                resume_data, item.get("url"))
+        if letter_content.startswith(("Ошибка", "Не найдены", "Не удалось")):
+            result.update(status="error", error=letter_content)
+        else:
+            result.update(status="done", letter_content=letter_content, usage=usage)
+        result["elapsed"] = round(time.perf_counter() - started, 3)
+        return result
+
+    async def _item_requirements(self, item: dict) -> str:
+        if item.get("url"):
+            return await self._get_job_requirements(item["url"])
+        return "\n".join(part for part in (item.get("name"), item.get("description")) if part)
+
+    async def submit_bulk_batch(self, items: list[dict], source_id: int, user_id: int) -> LetterBatch:
+        """
+        Отложенная генерация писем через OpenAI Batch API (в два раза дешевле, результат до 24 ч)
+
+        Требования вакансий и промпты готовятся сразу, каждая вакансия в своей сессии БД;
+        письма, уже лежащие в кэше, и вакансии, подготовка которых не удалась, попадают
+        в результаты без запроса. Остальные отправляются одним batch-файлом, статус
+        проверяется через poll_bulk_batch.
+
+        Returns:
+            LetterBatch: Запись batch-задачи
+        """
+        cv = await self.cv_repository.get_cv_by_source_id(str(source_id))
+        if cv is None or cv.user_id != user_id:
+            raise ValueError(NO_RESUME_MESSAGE)
+        profile_context = await self._profile_context(source_id)
+        semaphore = asyncio.Semaphore(settings.BULK_CONCURRENCY)
+
+        async def _prepare(index, item):
+            async with semaphore:
+                try:
+                    return await self._in_own_session(
+                        lambda service: service._prepare_batch_item(item, source_id, user_id, profile_context)
+                    )
+                except Exception as e:
+                    logger.error("Bulk batch item %s failed", index, exc_info=True)
+                    return {"status": "error", "error": f"Ошибка при подготовке вакансии: {str(e)}"}
+
+        batch_items, results, lines = [], {}, []
+        prepared = await asyncio.gather(*(_prepare(index, item) for index, item in enumerate(items)))
+        for index, (item, result) in enumerate(zip(items, prepared)):
+            if result["status"] != "pending":
+                results[str(index)] = result
+                continue
+            job_requirements, resume_data, cache_key = result["job_requirements"], result["resume_data"], result["cache_key"]
+            custom_id = f"item-{index}"
+            packed = get_prompt_builder(LETTER_MODEL).build(job_requirements, resume_data.contexts, resume_data.scores)
+            lines.append(batch_request_line(custom_id, LETTER_MODEL, packed.prompt))
+            batch_items.append({
+                "index": index,
+                "custom_id": custom_id,
+                "url": item.get("url"),
+                "name": item.get("name"),
+                "job_requirements": job_requirements,
+                "cache_key": list(cache_key) if cache_key else None,
+                "input_tokens": packed.input_tokens,
+            })
+
+        if not lines:
+            return await self.letter_batch_repository.create_batch(
+                cv.id, cv.source_id, batch_items, results, status="completed"
+            )
+
+        input_file = await self.client.files.create(
+            file=("letters.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        remote = await self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/responses",
+            completion_window=settings.LETTER_BATCH_COMPLETION_WINDOW,
+            metadata={"source_id": str(source_id)}
+        )
+        return await self.letter_batch_repository.create_batch(
+            cv.id, cv.source_id, batch_items, results, openai_batch_id=remote.id, status=remote.status
+        )
+
+    async def _prepare_batch_item(self, item: dict, source_id: int, user_id: int,
+                                  profile_context: Optional[RAGSearchResult]) -> dict:
+        """Требования, контекст и ключ кэша одной вакансии batch-задачи (status=pending), либо готовый результат"""
+        job_requirements = await self._item_requirements(item)
         if not job_requirements or job_requirements.startswith("Ошибка"):
-            return job_requirements
+            return {"status": "error", "error": job_requirements or "Не удалось получить требования вакансии"}
+        resume_data = profile_context or await self._search_resume_data(source_id, job_requirements, user_id)
+        if not resume_data.contexts:
+            return {"status": "error", "error": NO_RESUME_MESSAGE}
+        cache_key = await self._letter_cache_key(source_id, job_requirements)
+        cached = await self._get_cached_letter(cache_key)
+        if cached is not None:
+            return {"status": "done", "letter_content": cached, "cached": True}
+        return {"status": "pending", "job_requirements": job_requirements, "resume_data": resume_data,
+                "cache_key": cache_key}
+
+    async def poll_bulk_batch(self, batch_id: int, user_id: int) -> Optional[LetterBatch]:
+        """
+        Проверяет статус batch-задачи в OpenAI; по завершении сохраняет письма в результаты и кэш
+
+        Результаты сохраняет только один из одновременных опросов: он переводит задачу
+        в статус completing условным UPDATE, остальные возвращают ее как есть.
+
+        Args:
+            batch_id: ID batch-задачи
+            user_id: ID пользователя (задача должна быть создана для его CV)
+
+        Returns:
+            LetterBatch: Обновленная запись или None, если задача не найдена
+        """
+        batch = await self.letter_batch_repository.get_batch_by_id(batch_id)
+        if batch is None:
+            return None
+        cv = await self.cv_repository.get_cv_by_id(batch.cv_id)
+        if cv is None or cv.user_id != user_id:
+            return None
+        if batch.status in ("completed", "failed", "expired", "cancelled"):
+            return batch
+
+        remote = await self.client.batches.retrieve(batch.openai_batch_id)
+        if remote.status in ("failed", "expired", "cancelled"):
+            errors = getattr(remote, "errors", None)
+            messages = [e.message for e in (errors.data or [])] if errors and errors.data else []
+            return await self.letter_batch_repository.update_batch(batch, {
+                "status": remote.status,
+                "error": "; ".join(messages) or None,
+                "completed_at": datetime.utcnow()
+            })
+        if remote.status != "completed":
+            if remote.status != batch.status and batch.status != "completing":
+                batch = await self.letter_batch_repository.update_batch(batch, {"status": remote.status})
+            return batch
+
+        if not await self.letter_batch_repository.claim_completion(batch.id, settings.LETTER_BATCH_CLAIM_TIMEOUT):
+            # Результаты уже сохраняет другой запрос
+            return await self.letter_batch_repository.get_batch_by_id(batch_id)
+
+        outputs = {}
+        for file_id in (remote.output_file_id, remote.error_file_id):
+            if file_id:
+                outputs.update(parse_batch_output((await self.client.files.content(file_id)).text))
+
+        results = dict(batch.results)
+        for item in batch.items:
+            letter_content, error = outputs.get(item["custom_id"], (None, "Нет результата в ответе Batch API"))
+            if not letter_content:
+                results[str(item["index"])] = {"status": "error", "error": error or "Пустой ответ модели"}
+                continue
+            results[str(item["index"])] = {"status": "done", "letter_content": letter_content}
+            await self._cache_letter(tuple(item["cache_key"]) if item.get("cache_key") else None, letter_content)
+            await self._save_letter(batch.source_id, item["job_requirements"], letter_content, item.get("url"))
 
-        # Шаг 2: Получаем данные из резюме и генерируем письмо
-        return await self.generate_cover_letter(job_requirements, source_id)
+        return await self.letter_batch_repository.update_batch(batch, {
+            "status": "completed",
+            "results": results,
+            "completed_at": datetime.utcnow()
+        })
+
+    async def get_letter_history(self, user_id: int, source_id: int = None, cursor: str = None,
+                                 limit: int = settings.LETTER_HISTORY_PAGE_SIZE) -> Optional[dict]:
+        """
+        Страница истории писем пользователя (или одного его CV), новые первыми
+
+        Keyset-пагинация по (created_at, id): каждая страница - один запрос по составному
+        индексу без OFFSET, поэтому ее стоимость не растет с длиной истории.
+
+        Args:
+            user_id: ID владельца писем
+            source_id: ID источника резюме; без него - письма по всем CV пользователя
+            cursor: next_cursor предыдущей страницы
+            limit: Размер страницы
+
+        Returns:
+            dict: items (без текста писем) и next_cursor (None на последней странице)
+                или None, если у пользователя нет такого CV
+
+        Raises:
+            ValueError: Некорректный курсор
+        """
+        position = decode_cursor(cursor) if cursor else None
+        if source_id is not None:
+            cv = await self.cv_repository.get_cv_by_source_id(str(source_id))
+            if cv is None or cv.user_id != user_id:
+                return None
+            rows = await self.letter_repository.get_history_page(limit + 1, position, cv_id=cv.id)
+        else:
+            rows = await self.letter_repository.get_history_page(limit + 1, position, user_id=user_id)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+        return {"items": rows, "next_cursor": next_cursor}
+
+    async def get_letter(self, user_id: int, letter_id: int) -> Optional[Letter]:
+        """Письмо из истории, если оно принадлежит пользователю"""
+        letter = await self.letter_repository.get_letter_by_id(letter_id)
+        if letter is None or letter.user_id != user_id:
+            return None
+        return letter
+
+    async def _get_job_requirements(self, job_url: str) -> str:
+        """
+        Требования вакансии: из кэша (по URL или по похожей вакансии), иначе разбором страницы
+
+        URL приходит от пользователя: адреса вне публичного интернета (localhost, внутренняя
+        сеть, metadata-сервисы) отклоняются до кэша и до скачивания страницы.
+        """
+        try:
+            await resolve_public_address(job_url)
+        except UnsafeURLError as e:
+            logger.warning("Rejected job URL %s: %s", job_url, e)
+            return f"Ошибка: недопустимый URL вакансии ({e})"
+        if not settings.JOB_CACHE_ENABLED or self.session is None:
+            page_html = await fetch_page_html(self.container.http, job_url) if settings.JOB_EXTRACT_ENABLED else None
+            return await self._parse_job_requirements(job_url, await job_posting_from_page(job_url, page_html))
+        cache = JobRequirementsCache(self.session, self.container)
+        return await cache.get_or_parse(job_url, self._parse_job_requirements)
+
+    async def _parse_job_requirements(self, job_url: str, posting: Optional[str] = None) -> str:
+        """
+        Требования вакансии из текста скачанной страницы дешевой моделью, иначе через web search
+
+        Args:
+            job_url: URL страницы с вакансией (уже проверенный в _get_job_requirements)
+            posting: Очищенный текст страницы (job_posting_from_page), если его удалось получить
+
+        Returns:
+            str: Извлеченные требования к вакансии
+        """
+        if settings.JOB_EXTRACT_ENABLED:
+            if posting:
+                requirements = await self._extract_job_requirements(job_url, posting)
+                if requirements:
+                    return requirements
+            logger.info("Local extraction failed for %s, falling back to web search", job_url)
+        return await self._parse_job_requirements_from_url(job_url)
+
+    async def _extract_job_requirements(self, job_url: str, posting: str) -> Optional[str]:
+        """Требования из очищенного текста страницы (без web search); None - текст не похож на вакансию"""
+        try:
+            response = await self.client.responses.create(
+                model=settings.JOB_EXTRACT_MODEL,
+                instructions=JOB_EXTRACT_PROMPT,
+                input=posting,
+                max_output_tokens=1500,
+                temperature=0
+            )
+        except Exception as e:
+            logger.warning("Job requirements extraction failed for %s: %s", job_url, e)
+            return None
+        requirements = response.output_text.strip()
+        if not requirements or NO_JOB_POSTING in requirements:
+            return None
+        logger.info("Extracted job requirements for %s locally (%d chars of page text)", job_url, len(posting))
+        return requirements
+
+    async def _save_letter(self, source_id: int, job_requirements: str, letter_content: str, job_url: str = None,
+                           generation_time: int = None) -> Optional[Letter]:
+        """Сохраняет письмо в историю вместе с требованиями (для URL они переиспользуются при парсинге)"""
+        if self.letter_repository is None or not letter_content or letter_content.startswith(("Ошибка", "Не найдены")):
+            return None
+        cv = await self.cv_repository.get_cv_by_source_id(str(source_id))
+        if cv is None:
+            return None
+        title = next(
+            (line.strip(" #*-:") for line in job_requirements.splitlines() if line.strip(" #*-:")),
+            job_url or "Без названия"
+        )
+        return await self.letter_repository.create_letter(
+            cv_id=cv.id,
+            user_id=cv.user_id,
+            source_id=source_id,
+            job_title=title[:200],
+            job_url=job_url_key(job_url) if job_url else None,
+            job_requirements=job_requirements,
+            letter_content=letter_content,
+            generation_time=generation_time,
+            model_used=LETTER_MODEL
+        )
 
     async def _parse_job_requirements_from_url(self, job_url: str) -> str:
         """
-        Парсит требования к вакансии из URL страницы
+        Парсит требования к вакансии из URL страницы через web search
 
         Args:
             job_url: URL страницы с вакансией
@@ -179,20 +860,11 @@ class LetterService():
         prompt = f"""
         Проанализируй страницу вакансии по URL: {job_url}
         Затем пиши на том языке, на котором информация на странице вакансии.
-        Извлеки и суммируй следующую информацию:
-        - Название вакансии
-        - Основные обязанности
-        - Требуемые навыки и компетенции
-        - Требуемый опыт работы
-        - Образование и квалификация
-        - Дополнительные требования
-
-        Представь информацию в структурированном виде.
-        """
+        {JOB_FIELDS_PROMPT}"""
 
         try:
-            response = self.client.responses.create(
-                model="gpt-4.1-mini",
+            response = await self.client.responses.create(
+                model=PARSE_MODEL,
                 tools=[{ "type": "web_search_preview" }],
                 input=prompt
             )
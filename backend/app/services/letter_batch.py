@@ -0,0 +1,47 @@
+import json
+from typing import Optional
+
+
+def batch_request_line(custom_id: str, model: str, prompt: str, max_output_tokens: int = 2048,
+                       temperature: float = 1.0) -> str:
+    """One JSONL line of a Batch API input file for the Responses endpoint"""
+    return json.dumps({
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": "/v1/responses",
+        "body": {
+            "model": model,
+            "input": prompt,
+            "max_output_tokens": max_output_tokens,
+            "temperature": temperature,
+        },
+    }, ensure_ascii=False)
+
+
+def response_output_text(body: dict) -> str:
+    """Concatenated output_text parts of a raw Responses API body (what SDK's output_text returns)"""
+    return "".join(
+        content.get("text", "")
+        for item in body.get("output") or []
+        if item.get("type") == "message"
+        for content in item.get("content") or []
+        if content.get("type") == "output_text"
+    )
+
+
+def parse_batch_output(text: str) -> dict[str, tuple[Optional[str], Optional[str]]]:
+    """custom_id -> (letter text, error) from a Batch API output or error file"""
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if record.get("error"):
+            results[record["custom_id"]] = (None, record["error"].get("message") or str(record["error"]))
+        elif response.get("status_code") != 200:
+            error = (response.get("body") or {}).get("error") or {}
+            results[record["custom_id"]] = (None, error.get("message") or f"HTTP {response.get('status_code')}")
+        else:
+            results[record["custom_id"]] = (response_output_text(response.get("body") or {}), None)
+    return results
@@ -1,77 +1,170 @@
+import asyncio
+import hashlib
+import logging
 import time
-from openai import OpenAI
-from llama_index.readers.file import PDFReader
-from llama_index.core.node_parser import SentenceSplitter
+import uuid
 from dotenv import load_dotenv
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.storage.repository.qdrant import QdrantStorage
 from app.repository.cv_repository import CVRepository
+from app.core.container import ServiceContainer, get_container
+from app.core.config import settings
 
 load_dotenv()
 
-EMBED_MODEL="text-embedding-3-large"
-EMBED_DIM=3072
+logger = logging.getLogger(__name__)
+
+# Fixed namespace: point ids must be identical across processes and restarts
+POINT_ID_NAMESPACE = uuid.UUID("5b0f7c1e-3f43-4c8e-9d2a-6a1f0c9e8b47")
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(source_id: str, chunk_index: int, content_hash: str) -> str:
+    """Deterministic Qdrant point id of a CV chunk"""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"{source_id}:{chunk_index}:{content_hash}"))
+
 
 class PdfService():
-    def __init__(self, session: AsyncSession = None):
-        self.reader = PDFReader()
-        self.client = OpenAI()
-        self.storage = QdrantStorage()
-        self.splitter = SentenceSplitter(chunk_size=1000, chunk_overlap=0)
+    def __init__(self, session: AsyncSession = None, container: ServiceContainer = None):
+        container = container or get_container()
+        self.parser = container.parser
+        self.embedder = container.embedder
+        self.storage = container.storage
+        self.profiler = container.profiler
         self.session = session
         self.cv_repository = CVRepository(session) if session else None
 
-    def upsert_vectors(self,pdf_path:str,original_filename: str,source_id:str,user_id:int):
-        """Embedding pdf файла и upsert в векторную БД."""
-        text_chunks = self._load_and_chunk_pdf(pdf_path)
-        vectors = self.embed_texts(text_chunks)
-        ids = [abs(hash(f"{original_filename}_{source_id}_{i+1}")) for i in range(len(text_chunks))]
+    async def upsert_vectors(self,pdf_path:str,original_filename: str,source_id:str,user_id:int,
+                             existing_points: list = None, content_hash: str = None) -> dict:
+        """
+        Embedding pdf файла и upsert в векторную БД.
+
+        Идемпотентно: id точек детерминированы (source_id, индекс, хэш чанка), поэтому
+        повторная загрузка перезаписывает точки, а устаревшие точки этого source_id удаляются.
+        Векторы чанков, хэши которых уже есть среди existing_points (по умолчанию - текущие
+        точки source_id), переиспользуются без повторного embedding.
+
+        Параллельно с embedding строится структурированный профиль CV (один раз на версию
+        содержимого); он сохраняется в строке cvs и коммитится вызывающим кодом.
+
+        Returns:
+            dict: chunks, reused, embedded, deleted, profile (построен ли новый профиль)
+        """
+        if existing_points is None:
+            existing_points = await self.storage.get_points_by_source_id(source_id, user_id=user_id)
+
+        text_chunks = await self._load_and_chunk_pdf(pdf_path)
+        profile_task = None
+        if self.cv_repository and settings.CV_PROFILE_ENABLED:
+            profile_task = asyncio.create_task(self._build_profile(source_id, text_chunks, content_hash))
+        try:
+            stats = await self._upsert_chunks(text_chunks, pdf_path, source_id, user_id, existing_points)
+        except BaseException:
+            if profile_task:
+                profile_task.cancel()
+            raise
+        stats["profile"] = await profile_task if profile_task else False
+        logger.info("Upserted CV %s: %s", source_id, stats)
+        return stats
+
+    async def _upsert_chunks(self, text_chunks: list[str], pdf_path: str, source_id: str, user_id: int,
+                             existing_points: list) -> dict:
+        hashes = [chunk_hash(chunk) for chunk in text_chunks]
+        ids = [chunk_point_id(source_id, i, h) for i, h in enumerate(hashes)]
+
+        reusable = {
+            point.payload["chunk_hash"]: point.vector
+            for point in existing_points
+            if point.payload and point.payload.get("chunk_hash") and point.vector is not None
+        }
+        existing_ids = {str(point.id) for point in existing_points}
+
+        missing = sorted({h: i for i, h in enumerate(hashes) if h not in reusable}.values())
+        if missing:
+            fresh = await self.embed_texts([text_chunks[i] for i in missing])
+            reusable.update({hashes[i]: vector for i, vector in zip(missing, fresh)})
+
+        # Points whose id already exists carry the same source_id, index and content
+        changed = [i for i, point_id in enumerate(ids) if point_id not in existing_ids]
         payloads = [
             {
                 "user_id":user_id,
-                "text": chunk,
+                "text": text_chunks[i],
                 "source": pdf_path,
                 "source_id": source_id,
-                "chunk_index": i
+                "chunk_index": i,
+                "chunk_hash": hashes[i]
             }
-            for i, chunk in enumerate(text_chunks)
+            for i in changed
         ]
-        self.storage.upsert(ids=ids, vectors=vectors, payloads=payloads)
-
-    async def add_cv(self, user_id: int, pdf_path: str, source_id: str, filename: str = None,
-                    original_filename: str = None, file_size: int = 0, content_type: str = "application/pdf",
-                    upload_ip: str = None, user_agent: str = None):
-        """Загружает CV в векторную БД и сохраняет метаданные в PostgreSQL"""
-        self.upsert_vectors(pdf_path, original_filename or filename, source_id, user_id)
-
-        # Save CV metadata to PostgreSQL if repository is available
-        if self.cv_repository:
-            existing_cv = await self.cv_repository.get_cv_by_source_id(source_id=source_id)
-            if existing_cv is None:
-                await self.cv_repository.create_cv(
-                    user_id=user_id,
-                    source_id=source_id,
-                    filename=filename or pdf_path.split('/')[-1],
-                    original_filename=original_filename or filename,
-                    file_path=pdf_path,
-                    file_size=file_size,
-                    content_type=content_type,
-                    upload_ip=upload_ip,
-                    user_agent=user_agent
-                )
-
-    def _load_and_chunk_pdf(self,path:str):
-        docs = self.reader.load_data(file=path)
-        texts = [d.text for d in docs if getattr(d,"text",None)]
-        chunks = []
-        for t in texts:
-            chunks.extend(self.splitter.split_text(t))
-        return chunks
+        stale_ids = await self.storage.get_point_ids_by_source_id(source_id, user_id=user_id) - set(ids)
+        if changed:
+            await self.storage.upsert(
+                ids=[ids[i] for i in changed],
+                vectors=[reusable[hashes[i]] for i in changed],
+                payloads=payloads
+            )
+        await self.storage.delete_points(stale_ids, user_id=user_id)
+
+        return {
+            "chunks": len(text_chunks),
+            "reused": len(text_chunks) - len(missing),
+            "embedded": len(missing),
+            "deleted": len(stale_ids),
+        }
+
+    async def _build_profile(self, source_id: str, text_chunks: list[str], content_hash: str = None) -> bool:
+        """Строит профиль CV, если для этой версии содержимого его ещё нет"""
+        cv = await self.cv_repository.get_cv_by_source_id(source_id)
+        if cv is None or not text_chunks:
+            return False
+        profile_hash = content_hash or hashlib.sha256(
+            "".join(chunk_hash(chunk) for chunk in text_chunks).encode("utf-8")
+        ).hexdigest()
+        if cv.profile and cv.profile_hash == profile_hash:
+            return False
+        try:
+            profile = await self.profiler.build(text_chunks)
+        except Exception:
+            # Без профиля письма генерируются через retrieval
+            logger.warning("Failed to build profile for CV %s", source_id, exc_info=True)
+            return False
+        await self.cv_repository.set_cv_profile(cv, profile, profile_hash)
+        return True
+
+    async def copy_vectors(self, from_source_id: str, source_id: str, user_id: int, pdf_path: str = None) -> dict:
+        """
+        Копирует точки уже обработанного идентичного CV под новый source_id без embedding.
+
+        Returns:
+            dict: Статистика как у upsert_vectors или None, если у исходных точек нет chunk_hash
+        """
+        points = await self.storage.get_points_by_source_id(from_source_id, user_id=user_id)
+        if not points or any(not (point.payload or {}).get("chunk_hash") for point in points):
+            return None
+
+        ids = []
+        payloads = []
+        for point in points:
+            payload = dict(point.payload)
+            payload.update({"user_id": user_id, "source_id": source_id, "source": pdf_path or payload.get("source")})
+            ids.append(chunk_point_id(source_id, payload["chunk_index"], payload["chunk_hash"]))
+            payloads.append(payload)
+
+        stale_ids = await self.storage.get_point_ids_by_source_id(source_id, user_id=user_id) - set(ids)
+        await self.storage.upsert(ids=ids, vectors=[point.vector for point in points], payloads=payloads)
+        await self.storage.delete_points(stale_ids, user_id=user_id)
+
+        stats = {"chunks": len(points), "reused": len(points), "embedded": 0, "deleted": len(stale_ids)}
+        logger.info("Copied CV %s points to %s: %s", from_source_id, source_id, stats)
+        return stats
+
+    async def _load_and_chunk_pdf(self,path:str) -> list[str]:
+        """Парсинг и chunking вне event loop (пул процессов, страницы параллельно)."""
+        return await self.parser.load_and_chunk(path)
     
-    def embed_texts(self,texts:list[str])-> list[list[float]]:
-        response =self.client.embeddings.create(
-            model=EMBED_MODEL,
-            dimensions=EMBED_DIM,
-            input=texts
-        )
-        return [item.embedding for item in response.data]
\ No newline at end of file
+    async def embed_texts(self,texts:list[str])-> list[list[float]]:
+        """Embedding текстов батчами с ограничением по токенам; порядок совпадает с входным."""
+        return await self.embedder.embed(texts)
\ No newline at end of file
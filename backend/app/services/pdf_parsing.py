@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+from pypdf import PdfReader
+from llama_index.core.node_parser import SentenceSplitter
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 0
+
+
+# The functions below run inside pool processes and must stay module-level (picklable)
+
+@lru_cache(maxsize=4)
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> SentenceSplitter:
+    return SentenceSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def count_pages(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def parse_and_chunk_pages(path: str, pages: list[int], chunk_size: int = CHUNK_SIZE,
+                          chunk_overlap: int = CHUNK_OVERLAP) -> list[list[str]]:
+    """Extract text of the given pages and split each page into chunks (one list per page)"""
+    reader = PdfReader(path)
+    splitter = _get_splitter(chunk_size, chunk_overlap)
+    result = []
+    for page in pages:
+        text = reader.pages[page].extract_text()
+        result.append(splitter.split_text(text) if text else [])
+    return result
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def pool_size() -> int:
+    return settings.PDF_PARSE_WORKERS or os.cpu_count() or 1
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=pool_size())
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def recycle_process_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Kill the workers of a pool that is stuck on a task and start a fresh pool on next use.
+
+    A future cannot stop a task that is already running in a worker process, so the
+    process itself has to go. Other tasks running in the same pool fail with
+    BrokenProcessPool (ingestion jobs are retried).
+    """
+    global _process_pool
+    if _process_pool is pool:
+        _process_pool = None
+    # ProcessPoolExecutor has no public way to stop running tasks
+    for process in list((pool._processes or {}).values()):
+        process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PdfParser():
+    """
+    Parses a PDF page by page and splits it into chunks.
+
+    In "process" mode pages are spread over a shared process pool, so CPU-bound
+    parsing never runs on the event loop and one document uses several cores; on
+    timeout the pool workers are killed and the pool is replaced. "inline" mode does
+    the same work in a single worker thread, which cannot be stopped on timeout.
+    """
+
+    def __init__(self, mode: str = settings.PDF_PARSE_MODE, timeout: float = settings.PDF_PARSE_TIMEOUT,
+                 chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+        if mode not in ("process", "inline"):
+            raise ValueError(f"Unknown PDF parse mode: {mode}")
+        self.mode = mode
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    async def load_and_chunk(self, path: str) -> list[str]:
+        """Chunks of the whole document in page order"""
+        pool = get_process_pool() if self.mode == "process" else None
+        try:
+            return await asyncio.wait_for(self._load_and_chunk(path, pool), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            if pool is not None:
+                logger.error("Parsing %s timed out, killing PDF parse workers", path)
+                recycle_process_pool(pool)
+            raise TimeoutError(f"Parsing {path} took longer than {self.timeout}s")
+
+    async def _load_and_chunk(self, path: str, pool: Optional[ProcessPoolExecutor]) -> list[str]:
+        if pool is None:
+            pages = await asyncio.to_thread(
+                lambda: parse_and_chunk_pages(path, list(range(count_pages(path))), self.chunk_size, self.chunk_overlap)
+            )
+            return [chunk for page in pages for chunk in page]
+
+        loop = asyncio.get_running_loop()
+        total = await loop.run_in_executor(pool, count_pages, path)
+        if total == 0:
+            return []
+
+        # Contiguous page ranges, one per pool worker, so every process opens the file once
+        groups = min(pool_size(), total)
+        size = -(-total // groups)
+        ranges = [list(range(start, min(start + size, total))) for start in range(0, total, size)]
+        futures = [
+            loop.run_in_executor(pool, parse_and_chunk_pages, path, pages, self.chunk_size, self.chunk_overlap)
+            for pages in ranges
+        ]
+        try:
+            parsed = await asyncio.gather(*futures)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return [chunk for group in parsed for page in group for chunk in page]
@@ -0,0 +1,87 @@
+import json
+import logging
+
+from openai import AsyncOpenAI
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_PROMPT = """
+Ты извлекаешь структурированный профиль кандидата из текста резюме.
+Верни JSON-объект строго такого вида (на языке резюме, без выдуманных фактов):
+{
+  "summary": "1-2 предложения о кандидате",
+  "skills": ["навык или технология", ...],
+  "roles": [{"title": "", "company": "", "period": "", "highlights": ["конкретный результат или задача", ...]}],
+  "achievements": ["измеримое достижение", ...],
+  "education": ["учебное заведение, степень, годы", ...],
+  "languages": ["язык - уровень", ...]
+}
+Пиши кратко: highlights до 4 пунктов на роль, без повторов между разделами.
+"""
+
+LIST_FIELDS = ("skills", "achievements", "education", "languages")
+
+
+def normalize_profile(data: dict) -> dict:
+    """Keep only the known fields with the expected types"""
+    profile = {"summary": str(data.get("summary") or "").strip()}
+    for field in LIST_FIELDS:
+        profile[field] = [str(item).strip() for item in data.get(field) or [] if str(item).strip()]
+    profile["roles"] = [
+        {
+            "title": str(role.get("title") or "").strip(),
+            "company": str(role.get("company") or "").strip(),
+            "period": str(role.get("period") or "").strip(),
+            "highlights": [str(h).strip() for h in role.get("highlights") or [] if str(h).strip()],
+        }
+        for role in data.get("roles") or []
+        if isinstance(role, dict)
+    ]
+    return profile
+
+
+def profile_sections(profile: dict) -> list[str]:
+    """Profile rendered as prompt chunks, most important first (summary and skills, then roles, ...)"""
+    sections = []
+    if profile.get("summary"):
+        sections.append(f"Кратко: {profile['summary']}")
+    if profile.get("skills"):
+        sections.append("Навыки: " + ", ".join(profile["skills"]))
+    for role in profile.get("roles") or []:
+        header = ", ".join(part for part in (role["title"], role["company"], role["period"]) if part)
+        lines = [f"Опыт: {header}"] + [f"  • {h}" for h in role["highlights"]]
+        sections.append("\n".join(lines))
+    if profile.get("achievements"):
+        sections.append("Достижения: " + "; ".join(profile["achievements"]))
+    if profile.get("education"):
+        sections.append("Образование: " + "; ".join(profile["education"]))
+    if profile.get("languages"):
+        sections.append("Языки: " + ", ".join(profile["languages"]))
+    return sections
+
+
+class ProfileService():
+    """Extracts a compact structured CV profile once at ingest time"""
+
+    def __init__(self, client: AsyncOpenAI, model: str = settings.CV_PROFILE_MODEL):
+        self.client = client
+        self.model = model
+
+    async def build(self, chunks: list[str]) -> dict:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            response_format={"type": "json_object"},
+            temperature=0,
+            messages=[
+                {"role": "system", "content": PROFILE_PROMPT},
+                {"role": "user", "content": "\n\n".join(chunks)},
+            ]
+        )
+        profile = normalize_profile(json.loads(response.choices[0].message.content or "{}"))
+        logger.info(
+            "Built CV profile: %d skills, %d roles, %d achievements",
+            len(profile["skills"]), len(profile["roles"]), len(profile["achievements"])
+        )
+        return profile
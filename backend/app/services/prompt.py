@@ -0,0 +1,117 @@
+import logging
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+
+import tiktoken
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bump on any change of the template or the packing rules (resets the letter cache)
+PROMPT_VERSION = "3"
+
+LETTER_PROMPT = """
+       Ты - помощник по созданию профессиональных сопроводительных писем.
+
+        У тебя есть:
+        1. Требования к вакансии: {job_requirements}
+        2. Данные из резюме кандидата: {resume_context}
+    Задача: на основе этих данных сгенерировать персонализированное сопроводительное письмо, которое
+        Показывает почему мой предыдущий опыт поможет в их работе
+        Имеет ключевые слова из резюме
+        Сопоставь (там где это максимально корректно) кейсы из моего релевантного опыта  к требованиям в вакансии, но так чтобы технологии соответствовали по смыслу
+        Пиши в профессиональном, но дружелюбном тоне
+        Избегай общих фраз и клише
+        Письмо должно быть на том языке, на котором написаны требования для вакансии. Объемом 200-300 слов.
+    """
+
+CHUNK_SEPARATOR = "\n\n"
+TRIMMED_MARK = "\n[...]"
+
+
+@dataclass
+class PackedPrompt:
+    """Assembled prompt and its token accounting"""
+    prompt: str
+    input_tokens: int
+    requirements_tokens: int
+    context_tokens: int
+    chunks_used: int
+    chunks_dropped: int
+    requirements_trimmed: bool
+
+    def usage(self) -> dict:
+        return {key: value for key, value in asdict(self).items() if key != "prompt"}
+
+
+class PromptBuilder():
+    """
+    Packs job requirements and resume chunks into the letter prompt under a token budget.
+
+    Tokens are counted locally with the model's tiktoken encoding. Requirements longer
+    than `max_requirements_tokens` are cut at a line boundary; chunks are added in order
+    of retrieval score while they fit the remaining budget.
+    """
+
+    def __init__(self, model: str, max_input_tokens: int = settings.PROMPT_MAX_INPUT_TOKENS,
+                 max_requirements_tokens: int = settings.PROMPT_MAX_REQUIREMENTS_TOKENS):
+        try:
+            self.encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("o200k_base")
+        self.max_input_tokens = max_input_tokens
+        self.max_requirements_tokens = max_requirements_tokens
+        self.template_tokens = self.count_tokens(LETTER_PROMPT.format(job_requirements="", resume_context=""))
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def build(self, job_requirements: str, chunks: list[str], scores: list[float] = None) -> PackedPrompt:
+        requirements, requirements_trimmed = self._trim(job_requirements.strip(), self.max_requirements_tokens)
+        requirements_tokens = self.count_tokens(requirements)
+
+        budget = self.max_input_tokens - self.template_tokens - requirements_tokens
+        order = range(len(chunks))
+        if scores:
+            order = sorted(order, key=lambda i: scores[i], reverse=True)
+
+        packed = []
+        context_tokens = 0
+        for i in order:
+            chunk = f"- {chunks[i]}"
+            tokens = self.count_tokens(chunk + CHUNK_SEPARATOR)
+            # A large chunk that does not fit may still leave room for smaller ones
+            if context_tokens + tokens > budget:
+                continue
+            packed.append(chunk)
+            context_tokens += tokens
+
+        prompt = LETTER_PROMPT.format(job_requirements=requirements, resume_context=CHUNK_SEPARATOR.join(packed))
+        result = PackedPrompt(
+            prompt=prompt,
+            input_tokens=self.count_tokens(prompt),
+            requirements_tokens=requirements_tokens,
+            context_tokens=context_tokens,
+            chunks_used=len(packed),
+            chunks_dropped=len(chunks) - len(packed),
+            requirements_trimmed=requirements_trimmed
+        )
+        logger.info("Letter prompt: %s", result.usage())
+        return result
+
+    def _trim(self, text: str, max_tokens: int) -> tuple[str, bool]:
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text, False
+        cut = self.encoding.decode(tokens[:max_tokens - self.count_tokens(TRIMMED_MARK)])
+        # Drop the partial last line unless that would remove most of the text
+        if "\n" in cut[len(cut) // 2:]:
+            cut = cut[:cut.rindex("\n")]
+        return cut.rstrip() + TRIMMED_MARK, True
+
+
+@lru_cache(maxsize=None)
+def get_prompt_builder(model: str) -> PromptBuilder:
+    """Process-wide builder per model (tiktoken encodings are expensive to load)"""
+    return PromptBuilder(model)
@@ -0,0 +1,71 @@
+import re
+
+import numpy as np
+
+from app.storage.repository.vector_storage import SearchHit
+
+# Bullets, numbering and markdown emphasis in front of a requirement line
+_BULLET = re.compile(r"^\s*(?:[-*•·–—>]+|\d+[.)]|#+)\s*")
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+def split_requirements(job_requirements: str, max_statements: int = 16, min_words: int = 3) -> list[str]:
+    """
+    Split a requirements text into individual requirement statements.
+
+    Lines (bullets) are split further into sentences; headings and fragments shorter
+    than `min_words` are dropped, duplicates removed, original order kept.
+    """
+    statements = []
+    seen = set()
+    for line in job_requirements.splitlines():
+        line = _BULLET.sub("", line).replace("**", "").strip()
+        for sentence in _SENTENCE_END.split(line):
+            sentence = sentence.strip(" :;")
+            key = sentence.lower()
+            if len(sentence.split()) < min_words or key in seen:
+                continue
+            seen.add(key)
+            statements.append(sentence)
+            if len(statements) >= max_statements:
+                return statements
+    return statements
+
+
+def merge_hits(hit_lists: list[list[SearchHit]]) -> list[SearchHit]:
+    """Union of per-query hits, each point once with its best score"""
+    best: dict[str, SearchHit] = {}
+    for hits in hit_lists:
+        for hit in hits:
+            if hit.id not in best or hit.score > best[hit.id].score:
+                best[hit.id] = hit
+    return sorted(best.values(), key=lambda hit: hit.score, reverse=True)
+
+
+def mmr(hits: list[SearchHit], top_k: int, diversity: float = 0.3) -> list[SearchHit]:
+    """
+    Maximal marginal relevance over merged hits.
+
+    Relevance is the hit score (best similarity to any requirement), redundancy the
+    highest cosine similarity to an already selected chunk. Hits without vectors are
+    ranked by score alone.
+    """
+    if top_k <= 0:
+        return []
+    if len(hits) <= top_k or any(hit.vector is None for hit in hits):
+        return hits[:top_k]
+
+    vectors = np.asarray([hit.vector for hit in hits], dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    relevance = np.asarray([hit.score for hit in hits], dtype=np.float32)
+    similarity = vectors @ vectors.T
+
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy()
+    while len(selected) < top_k:
+        scores = (1 - diversity) * relevance - diversity * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, similarity[best])
+    return [hits[i] for i in selected]
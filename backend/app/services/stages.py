@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class StageGraph():
+    """
+    Small DAG of async stages.
+
+    Every stage starts as soon as the stages it depends on have finished and receives
+    their results as keyword arguments, so independent stages run concurrently and the
+    total latency is the longest path. Wall time of each stage (excluding the wait for
+    its dependencies) and of the whole run is recorded in `timings`.
+    """
+
+    def __init__(self, name: str = "stages"):
+        self.name = name
+        self._stages: dict[str, tuple[Callable[..., Awaitable[Any]], tuple[str, ...]]] = {}
+        self.timings: dict[str, float] = {}
+
+    def add(self, name: str, fn: Callable[..., Awaitable[Any]], depends_on: tuple[str, ...] = ()) -> "StageGraph":
+        for dep in depends_on:
+            if dep not in self._stages:
+                raise ValueError(f"Stage {name} depends on unknown stage {dep}")
+        self._stages[name] = (fn, tuple(depends_on))
+        return self
+
+    async def run(self) -> dict[str, Any]:
+        """Run all stages, returning {stage name: result}; the first failure cancels the rest"""
+        started = time.perf_counter()
+        tasks: dict[str, asyncio.Task] = {}
+
+        async def _run(name: str):
+            fn, deps = self._stages[name]
+            inputs = {dep: await tasks[dep] for dep in deps}
+            stage_started = time.perf_counter()
+            try:
+                return await fn(**inputs)
+            finally:
+                self.timings[name] = round(time.perf_counter() - stage_started, 3)
+
+        for name in self._stages:
+            tasks[name] = asyncio.create_task(_run(name))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        finally:
+            self.timings["total"] = round(time.perf_counter() - started, 3)
+            logger.info("%s timings: %s", self.name, self.timings)
+        return {name: task.result() for name, task in tasks.items()}
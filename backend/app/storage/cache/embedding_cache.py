@@ -0,0 +1,122 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize unicode form and collapse whitespace so cosmetic differences share a key"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache():
+    """
+    Content-addressed embedding cache.
+
+    Keys are sha256 of (model, dimensions, normalized text). Lookups go to a bounded
+    in-memory LRU first and then, if `path` is set, to a local SQLite file that
+    survives restarts and is shared by all processes on the host.
+
+    Vectors are kept as packed float32 (4 bytes per dimension instead of a list of
+    Python floats, which costs about 32), both in memory and on disk. The methods
+    block on SQLite when `persistent`; async callers run them in a thread.
+    """
+
+    def __init__(self, max_entries: int = settings.EMBED_CACHE_SIZE, path: Optional[str] = settings.EMBED_CACHE_PATH):
+        self.max_entries = max_entries
+        self._memory: OrderedDict[str, array] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, dimensions: int, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{model}:{dimensions}:{digest}"
+
+    @property
+    def persistent(self) -> bool:
+        return self._db is not None
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Return cached vectors for the keys that are present"""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector.tolist()
+                else:
+                    missing.append(key)
+
+            if missing and self._db is not None:
+                for key, blob in self._select(missing):
+                    vector = array("f", blob)
+                    found[key] = vector.tolist()
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        packed = {key: array("f", vector) for key, vector in items.items()}
+        with self._lock:
+            for key, vector in packed.items():
+                self._remember(key, vector)
+            if self._db is not None and packed:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in packed.items()]
+                )
+                self._db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._memory),
+        }
+
+    def _remember(self, key: str, vector: array) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _select(self, keys: list[str]):
+        # SQLite limits the number of bound parameters per statement
+        for start in range(0, len(keys), 500):
+            part = keys[start:start + 500]
+            placeholders = ",".join("?" * len(part))
+            yield from self._db.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part)
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Process-wide cache shared by every EmbeddingService"""
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache()
+    return _embedding_cache
@@ -0,0 +1,332 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.storage.repository.vector_storage import SearchHit, StoredPoint, VectorStorage
+
+INITIAL_CAPACITY = 1024
+# Below this many candidate rows an exact scan is cheaper than probing IVF lists
+IVF_MIN_ROWS = 4096
+
+
+class NumpyStorage(VectorStorage):
+    """
+    Embedded vector store for small deployments, CI and benchmarks.
+
+    Normalized float32 vectors live in a memory-mapped file (one row per point),
+    payloads and the id -> row mapping in SQLite next to it. Search is a vectorized
+    exact dot product over the rows that pass the filter; with index="ivf" unfiltered
+    searches over large collections only scan the `ivf_probes` nearest k-means lists.
+
+    Several processes (API and ingestion worker) may share one directory. Every
+    operation runs in a SQLite transaction that doubles as the cross-process lock:
+    reads share it, writes take it exclusively, so rows are allocated from the
+    committed state. When another process has committed (PRAGMA data_version changed)
+    the in-memory row mapping is reloaded before the operation.
+    """
+
+    def __init__(self, path: str = settings.NUMPY_STORAGE_DIR, collection_name: str = settings.QDRANT_COLLECTION,
+                 dim: int = settings.EMBED_DIM, index: str = settings.NUMPY_INDEX,
+                 ivf_lists: int = settings.NUMPY_IVF_LISTS, ivf_probes: int = settings.NUMPY_IVF_PROBES):
+        if index not in ("flat", "ivf"):
+            raise ValueError(f"Unknown numpy index type: {index}")
+        self.directory = os.path.join(path, collection_name)
+        os.makedirs(self.directory, exist_ok=True)
+        self.collection = collection_name
+        self.dim = dim
+        self.index = index
+        self.ivf_lists = ivf_lists
+        self.ivf_probes = ivf_probes
+        self._lock = threading.RLock()
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        # Autocommit connection: transactions are opened explicitly in _transaction.
+        # The default rollback journal is required, in WAL mode readers would not block writers
+        self._db = sqlite3.connect(os.path.join(self.directory, "points.sqlite"), check_same_thread=False,
+                                   isolation_level=None, timeout=30)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            "id TEXT PRIMARY KEY, row INTEGER NOT NULL UNIQUE, source_id TEXT, user_id INTEGER, payload TEXT NOT NULL)"
+        )
+        self._centroids: Optional[np.ndarray] = None
+        self._ivf_trained = 0
+        self._data_version = None
+        with self._transaction(write=False):
+            pass
+
+    @contextmanager
+    def _transaction(self, write: bool):
+        """Hold the cross-process lock and bring the in-memory state up to date"""
+        with self._lock:
+            self._db.execute("BEGIN EXCLUSIVE" if write else "BEGIN")
+            try:
+                # The first read takes the shared lock, which is kept until the transaction ends
+                self._db.execute("SELECT 1 FROM points LIMIT 1").fetchall()
+                version = self._db.execute("PRAGMA data_version").fetchone()[0]
+                if version != self._data_version:
+                    self._load()
+                    self._data_version = version
+                yield
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                # In-memory state may be ahead of the rolled back rows
+                self._data_version = None
+                raise
+            self._db.execute("COMMIT")
+
+    def _load(self):
+        rows = self._db.execute("SELECT id, row, source_id, user_id FROM points").fetchall()
+        stored = os.path.getsize(self._vectors_path) // (self.dim * 4) if os.path.exists(self._vectors_path) else 0
+        capacity = max(INITIAL_CAPACITY, stored, max((row for _, row, _, _ in rows), default=-1) + 1)
+        self._open_vectors(capacity)
+
+        self._ids = np.empty(capacity, dtype=object)
+        self._sources = np.empty(capacity, dtype=object)
+        self._users = np.full(capacity, -1, dtype=np.int64)
+        self._active = np.zeros(capacity, dtype=bool)
+        self._lists = np.full(capacity, -1, dtype=np.int32)
+        self._row_of = {}
+        for point_id, row, source_id, user_id in rows:
+            self._set_meta(row, point_id, source_id, user_id)
+        self._free = [row for row in range(capacity - 1, -1, -1) if not self._active[row]]
+        if self._centroids is not None:
+            active = np.flatnonzero(self._active)
+            if len(active):
+                self._lists[active] = np.argmax(self._vectors[active] @ self._centroids.T, axis=1)
+
+    def _open_vectors(self, capacity: int):
+        size = capacity * self.dim * 4
+        if not os.path.exists(self._vectors_path) or os.path.getsize(self._vectors_path) < size:
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(size)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _grow(self):
+        old = len(self._active)
+        capacity = old * 2
+        self._vectors.flush()
+        del self._vectors
+        self._open_vectors(capacity)
+        self._ids = np.concatenate([self._ids, np.empty(old, dtype=object)])
+        self._sources = np.concatenate([self._sources, np.empty(old, dtype=object)])
+        self._users = np.concatenate([self._users, np.full(old, -1, dtype=np.int64)])
+        self._active = np.concatenate([self._active, np.zeros(old, dtype=bool)])
+        self._lists = np.concatenate([self._lists, np.full(old, -1, dtype=np.int32)])
+        self._free.extend(range(capacity - 1, old - 1, -1))
+
+    def _set_meta(self, row, point_id, source_id, user_id):
+        self._ids[row] = point_id
+        self._sources[row] = source_id
+        self._users[row] = -1 if user_id is None else int(user_id)
+        self._active[row] = True
+        self._row_of[point_id] = row
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _mask(self, source_id=None, user_id=None) -> np.ndarray:
+        mask = self._active.copy()
+        if source_id is not None:
+            mask &= self._sources == str(source_id)
+        if user_id is not None:
+            mask &= self._users == int(user_id)
+        return mask
+
+    # Public API runs the numpy/SQLite work in a thread so large scans do not block the event loop
+
+    async def upsert(self,ids,vectors,payloads):
+        await asyncio.to_thread(self._upsert_sync, ids, vectors, payloads)
+
+    async def search(self,query_vector,top_k:int=5,source_id=None,user_id=None):
+        """Nearest chunks, optionally restricted to one CV and/or user"""
+        return await asyncio.to_thread(self._search_sync, query_vector, top_k, source_id, user_id)
+
+    async def search_batch(self,query_vectors,top_k:int=5,source_id=None,user_id=None,with_vectors:bool=False):
+        """Several nearest-chunk queries scored with one matrix product"""
+        return await asyncio.to_thread(self._search_batch_sync, query_vectors, top_k, source_id, user_id, with_vectors)
+
+    async def delete_by_source_id(self, source_id: int, user_id: int = None):
+        """Delete all points with given source_id"""
+        await asyncio.to_thread(self._delete_by_source_id_sync, source_id, user_id)
+
+    async def delete_points(self, ids, user_id: int = None):
+        """Delete points by id"""
+        await asyncio.to_thread(self._delete_points_sync, ids, user_id)
+
+    async def get_points_by_source_id(self, source_id: int, user_id: int = None, with_vectors: bool = True,
+                                      with_payload: bool = True):
+        """Get all points for potential rollback"""
+        return await asyncio.to_thread(self._get_points_by_source_id_sync, source_id, user_id, with_vectors, with_payload)
+
+    def _upsert_sync(self,ids,vectors,payloads):
+        if not ids:
+            return
+        vectors = self._normalize(vectors)
+        with self._transaction(write=True):
+            records = []
+            rows = []
+            for point_id, vector, payload in zip(ids, vectors, payloads):
+                point_id = str(point_id)
+                row = self._row_of.get(point_id)
+                if row is None:
+                    if not self._free:
+                        self._grow()
+                    row = self._free.pop()
+                self._vectors[row] = vector
+                source_id = payload.get("source_id")
+                source_id = None if source_id is None else str(source_id)
+                self._set_meta(row, point_id, source_id, payload.get("user_id"))
+                rows.append(row)
+                records.append((point_id, row, source_id, payload.get("user_id"), json.dumps(payload)))
+            self._vectors.flush()
+            self._db.executemany("INSERT OR REPLACE INTO points (id, row, source_id, user_id, payload) VALUES (?, ?, ?, ?, ?)", records)
+            if self._centroids is not None:
+                rows = np.asarray(rows)
+                self._lists[rows] = np.argmax(self._vectors[rows] @ self._centroids.T, axis=1)
+
+    def _search_sync(self,query_vector,top_k:int=5,source_id=None,user_id=None):
+        query = self._normalize(query_vector)
+        with self._transaction(write=False):
+            rows = np.flatnonzero(self._mask(source_id=source_id, user_id=user_id))
+            if self.index == "ivf" and len(rows) >= IVF_MIN_ROWS:
+                rows = self._probe(rows, query)
+            if len(rows) == 0:
+                return {"contexts": [], "sources": []}
+            scores = self._vectors[rows] @ query
+            k = min(top_k, len(rows))
+            best = np.argpartition(-scores, k - 1)[:k]
+            best = best[np.argsort(-scores[best])]
+            point_ids = [self._ids[rows[i]] for i in best]
+            payloads = self._payloads(point_ids)
+
+        contexts = []
+        sources = []
+        for point_id in point_ids:
+            payload = payloads.get(point_id) or {}
+            text = payload.get("text","")
+            if text:
+                contexts.append(text)
+                sources.append(payload)
+        return {"contexts":contexts, "sources":sources}
+
+    def _search_batch_sync(self,query_vectors,top_k:int=5,source_id=None,user_id=None,with_vectors:bool=False):
+        if len(query_vectors) == 0:
+            return []
+        queries = self._normalize(query_vectors)
+        with self._transaction(write=False):
+            rows = np.flatnonzero(self._mask(source_id=source_id, user_id=user_id))
+            if len(rows) == 0:
+                return [[] for _ in range(len(queries))]
+            # Filtered batches (one CV) are small, so the exact scan is used even with index="ivf"
+            scores = self._vectors[rows] @ queries.T
+            k = min(top_k, len(rows))
+            best = np.argpartition(-scores, k - 1, axis=0)[:k].T
+            results = []
+            for q, candidates in enumerate(best):
+                candidates = candidates[np.argsort(-scores[candidates, q])]
+                results.append([(rows[i], float(scores[i, q])) for i in candidates])
+            point_ids = list({self._ids[row] for hits in results for row, _ in hits})
+            payloads = self._payloads(point_ids)
+            return [
+                [
+                    SearchHit(
+                        id=self._ids[row],
+                        score=score,
+                        payload=payloads.get(self._ids[row]) or {},
+                        vector=self._vectors[row].tolist() if with_vectors else None
+                    )
+                    for row, score in hits
+                ]
+                for hits in results
+            ]
+
+    def _delete_by_source_id_sync(self, source_id: int, user_id: int = None):
+        with self._transaction(write=True):
+            rows = np.flatnonzero(self._mask(source_id=source_id, user_id=user_id))
+            self._delete_rows(rows)
+
+    def _delete_points_sync(self, ids, user_id: int = None):
+        with self._transaction(write=True):
+            rows = [self._row_of[str(point_id)] for point_id in ids or [] if str(point_id) in self._row_of]
+            if user_id is not None:
+                rows = [row for row in rows if self._users[row] == int(user_id)]
+            self._delete_rows(rows)
+
+    def _get_points_by_source_id_sync(self, source_id: int, user_id: int = None, with_vectors: bool = True,
+                                      with_payload: bool = True):
+        with self._transaction(write=False):
+            rows = np.flatnonzero(self._mask(source_id=source_id, user_id=user_id))
+            point_ids = [self._ids[row] for row in rows]
+            payloads = self._payloads(point_ids) if with_payload else {}
+            return [
+                StoredPoint(
+                    id=point_id,
+                    vector=self._vectors[row].tolist() if with_vectors else None,
+                    payload=payloads.get(point_id) if with_payload else None
+                )
+                for point_id, row in zip(point_ids, rows)
+            ]
+
+    def build_ivf(self, iterations: int = 10, seed: int = 42):
+        """(Re)train IVF centroids with spherical k-means over all stored vectors"""
+        with self._transaction(write=False):
+            self._build_ivf(iterations, seed)
+
+    def _build_ivf(self, iterations: int, seed: int):
+        rows = np.flatnonzero(self._active)
+        if len(rows) == 0:
+            self._centroids = None
+            return
+        data = np.asarray(self._vectors[rows])
+        lists = min(self.ivf_lists, len(rows))
+        rng = np.random.default_rng(seed)
+        centroids = data[rng.choice(len(rows), size=lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(data @ centroids.T, axis=1)
+            for c in range(lists):
+                members = data[assignment == c]
+                if len(members):
+                    centroids[c] = self._normalize(members.sum(axis=0))
+        self._centroids = centroids
+        self._ivf_trained = len(rows)
+        self._lists[:] = -1
+        self._lists[rows] = np.argmax(data @ centroids.T, axis=1)
+
+    def _probe(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # Retrain once the collection has doubled since the last training
+        if self._centroids is None or self._active.sum() > 2 * self._ivf_trained:
+            self._build_ivf(iterations=10, seed=42)
+        probes = np.argsort(-(self._centroids @ query))[:self.ivf_probes]
+        return rows[np.isin(self._lists[rows], probes)]
+
+    def _delete_rows(self, rows):
+        if len(rows) == 0:
+            return
+        point_ids = [self._ids[row] for row in rows]
+        for row, point_id in zip(rows, point_ids):
+            self._active[row] = False
+            self._lists[row] = -1
+            self._row_of.pop(point_id, None)
+            self._free.append(int(row))
+        for start in range(0, len(point_ids), 500):
+            part = point_ids[start:start + 500]
+            self._db.execute(f"DELETE FROM points WHERE id IN ({','.join('?' * len(part))})", part)
+
+    def _payloads(self, point_ids: list[str]) -> dict:
+        result = {}
+        for start in range(0, len(point_ids), 500):
+            part = point_ids[start:start + 500]
+            for point_id, payload in self._db.execute(
+                f"SELECT id, payload FROM points WHERE id IN ({','.join('?' * len(part))})", part
+            ):
+                result[point_id] = json.loads(payload)
+        return result
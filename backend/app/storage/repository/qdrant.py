@@ -1,26 +1,328 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance,PointStruct
+import asyncio
+import logging
+from typing import Optional
 
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import (
+    VectorParams, Distance, PointStruct,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    BinaryQuantization, BinaryQuantizationConfig,
+    SearchParams, QuantizationSearchParams,
+    Filter, FieldCondition, MatchValue, PointIdsList, PayloadSchemaType, IsEmptyCondition, PayloadField,
+    KeywordIndexParams, KeywordIndexType, HnswConfigDiff, ShardingMethod, QueryRequest,
+    VectorParamsDiff, Disabled,
+)
 
-class QdrantStorage():
-    def __init__(self,url="http://localhost:6333", collection_name:str = "cvs",dim=3072):
-        self.client = QdrantClient(url=url)
+from app.core.config import settings
+from app.storage.repository.vector_storage import SearchHit, VectorStorage
+
+logger = logging.getLogger(__name__)
+
+# Payload fields every query filters on; indexed so filters are applied inside HNSW search
+PAYLOAD_INDEXES = {
+    "source_id": PayloadSchemaType.KEYWORD,
+    "user_id": PayloadSchemaType.INTEGER,
+}
+
+# Tenant field used in tenancy mode (Qdrant tenant indexes are keyword indexes)
+TENANT_FIELD = "tenant_id"
+
+# Storage profiles: quantized vectors stay in RAM, originals go to disk and are only
+# read to rescore the oversampled candidates
+STORAGE_PROFILES = {
+    "full": {"quantization": None, "on_disk": False},
+    "scalar": {"quantization": "scalar", "on_disk": True},
+    "binary": {"quantization": "binary", "on_disk": True},
+}
+
+# One pooled client per process and connection settings
+_clients: dict[tuple, AsyncQdrantClient] = {}
+# Collections already checked/created by this process
+_ready_collections: set[tuple] = set()
+
+
+def get_qdrant_client(url: str = settings.QDRANT_URL, prefer_grpc: bool = settings.QDRANT_PREFER_GRPC) -> AsyncQdrantClient:
+    key = (url, prefer_grpc)
+    if key not in _clients:
+        _clients[key] = AsyncQdrantClient(
+            url=url,
+            api_key=settings.QDRANT_API_KEY or None,
+            prefer_grpc=prefer_grpc,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            timeout=settings.QDRANT_TIMEOUT
+        )
+    return _clients[key]
+
+
+async def close_qdrant_clients() -> None:
+    for client in _clients.values():
+        await client.close()
+    _clients.clear()
+    _ready_collections.clear()
+
+
+def quantization_config(kind: str):
+    if kind == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if kind == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def quantization_kind(config) -> Optional[str]:
+    """Profile quantization name of a stored collection config ("product" never matches a profile)"""
+    if isinstance(config, ScalarQuantization):
+        return "scalar"
+    if isinstance(config, BinaryQuantization):
+        return "binary"
+    if config is not None:
+        return "product"
+    return None
+
+
+class QdrantStorage(VectorStorage):
+    """
+    Qdrant wrapper for CV chunks on a shared AsyncQdrantClient (REST or gRPC).
+
+    The collection is created on first use per process. Upserts are split into
+    size-bounded batches that are sent concurrently.
+
+    In tenancy mode every point carries a `tenant_id` payload with an `is_tenant`
+    keyword index, the global HNSW graph is disabled in favour of per-tenant graphs
+    (m=0, payload_m), and with `tenant_shard_groups` > 0 users are spread over
+    custom shard keys. All reads and writes must then be scoped by user_id. Points of
+    a collection created without tenancy get their `tenant_id` on first use.
+
+    An existing collection whose quantization, on-disk vectors or HNSW layout differ
+    from the configured profile is updated in place on first use.
+    """
+
+    def __init__(self,url=settings.QDRANT_URL, collection_name:str = settings.QDRANT_COLLECTION,dim=settings.EMBED_DIM,
+                 profile: str = settings.VECTOR_PROFILE, on_disk: bool = settings.VECTOR_ON_DISK,
+                 tenancy: bool = settings.QDRANT_TENANCY, tenant_shard_groups: int = settings.QDRANT_TENANT_SHARD_GROUPS,
+                 prefer_grpc: bool = settings.QDRANT_PREFER_GRPC):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError(f"Unknown vector storage profile: {profile}")
+        self.client = get_qdrant_client(url, prefer_grpc)
+        self.url = url
         self.collection = collection_name
-        if not self.client.collection_exists(collection_name=collection_name):
-            self.client.create_collection(
-                collection_name=collection_name,
-                vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+        self.dim = dim
+        self.profile = STORAGE_PROFILES[profile]
+        self.on_disk = self.profile["on_disk"] if on_disk is None else on_disk
+        self.tenancy = tenancy
+        self.tenant_shard_groups = tenant_shard_groups if tenancy else 0
+        self.search_params = None
+        if self.profile["quantization"]:
+            self.search_params = SearchParams(
+                quantization=QuantizationSearchParams(
+                    rescore=True,
+                    oversampling=settings.VECTOR_RESCORE_OVERSAMPLING
+                )
+            )
+        self._ready_lock = asyncio.Lock()
+
+    async def setup(self):
+        await self._ensure_collection()
+
+    async def _ensure_collection(self):
+        key = (self.url, self.collection)
+        if key in _ready_collections:
+            return
+        async with self._ready_lock:
+            if key in _ready_collections:
+                return
+            if not await self.client.collection_exists(collection_name=self.collection):
+                await self.client.create_collection(
+                    collection_name=self.collection,
+                    vectors_config=VectorParams(size=self.dim, distance=Distance.COSINE, on_disk=self.on_disk),
+                    quantization_config=quantization_config(self.profile["quantization"]),
+                    hnsw_config=HnswConfigDiff(payload_m=16, m=0) if self.tenancy else None,
+                    sharding_method=ShardingMethod.CUSTOM if self.tenant_shard_groups else None,
+                )
+                for group in range(self.tenant_shard_groups):
+                    await self.client.create_shard_key(collection_name=self.collection, shard_key=f"group_{group}")
+            else:
+                if self.tenancy:
+                    await self._prepare_tenancy()
+                await self._sync_collection_config()
+            await self._ensure_payload_indexes()
+            _ready_collections.add(key)
+
+    async def _ensure_payload_indexes(self):
+        """Create missing payload indexes (also for collections created before they existed)"""
+        indexes = dict(PAYLOAD_INDEXES)
+        if self.tenancy:
+            indexes[TENANT_FIELD] = KeywordIndexParams(type=KeywordIndexType.KEYWORD, is_tenant=True)
+
+        existing = (await self.client.get_collection(collection_name=self.collection)).payload_schema or {}
+        for field, schema in indexes.items():
+            if field not in existing:
+                await self.client.create_payload_index(
+                    collection_name=self.collection,
+                    field_name=field,
+                    field_schema=schema
+                )
+
+    async def _sync_collection_config(self):
+        """
+        Update an existing collection to the configured profile and tenancy layout.
+
+        Qdrant rebuilds quantized vectors and HNSW graphs in the background, searches keep
+        working meanwhile.
+        """
+        config = (await self.client.get_collection(collection_name=self.collection)).config
+        changes = {}
+
+        if quantization_kind(config.quantization_config) != self.profile["quantization"]:
+            changes["quantization_config"] = quantization_config(self.profile["quantization"]) or Disabled.DISABLED
+
+        vectors = config.params.vectors
+        if isinstance(vectors, VectorParams) and bool(vectors.on_disk) != self.on_disk:
+            changes["vectors_config"] = {"": VectorParamsDiff(on_disk=self.on_disk)}
+
+        hnsw = config.hnsw_config
+        if self.tenancy and (hnsw.m != 0 or not hnsw.payload_m):
+            changes["hnsw_config"] = HnswConfigDiff(payload_m=16, m=0)
+        elif not self.tenancy and hnsw.m == 0:
+            # Global graph was disabled for tenancy; without tenant filters searches need it back
+            changes["hnsw_config"] = HnswConfigDiff(m=16)
+
+        if changes:
+            logger.warning("Updating %s of Qdrant collection %s to match the storage settings",
+                           ", ".join(changes), self.collection)
+            await self.client.update_collection(collection_name=self.collection, **changes)
+
+    async def _prepare_tenancy(self):
+        """
+        Make an existing collection usable in tenancy mode.
+
+        Tenant filters match on `tenant_id`, so points written before tenancy was enabled
+        (they only have `user_id`) get it backfilled. Shard groups cannot be added to a
+        collection created without custom sharding, which is refused.
+        """
+        info = await self.client.get_collection(collection_name=self.collection)
+        if self.tenant_shard_groups and info.config.params.sharding_method != ShardingMethod.CUSTOM:
+            raise RuntimeError(
+                f"Qdrant collection {self.collection} has no custom sharding; "
+                "QDRANT_TENANT_SHARD_GROUPS needs a new QDRANT_COLLECTION"
+            )
+
+        legacy = Filter(must=[IsEmptyCondition(is_empty=PayloadField(key=TENANT_FIELD))])
+        backfilled = orphans = 0
+        offset = None
+        while True:
+            points, offset = await self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=legacy,
+                limit=1000,
+                offset=offset,
+                with_payload=["user_id"],
+                with_vectors=False
+            )
+            tenants: dict[str, list] = {}
+            for point in points:
+                user_id = (point.payload or {}).get("user_id")
+                if user_id is None:
+                    orphans += 1
+                else:
+                    tenants.setdefault(str(user_id), []).append(point.id)
+            for tenant, ids in tenants.items():
+                await self.client.set_payload(
+                    collection_name=self.collection,
+                    payload={TENANT_FIELD: tenant},
+                    points=ids
+                )
+                backfilled += len(ids)
+            if offset is None:
+                break
+
+        if backfilled:
+            logger.warning("Backfilled %s on %d points of Qdrant collection %s", TENANT_FIELD, backfilled, self.collection)
+        if orphans:
+            logger.warning("%d points of Qdrant collection %s have no user_id and are unreachable in tenancy mode",
+                           orphans, self.collection)
+
+    def _filter(self, source_id=None, user_id=None):
+        if self.tenancy and user_id is None:
+            raise ValueError("user_id is required in tenancy mode")
+        conditions = []
+        if user_id is not None:
+            if self.tenancy:
+                conditions.append(FieldCondition(key=TENANT_FIELD, match=MatchValue(value=str(user_id))))
+            else:
+                conditions.append(FieldCondition(key="user_id", match=MatchValue(value=int(user_id))))
+        if source_id is not None:
+            # source_id is stored as a string in payloads
+            conditions.append(FieldCondition(key="source_id", match=MatchValue(value=str(source_id))))
+        return Filter(must=conditions) if conditions else None
+
+    def _shard_key(self, user_id):
+        if not self.tenant_shard_groups or user_id is None:
+            return None
+        return f"group_{int(user_id) % self.tenant_shard_groups}"
+
+    @staticmethod
+    def _batches(points: list[PointStruct]) -> list[list[PointStruct]]:
+        """Split points so each request body stays under QDRANT_UPSERT_BATCH_BYTES (estimated)"""
+        batches = []
+        current = []
+        size = 0
+        for point in points:
+            point_size = len(point.vector) * 8 + len((point.payload or {}).get("text", "")) + 256
+            if current and size + point_size > settings.QDRANT_UPSERT_BATCH_BYTES:
+                batches.append(current)
+                current = []
+                size = 0
+            current.append(point)
+            size += point_size
+        if current:
+            batches.append(current)
+        return batches
+
+    async def upsert(self,ids,vectors,payloads):
+        if not ids:
+            return
+        await self._ensure_collection()
+        if self.tenancy:
+            payloads = [{**payload, TENANT_FIELD: str(payload["user_id"])} for payload in payloads]
+
+        # Each shard key has to be written separately
+        groups = {}
+        for i, payload in enumerate(payloads):
+            groups.setdefault(self._shard_key(payload.get("user_id")), []).append(
+                PointStruct(id=ids[i], vector=vectors[i], payload=payload)
             )
-    def upsert(self,ids,vectors,payloads):
-        points = [PointStruct(id=ids[i],vector=vectors[i],payload=payloads[i]) for i in range(len(ids))]
-        self.client.upsert(collection_name=self.collection,points=points)
-    def search(self,query_vector,top_k:int=5):
-        results = self.client.query_points(
+
+        semaphore = asyncio.Semaphore(settings.QDRANT_UPSERT_CONCURRENCY)
+
+        async def _send(shard_key, batch):
+            async with semaphore:
+                await self.client.upsert(
+                    collection_name=self.collection,
+                    points=batch,
+                    shard_key_selector=shard_key
+                )
+
+        await asyncio.gather(*(
+            _send(shard_key, batch)
+            for shard_key, points in groups.items()
+            for batch in self._batches(points)
+        ))
+
+    async def search(self,query_vector,top_k:int=5,source_id=None,user_id=None):
+        """Nearest chunks, optionally restricted to one CV and/or user (filter is applied inside the index)"""
+        await self._ensure_collection()
+        results = (await self.client.query_points(
             collection_name=self.collection,
             query=query_vector,
+            query_filter=self._filter(source_id=source_id, user_id=user_id),
             with_payload=True,
-            limit=top_k
-        ).points
+            limit=top_k,
+            search_params=self.search_params,
+            shard_key_selector=self._shard_key(user_id)
+        )).points
 
         contexts = []
         sources = []
@@ -33,38 +335,70 @@ class QdrantStorage():
                 sources.append(payload)
         return {"contexts":contexts, "sources":sources}
     
-    def delete_by_source_id(self, source_id: int):
+    async def search_batch(self,query_vectors,top_k:int=5,source_id=None,user_id=None,with_vectors:bool=False):
+        """Several nearest-chunk queries sent as one query_batch_points request"""
+        if not query_vectors:
+            return []
+        await self._ensure_collection()
+        query_filter = self._filter(source_id=source_id, user_id=user_id)
+        requests = [
+            QueryRequest(
+                query=list(vector),
+                filter=query_filter,
+                limit=top_k,
+                params=self.search_params,
+                with_payload=True,
+                with_vector=with_vectors,
+                shard_key=self._shard_key(user_id)
+            )
+            for vector in query_vectors
+        ]
+        responses = await self.client.query_batch_points(collection_name=self.collection, requests=requests)
+        return [
+            [
+                SearchHit(id=str(r.id), score=r.score, payload=r.payload or {}, vector=r.vector if with_vectors else None)
+                for r in response.points
+            ]
+            for response in responses
+        ]
+
+    async def delete_by_source_id(self, source_id: int, user_id: int = None):
         """Delete all points with given source_id"""
-        from qdrant_client.models import Filter, FieldCondition, MatchValue
-        
-        self.client.delete(
+        await self._ensure_collection()
+        await self.client.delete(
             collection_name=self.collection,
-            points_selector=Filter(
-                must=[
-                    FieldCondition(
-                        key="source_id",
-                        match=MatchValue(value=source_id)
-                    )
-                ]
-            )
+            points_selector=self._filter(source_id=source_id, user_id=user_id),
+            shard_key_selector=self._shard_key(user_id)
         )
 
-    def get_points_by_source_id(self, source_id: int):
+    async def delete_points(self, ids, user_id: int = None):
+        """Delete points by id"""
+        if self.tenancy and user_id is None:
+            raise ValueError("user_id is required in tenancy mode")
+        if ids:
+            await self._ensure_collection()
+            await self.client.delete(
+                collection_name=self.collection,
+                points_selector=PointIdsList(points=list(ids)),
+                shard_key_selector=self._shard_key(user_id)
+            )
+
+    async def get_points_by_source_id(self, source_id: int, user_id: int = None, with_vectors: bool = True,
+                                      with_payload: bool = True):
         """Get all points for potential rollback"""
-        from qdrant_client.models import Filter, FieldCondition, MatchValue
-        
-        results = self.client.scroll(
-            collection_name=self.collection,
-            scroll_filter=Filter(
-                must=[
-                    FieldCondition(
-                        key="source_id",
-                        match=MatchValue(value=source_id)
-                    )
-                ]
-            ),
-            limit=10000,
-            with_payload=True,
-            with_vectors=True
-        )
-        return results[0] 
+        await self._ensure_collection()
+        points = []
+        offset = None
+        while True:
+            batch, offset = await self.client.scroll(
+                collection_name=self.collection,
+                scroll_filter=self._filter(source_id=source_id, user_id=user_id),
+                limit=1000,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=with_vectors,
+                shard_key_selector=self._shard_key(user_id)
+            )
+            points.extend(batch)
+            if offset is None:
+                return points
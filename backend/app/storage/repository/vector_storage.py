@@ -0,0 +1,71 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.core.config import settings
+
+
+@dataclass
+class StoredPoint:
+    """Point returned by scrolls (same attributes as a qdrant Record)"""
+    id: str
+    vector: Optional[list[float]] = None
+    payload: Optional[dict] = field(default=None)
+
+
+@dataclass
+class SearchHit:
+    """Scored point returned by batch searches"""
+    id: str
+    score: float
+    payload: dict
+    vector: Optional[list[float]] = None
+
+
+class VectorStorage(ABC):
+    """Operations the services need from a vector store holding CV chunks (all async)"""
+
+    async def setup(self):
+        """Prepare the store (create collections, indexes) before serving requests"""
+
+    @abstractmethod
+    async def upsert(self, ids, vectors, payloads):
+        """Insert or overwrite points"""
+
+    @abstractmethod
+    async def search(self, query_vector, top_k: int = 5, source_id=None, user_id=None) -> dict:
+        """Nearest chunks as {"contexts": [...], "sources": [...]}, filtered by CV and/or user"""
+
+    @abstractmethod
+    async def search_batch(self, query_vectors, top_k: int = 5, source_id=None, user_id=None,
+                           with_vectors: bool = False) -> list[list[SearchHit]]:
+        """Nearest points for several queries in one round trip, one hit list per query"""
+
+    @abstractmethod
+    async def delete_by_source_id(self, source_id: int, user_id: int = None):
+        """Delete all points with given source_id"""
+
+    @abstractmethod
+    async def delete_points(self, ids, user_id: int = None):
+        """Delete points by id"""
+
+    @abstractmethod
+    async def get_points_by_source_id(self, source_id: int, user_id: int = None, with_vectors: bool = True,
+                                with_payload: bool = True) -> list:
+        """All points of a CV (objects with id, vector and payload)"""
+
+    async def get_point_ids_by_source_id(self, source_id: int, user_id: int = None) -> set:
+        """Ids of all points with given source_id"""
+        points = await self.get_points_by_source_id(source_id, user_id=user_id, with_vectors=False, with_payload=False)
+        return {str(point.id) for point in points}
+
+
+def create_vector_storage(backend: str = settings.VECTOR_BACKEND, **kwargs) -> VectorStorage:
+    """Vector store selected by VECTOR_BACKEND (qdrant, numpy)"""
+    if backend == "qdrant":
+        from app.storage.repository.qdrant import QdrantStorage
+        return QdrantStorage(**kwargs)
+    if backend == "numpy":
+        from app.storage.repository.numpy_storage import NumpyStorage
+        return NumpyStorage(**kwargs)
+    raise ValueError(f"Unknown vector backend: {backend}")
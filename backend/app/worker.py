@@ -0,0 +1,92 @@
+"""
+Background ingestion worker.
+
+Run with `python -m app.worker`. Any number of worker processes can run against the
+same database: jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED.
+"""
+import asyncio
+import logging
+import signal
+
+from sqlmodel import Session
+
+from app.core.config import settings
+from app.database import engine, check_db_connection
+from app.repository.ingestion_job_repository import IngestionJobRepository
+from app.services.ingestion import IngestionService
+from app.core.container import ServiceContainer, get_container
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def _claim_job():
+    with Session(engine, expire_on_commit=False) as session:
+        return await IngestionJobRepository(session).claim_next(
+            lock_timeout=settings.INGEST_LOCK_TIMEOUT,
+            max_attempts=settings.INGEST_MAX_ATTEMPTS
+        )
+
+
+async def _run_job(job, semaphore: asyncio.Semaphore, container: ServiceContainer):
+    try:
+        with Session(engine, expire_on_commit=False) as session:
+            job = session.merge(job)
+            await IngestionService(session, container=container).process_job(job)
+    except Exception:
+        logger.error("Unexpected error while processing ingestion job %s", job.id, exc_info=True)
+    finally:
+        semaphore.release()
+
+
+async def run_worker(concurrency: int = settings.INGEST_WORKER_CONCURRENCY,
+                     poll_interval: float = settings.INGEST_POLL_INTERVAL):
+    """Claim and run jobs, never more than `concurrency` at a time"""
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    container = get_container()
+    await container.startup()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = set()
+    logger.info("Ingestion worker started (concurrency=%s)", concurrency)
+
+    while not stop.is_set():
+        await semaphore.acquire()
+        try:
+            job = await _claim_job()
+        except Exception:
+            logger.error("Failed to claim ingestion job", exc_info=True)
+            job = None
+
+        if job is None:
+            semaphore.release()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        task = asyncio.create_task(_run_job(job, semaphore, container))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    logger.info("Stopping ingestion worker, waiting for %d running jobs...", len(tasks))
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await container.shutdown()
+
+
+def main():
+    if not check_db_connection():
+        raise SystemExit("Database connection failed")
+    asyncio.run(run_worker())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark exact search against HNSW and IVF on our own CV vectors.
+
+Samples vectors from the live Qdrant collection and loads them into
+- the embedded NumpyStorage with the exact (flat) index,
+- the embedded NumpyStorage with the IVF index,
+- a temporary Qdrant collection (HNSW, "full" profile),
+then reports recall@k against exact search and query latency for each. The Qdrant
+collection is searched only after its HNSW index covers all points.
+
+Usage:
+    python -m scripts.compare_vector_backends --sample 5000 --queries 200
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from app.core.config import settings
+from app.storage.repository.numpy_storage import NumpyStorage
+from app.storage.repository.qdrant import QdrantStorage, close_qdrant_clients
+from scripts.compare_vector_profiles import BENCH_OPTIMIZERS, load_sample, shorten, wait_until_indexed
+
+
+async def measure(storage, queries: np.ndarray, truth: np.ndarray, top_k: int) -> tuple[float, list[float]]:
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = await storage.search(query_vector=query.tolist(), top_k=top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        hits += len({int(source["row"]) for source in found["sources"]} & set(expected.tolist()))
+    return hits / (len(queries) * top_k), sorted(latencies)
+
+
+async def run(args):
+    client = QdrantClient(url=args.url, api_key=settings.QDRANT_API_KEY or None, timeout=120)
+    data = load_sample(client, args.collection, args.sample)
+    if len(data) <= args.queries:
+        raise SystemExit(f"Collection {args.collection} has only {len(data)} points, need more than --queries")
+
+    rng = np.random.default_rng(42)
+    query_idx = rng.choice(len(data), size=args.queries, replace=False)
+    base = shorten(np.delete(data, query_idx, axis=0), data.shape[1])
+    queries = shorten(data[query_idx], data.shape[1])
+    truth = np.argsort(-(queries @ base.T), axis=1)[:, :args.top_k]
+
+    ids = list(range(len(base)))
+    vectors = base.tolist()
+    payloads = [{"text": str(i), "row": i, "source_id": "bench", "user_id": 0} for i in ids]
+
+    print(f"{len(base)} vectors, {len(queries)} queries, recall@{args.top_k}")
+    print(f"{'backend':<14} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for index in ("flat", "ivf"):
+            storage = NumpyStorage(path=directory, collection_name=f"bench_{index}", dim=base.shape[1], index=index)
+            await storage.upsert(ids=ids, vectors=vectors, payloads=payloads)
+            if index == "ivf":
+                storage.build_ivf()
+            recall, latencies = await measure(storage, queries, truth, args.top_k)
+            print(f"numpy-{index:<8} {recall:>7.3f} {statistics.median(latencies):>8.2f} "
+                  f"{latencies[int(len(latencies) * 0.95) - 1]:>8.2f}")
+
+    collection = f"{args.collection}_bench_hnsw"
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    storage = QdrantStorage(url=args.url, collection_name=collection, dim=base.shape[1], profile="full", tenancy=False)
+    try:
+        await storage.setup()
+        client.update_collection(collection, optimizers_config=BENCH_OPTIMIZERS)
+        await storage.upsert(ids=ids, vectors=vectors, payloads=payloads)
+        wait_until_indexed(client, collection, len(ids), args.index_timeout)
+        recall, latencies = await measure(storage, queries, truth, args.top_k)
+        print(f"{'qdrant-hnsw':<14} {recall:>7.3f} {statistics.median(latencies):>8.2f} "
+              f"{latencies[int(len(latencies) * 0.95) - 1]:>8.2f}")
+    finally:
+        client.delete_collection(collection)
+        await close_qdrant_clients()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.QDRANT_URL)
+    parser.add_argument("--collection", default=settings.QDRANT_COLLECTION)
+    parser.add_argument("--sample", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--index-timeout", type=float, default=600, help="Seconds to wait for Qdrant indexing")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Compare recall and latency of vector storage profiles on real CV vectors.
+
+Samples points (with full-size vectors) from the live collection, loads them into
+temporary collections for every profile x dimensions combination and measures
+recall@k against exact full-dimension search, query latency and vector memory.
+
+Reduced dimensions are simulated the way text-embedding-3 shortens embeddings:
+truncate the vector and L2-normalize it again, so no re-embedding is needed.
+
+Qdrant builds HNSW and quantized vectors in the background, so every collection is
+indexed regardless of size and searched only once indexing has finished.
+
+Usage:
+    python -m scripts.compare_vector_profiles --sample 5000 --queries 200 --dims 3072,1024,256
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    Distance, PointStruct, VectorParams, SearchParams, QuantizationSearchParams, CollectionStatus, OptimizersConfigDiff,
+)
+
+from app.core.config import settings
+from app.storage.repository.qdrant import STORAGE_PROFILES, quantization_config
+
+# Index benchmark collections whatever their size (the default threshold is ~20MB of vectors)
+BENCH_OPTIMIZERS = OptimizersConfigDiff(indexing_threshold=1)
+
+
+def load_sample(client: QdrantClient, collection: str, limit: int) -> np.ndarray:
+    vectors = []
+    offset = None
+    while len(vectors) < limit:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=min(1000, limit - len(vectors)),
+            offset=offset,
+            with_payload=False,
+            with_vectors=True
+        )
+        vectors.extend(point.vector for point in points)
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def wait_until_indexed(client: QdrantClient, collection: str, points: int, timeout: float, interval: float = 1.0):
+    """Block until the HNSW index (and quantized vectors) cover all points, so searches measure the index"""
+    deadline = time.monotonic() + timeout
+    while True:
+        info = client.get_collection(collection)
+        indexed = info.indexed_vectors_count or 0
+        if info.status == CollectionStatus.GREEN and indexed >= points:
+            return
+        if time.monotonic() > deadline:
+            raise SystemExit(f"Collection {collection} is not indexed after {timeout:.0f}s "
+                             f"({indexed}/{points} vectors, status {info.status})")
+        time.sleep(interval)
+
+
+def shorten(vectors: np.ndarray, dim: int) -> np.ndarray:
+    short = vectors[:, :dim]
+    return short / np.linalg.norm(short, axis=1, keepdims=True)
+
+
+def bytes_per_vector(profile: dict, dim: int) -> tuple[int, int]:
+    """(RAM, disk) bytes per vector, ignoring the HNSW graph"""
+    original = dim * 4
+    if profile["quantization"] == "scalar":
+        ram = dim
+    elif profile["quantization"] == "binary":
+        ram = dim // 8
+    else:
+        ram = 0
+    if profile["on_disk"]:
+        return ram, original
+    return ram + original, 0
+
+
+def run(args):
+    client = QdrantClient(url=args.url, api_key=settings.QDRANT_API_KEY or None, timeout=120)
+    data = load_sample(client, args.collection, args.sample)
+    if len(data) <= args.queries:
+        raise SystemExit(f"Collection {args.collection} has only {len(data)} points, need more than --queries")
+
+    rng = np.random.default_rng(42)
+    query_idx = rng.choice(len(data), size=args.queries, replace=False)
+    base = np.delete(data, query_idx, axis=0)
+    queries = data[query_idx]
+
+    # Ground truth: exact cosine top-k on full-dimension vectors
+    full_base = shorten(base, base.shape[1])
+    full_queries = shorten(queries, queries.shape[1])
+    truth = np.argsort(-(full_queries @ full_base.T), axis=1)[:, :args.top_k]
+
+    print(f"{len(base)} vectors, {len(queries)} queries, recall@{args.top_k}")
+    print(f"{'profile':<8} {'dim':>5} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'RAM B/vec':>10} {'disk B/vec':>11}")
+
+    for dim in args.dims:
+        vectors = shorten(base, dim)
+        query_vectors = shorten(queries, dim)
+        for name in args.profiles:
+            profile = STORAGE_PROFILES[name]
+            collection = f"{args.collection}_bench_{name}_{dim}"
+            if client.collection_exists(collection):
+                client.delete_collection(collection)
+            client.create_collection(
+                collection_name=collection,
+                vectors_config=VectorParams(size=dim, distance=Distance.COSINE, on_disk=profile["on_disk"]),
+                quantization_config=quantization_config(profile["quantization"]),
+                optimizers_config=BENCH_OPTIMIZERS,
+            )
+            try:
+                for start in range(0, len(vectors), 256):
+                    client.upsert(
+                        collection_name=collection,
+                        points=[
+                            PointStruct(id=start + i, vector=vector.tolist())
+                            for i, vector in enumerate(vectors[start:start + 256])
+                        ],
+                        wait=True
+                    )
+                wait_until_indexed(client, collection, len(vectors), args.index_timeout)
+                search_params = None
+                if profile["quantization"]:
+                    search_params = SearchParams(
+                        quantization=QuantizationSearchParams(rescore=True, oversampling=args.oversampling)
+                    )
+
+                latencies = []
+                hits = 0
+                for query, expected in zip(query_vectors, truth):
+                    started = time.perf_counter()
+                    points = client.query_points(
+                        collection_name=collection,
+                        query=query.tolist(),
+                        limit=args.top_k,
+                        search_params=search_params
+                    ).points
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    hits += len({point.id for point in points} & set(expected.tolist()))
+
+                ram, disk = bytes_per_vector(profile, dim)
+                latencies.sort()
+                print(
+                    f"{name:<8} {dim:>5} {hits / (len(queries) * args.top_k):>7.3f} "
+                    f"{statistics.median(latencies):>8.2f} {latencies[int(len(latencies) * 0.95) - 1]:>8.2f} "
+                    f"{ram:>10} {disk:>11}"
+                )
+            finally:
+                if not args.keep:
+                    client.delete_collection(collection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=settings.QDRANT_URL)
+    parser.add_argument("--collection", default=settings.QDRANT_COLLECTION)
+    parser.add_argument("--sample", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--dims", type=lambda v: [int(d) for d in v.split(",")], default=[3072, 1024, 256])
+    parser.add_argument("--profiles", type=lambda v: v.split(","), default=list(STORAGE_PROFILES))
+    parser.add_argument("--oversampling", type=float, default=settings.VECTOR_RESCORE_OVERSAMPLING)
+    parser.add_argument("--index-timeout", type=float, default=600, help="Seconds to wait for indexing")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# app.database builds its engine at import time; endpoint modules can be imported without a server
+os.environ.setdefault("DATABASE_URL", "sqlite://")
@@ -0,0 +1,67 @@
+from types import SimpleNamespace
+
+
+class FakeResponses:
+    """responses.create that returns queued output texts (event lists when streaming) and records the calls"""
+
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        output = self.outputs.pop(0)
+        if isinstance(output, Exception):
+            raise output
+        if kwargs.get("stream"):
+            return _stream(output)
+        return SimpleNamespace(output_text=output, usage=None)
+
+
+async def _stream(events):
+    for event in events:
+        yield event
+
+
+def fake_container(responses=None, http=None):
+    """Just enough of ServiceContainer for services constructed without a DB session"""
+    return SimpleNamespace(
+        openai=SimpleNamespace(responses=responses or FakeResponses()),
+        http=http,
+        storage=None,
+        embedder=None,
+        job_embedder=None,
+        parser=None,
+        profiler=None,
+    )
+
+
+class CharEncoding:
+    """One token per character, so budgets in tests are easy to reason about"""
+
+    def encode(self, text, disallowed_special=()):
+        return [ord(char) for char in text]
+
+    def decode(self, tokens):
+        return "".join(chr(token) for token in tokens)
+
+
+class FakeParser:
+    """PdfParser returning preset chunks per path"""
+
+    def __init__(self, chunks_by_path):
+        self.chunks_by_path = chunks_by_path
+
+    async def load_and_chunk(self, path):
+        return list(self.chunks_by_path[path])
+
+
+class FakeEmbedder:
+    """EmbeddingService with deterministic 3-d vectors that records what it embedded"""
+
+    def __init__(self):
+        self.texts = []
+
+    async def embed(self, texts):
+        self.texts.extend(texts)
+        return [[1.0, float(len(text)), float(sum(map(ord, text)) % 7)] for text in texts]
@@ -0,0 +1,49 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.middleware.body_limit import BodySizeLimitMiddleware
+
+LIMIT = 1024 * 1024
+
+
+def _client():
+    app = FastAPI()
+    app.state.calls = 0
+    app.add_middleware(BodySizeLimitMiddleware, max_body_size=LIMIT)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.calls += 1
+        return {"size": len(await file.read())}
+
+    return TestClient(app), app
+
+
+def test_small_upload_passes():
+    client, app = _client()
+    response = client.post("/upload", files={"file": ("cv.pdf", b"x" * 1000, "application/pdf")})
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+
+
+def test_declared_oversized_body_is_rejected_before_the_endpoint():
+    client, app = _client()
+    response = client.post("/upload", files={"file": ("cv.pdf", b"x" * (LIMIT + 1), "application/pdf")})
+    assert response.status_code == 413
+    assert app.state.calls == 0
+
+
+def test_streamed_oversized_body_is_rejected_while_reading():
+    client, app = _client()
+
+    def body():
+        yield b"--boundary\r\nContent-Disposition: form-data; name=\"file\"; filename=\"cv.pdf\"\r\n"
+        yield b"Content-Type: application/pdf\r\n\r\n"
+        for _ in range(64):
+            yield b"x" * 64 * 1024
+        yield b"\r\n--boundary--\r\n"
+
+    response = client.post("/upload", content=body(),
+                           headers={"Content-Type": "multipart/form-data; boundary=boundary"})
+    assert response.status_code == 413
+    assert app.state.calls == 0
@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.ingestion import IngestionService
+from app.services.pdf import PdfService
+from app.storage.repository.numpy_storage import NumpyStorage
+from tests.fakes import FakeEmbedder, FakeParser
+
+CHUNKS = ["Python developer", "FastAPI and PostgreSQL", "Led a team of four"]
+
+
+@pytest.fixture
+def container(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CV_PROFILE_ENABLED", False)
+    return SimpleNamespace(
+        parser=FakeParser({"cv.pdf": CHUNKS}),
+        embedder=FakeEmbedder(),
+        storage=NumpyStorage(path=str(tmp_path), collection_name="cvs", dim=3),
+        profiler=None,
+    )
+
+
+def _points(storage, source_id):
+    points = asyncio.run(storage.get_points_by_source_id(source_id, user_id=7))
+    return {point.payload["chunk_index"]: point for point in points}
+
+
+def test_copy_vectors_reuses_points_without_embedding(container):
+    service = PdfService(container=container)
+    asyncio.run(service.upsert_vectors("cv.pdf", "cv.pdf", "cv-1", 7))
+    container.embedder.texts.clear()
+
+    stats = asyncio.run(service.copy_vectors("cv-1", "cv-2", 7, "copy.pdf"))
+    assert stats == {"chunks": 3, "reused": 3, "embedded": 0, "deleted": 0}
+    assert container.embedder.texts == []
+
+    original, copy = _points(container.storage, "cv-1"), _points(container.storage, "cv-2")
+    assert len(original) == len(copy) == 3
+    for index, point in copy.items():
+        assert point.vector == pytest.approx(original[index].vector)
+        assert point.payload["text"] == original[index].payload["text"]
+        assert (point.payload["source_id"], point.payload["source"]) == ("cv-2", "copy.pdf")
+        assert point.id != original[index].id
+
+
+def test_copy_vectors_needs_chunk_hashes(container):
+    asyncio.run(container.storage.upsert(["legacy"], [[1.0, 0.0, 0.0]], [{"source_id": "cv-1", "user_id": 7, "text": "x"}]))
+    assert asyncio.run(PdfService(container=container).copy_vectors("cv-1", "cv-2", 7)) is None
+    assert _points(container.storage, "cv-2") == {}
+
+
+class FakeCVRepository:
+    def __init__(self, original):
+        self.original = original
+        self.statuses = {}
+
+    async def get_processed_cv_by_content_hash(self, user_id, content_hash, exclude_cv_id=None):
+        if (self.original.user_id, self.original.content_hash) == (user_id, content_hash):
+            return self.original
+        return None
+
+    async def update_cv_status(self, cv_id, status):
+        self.statuses[cv_id] = status
+        return True
+
+
+def test_identical_upload_of_same_user_is_copied(container):
+    asyncio.run(PdfService(container=container).upsert_vectors("cv.pdf", "cv.pdf", "cv-1", 7))
+    original = SimpleNamespace(id=1, user_id=7, source_id="cv-1", content_hash="abc", profile=None)
+    service = IngestionService(None, pdf_service=PdfService(container=container))
+    service.cv_repository = FakeCVRepository(original)
+    container.embedder.texts.clear()
+
+    duplicate = SimpleNamespace(id=2, user_id=7, source_id="cv-2", content_hash="abc", file_path="copy.pdf")
+    assert asyncio.run(service._reuse_duplicate(duplicate))
+    assert service.cv_repository.statuses == {2: "processed"}
+    assert len(_points(container.storage, "cv-2")) == 3
+    assert container.embedder.texts == []
+
+    other_user = SimpleNamespace(id=3, user_id=8, source_id="cv-3", content_hash="abc", file_path="other.pdf")
+    assert not asyncio.run(service._reuse_duplicate(other_user))
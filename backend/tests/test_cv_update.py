@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.cv import CVService
+from app.services.pdf import PdfService
+from app.storage.repository.numpy_storage import NumpyStorage
+from tests.fakes import FakeEmbedder, FakeParser
+
+OLD = ["Python developer", "FastAPI and PostgreSQL", "Led a team of four"]
+NEW = ["Python developer", "FastAPI, PostgreSQL and Redis", "Led a team of four"]
+
+
+@pytest.fixture
+def container(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CV_PROFILE_ENABLED", False)
+    return SimpleNamespace(
+        parser=FakeParser({"old.pdf": OLD, "new.pdf": NEW, "short.pdf": OLD[:1]}),
+        embedder=FakeEmbedder(),
+        storage=NumpyStorage(path=str(tmp_path), collection_name="cvs", dim=3),
+        profiler=None,
+    )
+
+
+def _texts(storage, source_id):
+    points = asyncio.run(storage.get_points_by_source_id(source_id, user_id=7))
+    return sorted((point.payload["chunk_index"], point.payload["text"]) for point in points)
+
+
+def test_reupload_embeds_only_changed_chunks(container):
+    service = PdfService(container=container)
+    first = asyncio.run(service.upsert_vectors("old.pdf", "cv.pdf", "cv-1", 7))
+    assert (first["embedded"], first["reused"], first["deleted"]) == (3, 0, 0)
+    ids = asyncio.run(container.storage.get_point_ids_by_source_id("cv-1"))
+
+    container.embedder.texts.clear()
+    second = asyncio.run(service.upsert_vectors("new.pdf", "cv.pdf", "cv-1", 7))
+    assert container.embedder.texts == ["FastAPI, PostgreSQL and Redis"]
+    assert (second["embedded"], second["reused"], second["deleted"]) == (1, 2, 1)
+    assert len(ids & asyncio.run(container.storage.get_point_ids_by_source_id("cv-1"))) == 2
+    assert _texts(container.storage, "cv-1") == list(enumerate(NEW))
+
+
+def test_identical_reupload_embeds_nothing(container):
+    service = PdfService(container=container)
+    asyncio.run(service.upsert_vectors("old.pdf", "cv.pdf", "cv-1", 7))
+    container.embedder.texts.clear()
+    stats = asyncio.run(service.upsert_vectors("old.pdf", "cv.pdf", "cv-1", 7))
+    assert container.embedder.texts == []
+    assert (stats["embedded"], stats["deleted"]) == (0, 0)
+
+
+def test_shorter_file_removes_missing_chunks(container):
+    service = PdfService(container=container)
+    asyncio.run(service.upsert_vectors("old.pdf", "cv.pdf", "cv-1", 7))
+    stats = asyncio.run(service.upsert_vectors("short.pdf", "cv.pdf", "cv-1", 7))
+    assert (stats["embedded"], stats["deleted"]) == (0, 2)
+    assert _texts(container.storage, "cv-1") == [(0, OLD[0])]
+
+
+class FakeCVRepository:
+    def __init__(self, cv):
+        self.cv = cv
+        self.session = SimpleNamespace(commit=lambda: None, rollback=lambda: None)
+
+    async def get_cv_by_id(self, cv_id):
+        return self.cv
+
+    async def update_cv(self, cv, data):
+        for key, value in data.items():
+            setattr(cv, key, value)
+        return cv
+
+
+class FakeLetterCache:
+    def __init__(self):
+        self.deleted = []
+
+    def delete_by_cv_id(self, cv_id):
+        self.deleted.append(cv_id)
+
+
+def test_update_cv_is_incremental_and_drops_cached_letters(container):
+    asyncio.run(PdfService(container=container).upsert_vectors("old.pdf", "cv.pdf", "cv-1", 7))
+    cv = SimpleNamespace(id=1, user_id=7, source_id="cv-1", filename="cv.pdf", original_filename="cv.pdf",
+                         file_path="old.pdf", file_size=1, content_type="application/pdf", upload_ip=None,
+                         user_agent=None, content_hash="old")
+    service = CVService(FakeCVRepository(cv), container)
+    service.letter_cache_repository = FakeLetterCache()
+    container.embedder.texts.clear()
+
+    stats = asyncio.run(service.update_cv(1, "new.pdf", "cv-1", content_hash="new"))
+    assert container.embedder.texts == ["FastAPI, PostgreSQL and Redis"]
+    assert (stats["embedded"], stats["reused"], stats["deleted"]) == (1, 2, 1)
+    assert (cv.file_path, cv.content_hash) == ("new.pdf", "new")
+    assert service.letter_cache_repository.deleted == [1]
+    assert _texts(container.storage, "cv-1") == list(enumerate(NEW))
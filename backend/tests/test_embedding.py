@@ -0,0 +1,92 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import APIConnectionError
+
+from app.core.config import settings
+from app.services import embedding as embedding_module
+from app.services.embedding import EmbeddingService
+from app.storage.cache.embedding_cache import EmbeddingCache
+from tests.fakes import CharEncoding
+
+
+class FakeEmbeddings:
+    """embeddings.create returning [len(text)] vectors in reverse order; fails the first `failures` calls"""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.inputs = []
+
+    async def create(self, model, dimensions, input):
+        if self.failures:
+            self.failures -= 1
+            raise APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+        self.inputs.append(list(input))
+        data = [SimpleNamespace(index=i, embedding=[float(len(text))]) for i, text in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+@pytest.fixture(autouse=True)
+def offline_embedder(monkeypatch):
+    monkeypatch.setattr(embedding_module.tiktoken, "encoding_for_model", lambda model: CharEncoding())
+    monkeypatch.setattr(settings, "EMBED_CACHE_ENABLED", False)
+
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.setattr(embedding_module.asyncio, "sleep", no_sleep)
+
+
+def _service(embeddings, cache=None, **kwargs):
+    return EmbeddingService(client=SimpleNamespace(embeddings=embeddings), dimensions=1, cache=cache, **kwargs)
+
+
+def test_batches_respect_token_and_size_limits():
+    embeddings = FakeEmbeddings()
+    service = _service(embeddings, max_batch_tokens=10, max_batch_size=3)
+    texts = ["aaaa", "bbbb", "cc", "d", "e", "f", "gggggggggggg"]
+    vectors, stats = asyncio.run(service.embed_with_stats(texts))
+
+    assert embeddings.inputs == [["aaaa", "bbbb", "cc"], ["d", "e", "f"], ["gggggggggggg"]]
+    assert vectors == [[float(len(text))] for text in texts]
+    assert [(s.batch, s.size, s.tokens, s.attempts) for s in stats] == [(0, 3, 10, 1), (1, 3, 3, 1), (2, 1, 12, 1)]
+
+
+def test_order_is_preserved_with_cache_hits_and_duplicates():
+    embeddings = FakeEmbeddings()
+    service = _service(embeddings, cache=EmbeddingCache(max_entries=100, path=None), max_batch_tokens=5, max_batch_size=2)
+    asyncio.run(service.embed(["bb"]))
+
+    texts = ["aaa", "bb", "c", "aaa", "dddd"]
+    vectors, stats = asyncio.run(service.embed_with_stats(texts))
+    assert vectors == [[3.0], [2.0], [1.0], [3.0], [4.0]]
+    assert embeddings.inputs[1:] == [["aaa", "c"], ["dddd"]]
+    assert sum(s.size for s in stats) == 3
+
+    assert asyncio.run(service.embed_with_stats(texts)) == (vectors, [])
+
+
+def test_retryable_errors_are_retried():
+    embeddings = FakeEmbeddings(failures=2)
+    service = _service(embeddings, max_retries=2)
+    vectors, stats = asyncio.run(service.embed_with_stats(["python"]))
+    assert vectors == [[6.0]]
+    assert stats[0].attempts == 3
+
+
+def test_gives_up_after_max_retries():
+    service = _service(FakeEmbeddings(failures=3), max_retries=2)
+    with pytest.raises(APIConnectionError):
+        asyncio.run(service.embed(["python"]))
+
+
+def test_concurrent_calls_get_their_own_stats():
+    service = _service(FakeEmbeddings(), max_batch_size=1)
+
+    async def run():
+        return await asyncio.gather(service.embed_with_stats(["a", "b"]), service.embed_with_stats(["c"]))
+
+    (_, first), (_, second) = asyncio.run(run())
+    assert (len(first), len(second)) == (2, 1)
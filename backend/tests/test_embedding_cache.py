@@ -0,0 +1,40 @@
+import sqlite3
+
+import pytest
+
+from app.storage.cache.embedding_cache import EmbeddingCache
+
+DIMS = 4
+
+
+def _key(text):
+    return EmbeddingCache.make_key("text-embedding-3-large", DIMS, text)
+
+
+def test_memory_roundtrip_keeps_float32():
+    cache = EmbeddingCache(max_entries=10, path=None)
+    cache.put_many({_key("python"): [0.1, 0.2, 0.3, 0.4]})
+    found = cache.get_many([_key("python"), _key("java")])
+    assert list(found) == [_key("python")]
+    assert found[_key("python")] == pytest.approx([0.1, 0.2, 0.3, 0.4], rel=1e-6)
+    assert cache._memory[_key("python")].typecode == "f"
+    assert not cache.persistent
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_memory_is_bounded():
+    cache = EmbeddingCache(max_entries=2, path=None)
+    for text in ("a", "b", "c"):
+        cache.put_many({_key(text): [1.0] * DIMS})
+    assert set(cache.get_many([_key("a"), _key("b"), _key("c")])) == {_key("b"), _key("c")}
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    EmbeddingCache(max_entries=10, path=path).put_many({_key("python"): [0.5, -0.25, 0.125, 1.0]})
+    cache = EmbeddingCache(max_entries=10, path=path)
+    assert cache.persistent
+    assert cache.get_many([_key("python")]) == {_key("python"): [0.5, -0.25, 0.125, 1.0]}
+    assert cache.stats()["disk_hits"] == 1
+    blob = sqlite3.connect(path).execute("SELECT vector FROM embeddings").fetchone()[0]
+    assert len(blob) == 4 * DIMS
@@ -0,0 +1,168 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.ingestion import IngestionService
+
+
+class FakeJobRepository:
+    def __init__(self, newer_job=False, running=False):
+        self.calls = []
+        self.newer_job = newer_job
+        self.running = running
+        self.queued = []
+        self.enqueued = []
+
+    async def has_newer_job(self, job):
+        return self.newer_job() if callable(self.newer_job) else self.newer_job
+
+    async def has_running_job(self, cv_id):
+        return self.running
+
+    async def mark_superseded(self, job):
+        self.calls.append("superseded")
+        job.status = "superseded"
+        return job
+
+    async def supersede_queued(self, cv_id):
+        stale, self.queued = self.queued, []
+        for job in stale:
+            job.status = "superseded"
+        return stale
+
+    async def enqueue(self, **kwargs):
+        job = SimpleNamespace(id=len(self.enqueued) + 10, **kwargs)
+        self.enqueued.append(job)
+        return job
+
+    async def mark_done(self, job):
+        self.calls.append("done")
+        job.status = "done"
+        return job
+
+    async def mark_failed(self, job, error, max_attempts):
+        self.calls.append("failed")
+        job.status = "queued" if job.attempts < max_attempts else "error"
+        job.error = error
+        return job
+
+
+class FakeCVRepository:
+    def __init__(self, cv):
+        self.cv = cv
+
+    async def get_cv_by_id(self, cv_id):
+        return self.cv
+
+    async def get_cv_by_source_id(self, source_id):
+        return self.cv if self.cv.source_id == source_id else None
+
+    async def update_cv(self, cv, data):
+        for key, value in data.items():
+            setattr(cv, key, value)
+        return cv
+
+    async def get_processed_cv_by_content_hash(self, *args, **kwargs):
+        return None
+
+    async def update_cv_status(self, cv_id, status):
+        self.cv.status = status
+        return True
+
+
+class FakePdfService:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    async def upsert_vectors(self, *args, **kwargs):
+        self.calls += 1
+        if self.error:
+            raise self.error
+
+
+def _service(tmp_path, attempts, pdf_service):
+    upload = tmp_path / "cv.pdf"
+    upload.write_bytes(b"%PDF-1.4")
+    cv = SimpleNamespace(id=1, user_id=7, source_id="cv-1", status="processing", content_hash=None)
+    job = SimpleNamespace(id=3, cv_id=1, user_id=7, source_id="cv-1", file_path=str(upload),
+                          original_filename="cv.pdf", attempts=attempts, status="running", error=None)
+    service = IngestionService(SimpleNamespace(commit=lambda: None), pdf_service=pdf_service)
+    service.cv_repository = FakeCVRepository(cv)
+    service.job_repository = FakeJobRepository()
+    return service, job, cv, upload
+
+
+def test_done_job_removes_upload(tmp_path):
+    service, job, cv, upload = _service(tmp_path, 1, FakePdfService())
+    asyncio.run(service.process_job(job))
+    assert (job.status, cv.status) == ("done", "processed")
+    assert not upload.exists()
+
+
+def test_failed_attempt_keeps_upload_for_retry(tmp_path):
+    service, job, cv, upload = _service(tmp_path, 1, FakePdfService(RuntimeError("boom")))
+    asyncio.run(service.process_job(job))
+    assert (job.status, cv.status) == ("queued", "uploaded")
+    assert upload.exists()
+
+
+def test_last_failed_attempt_removes_upload(tmp_path):
+    service, job, cv, upload = _service(tmp_path, settings.INGEST_MAX_ATTEMPTS, FakePdfService(RuntimeError("boom")))
+    asyncio.run(service.process_job(job))
+    assert (job.status, cv.status) == ("error", "error")
+    assert not upload.exists()
+
+
+@pytest.mark.parametrize("lost_attempts", [0, 2])
+def test_reclaimed_job_past_last_attempt_is_failed(tmp_path, lost_attempts):
+    pdf_service = FakePdfService()
+    attempts = settings.INGEST_MAX_ATTEMPTS + 1 + lost_attempts
+    service, job, cv, upload = _service(tmp_path, attempts, pdf_service)
+    asyncio.run(service.process_job(job))
+    assert (job.status, cv.status) == ("error", "error")
+    assert pdf_service.calls == 0
+    assert not upload.exists()
+
+
+def test_upload_to_another_users_source_id_is_refused(tmp_path):
+    service, job, cv, upload = _service(tmp_path, 0, FakePdfService())
+    with pytest.raises(PermissionError):
+        asyncio.run(service.enqueue_cv(user_id=8, pdf_path=str(upload), source_id="cv-1"))
+    assert not hasattr(cv, "file_path")
+    assert service.job_repository.enqueued == []
+
+
+def test_reupload_supersedes_queued_jobs(tmp_path):
+    service, job, cv, upload = _service(tmp_path, 0, FakePdfService())
+    job.status = "queued"
+    service.job_repository.queued = [job]
+    new_upload = tmp_path / "cv-new.pdf"
+    new_upload.write_bytes(b"%PDF-1.4 new")
+
+    new_job = asyncio.run(service.enqueue_cv(user_id=7, pdf_path=str(new_upload), source_id="cv-1"))
+    assert job.status == "superseded"
+    assert not upload.exists()
+    assert (new_job.status, new_job.file_path, cv.file_path) == ("queued", str(new_upload), str(new_upload))
+
+
+def test_job_of_replaced_upload_is_skipped(tmp_path):
+    pdf_service = FakePdfService()
+    service, job, cv, upload = _service(tmp_path, 1, pdf_service)
+    service.job_repository.newer_job = True
+    asyncio.run(service.process_job(job))
+    assert job.status == "superseded"
+    assert pdf_service.calls == 0
+    assert not upload.exists()
+
+
+def test_upload_replaced_while_running_leaves_status_to_newer_job(tmp_path):
+    pdf_service = FakePdfService()
+    service, job, cv, upload = _service(tmp_path, 1, pdf_service)
+    service.job_repository.newer_job = lambda: pdf_service.calls > 0
+    asyncio.run(service.process_job(job))
+    assert (job.status, cv.status) == ("superseded", "processing")
+    assert pdf_service.calls == 1
+    assert not upload.exists()
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services import job_page as job_page_module
+from app.services.job_page import _TreeBuilder, extract_job_posting, fetch_page_html, job_posting_from_page
+from app.services.letter import NO_JOB_POSTING, LetterService
+from tests.fakes import FakeResponses, fake_container
+
+FIXTURES = Path(__file__).parent / "fixtures" / "job_pages"
+WEB_SEARCH = [{"type": "web_search_preview"}]
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def job_site():
+    """Serves tests/fixtures/job_pages on a local port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(FIXTURES)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _download(url):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return await fetch_page_html(client, url, allow_private=True)
+    return asyncio.run(run())
+
+
+def _tree(html):
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def test_json_ld_posting(job_site):
+    posting = extract_job_posting(_download(f"{job_site}/json_ld.html"))
+    assert posting.startswith("Title: Senior Python Developer\nCompany: Acme Data")
+    assert "- 5+ years of commercial Python development\n- FastAPI, SQLAlchemy" in posting
+
+
+def test_readability_skips_boilerplate(job_site):
+    posting = extract_job_posting(_download(f"{job_site}/readability.html"))
+    assert posting.startswith("Backend Engineer\n")
+    assert "- Solid knowledge of PostgreSQL and query optimisation\n" in posting
+    for boilerplate in ("cookies", "Frontend Developer", "About us", "Copyright"):
+        assert boilerplate not in posting
+
+
+def test_javascript_shell_has_no_posting(job_site):
+    assert extract_job_posting(_download(f"{job_site}/spa.html")) is None
+
+
+def test_optional_end_tags_make_siblings():
+    root = _tree("<p>one<p>two<ul><li>a<li>b<ul><li>c</ul><li>d</ul><table><tr><td>1<td>2<tr><td>3</table>")
+    assert [child.tag for child in root.children] == ["p", "p", "ul", "table"]
+    items = root.children[2].children
+    assert [child.tag for child in items] == ["li", "li", "li"]
+    assert items[1].children[1].tag == "ul"
+    rows = root.children[3].children
+    assert [len(row.children) for row in rows] == [2, 1]
+
+
+def test_long_list_without_end_tags():
+    items = "".join(f"<li>Requirement {i}: experience with production systems" for i in range(1500))
+    html = f"<div class='job-description'><h1>Engineer</h1><ul>{items}</ul></div>"
+    assert len(_tree(html).children[0].children[1].children) == 1500
+    posting = extract_job_posting(html, max_chars=10 ** 6)
+    assert posting.count("- Requirement") == 1500
+
+
+def test_deep_nesting():
+    html = "<div>" * 5000 + "Python developer with five years of experience. " * 20 + "</div>" * 5000
+    assert "Python developer" in extract_job_posting(html)
+
+
+def test_fast_path_uses_page_text(job_site):
+    responses = FakeResponses("Requirements: Python")
+    service = LetterService(container=fake_container(responses))
+    posting = extract_job_posting(_download(f"{job_site}/readability.html"))
+    assert asyncio.run(service._parse_job_requirements("https://example.com/job", posting)) == "Requirements: Python"
+    assert len(responses.calls) == 1
+    assert responses.calls[0]["model"] == settings.JOB_EXTRACT_MODEL
+    assert "tools" not in responses.calls[0]
+
+
+def test_javascript_shell_falls_back_to_web_search(job_site):
+    responses = FakeResponses("From web search")
+    service = LetterService(container=fake_container(responses))
+    posting = asyncio.run(job_posting_from_page("https://example.com/job", _download(f"{job_site}/spa.html")))
+    assert posting is None
+    assert asyncio.run(service._parse_job_requirements("https://example.com/job", posting)) == "From web search"
+    assert [call.get("tools") for call in responses.calls] == [WEB_SEARCH]
+
+
+def test_not_a_posting_falls_back_to_web_search(job_site):
+    responses = FakeResponses(NO_JOB_POSTING, "From web search")
+    service = LetterService(container=fake_container(responses))
+    posting = extract_job_posting(_download(f"{job_site}/readability.html"))
+    assert asyncio.run(service._parse_job_requirements("https://example.com/job", posting)) == "From web search"
+    assert [call.get("tools") for call in responses.calls] == [None, WEB_SEARCH]
+
+
+def test_extraction_error_falls_back_to_web_search(job_site, monkeypatch):
+    def broken(html):
+        raise RecursionError("maximum recursion depth exceeded")
+
+    monkeypatch.setattr(settings, "JOB_PAGE_ALLOW_PRIVATE", True)
+    monkeypatch.setattr(settings, "JOB_CACHE_ENABLED", False)
+    monkeypatch.setattr(job_page_module, "extract_job_posting", broken)
+    responses = FakeResponses("From web search")
+
+    async def run():
+        async with httpx.AsyncClient() as client:
+            service = LetterService(container=fake_container(responses, client))
+            return await service._get_job_requirements(f"{job_site}/readability.html")
+
+    assert asyncio.run(run()) == "From web search"
+    assert [call.get("tools") for call in responses.calls] == [WEB_SEARCH]
+
+
+def test_get_job_requirements_end_to_end(job_site, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_PAGE_ALLOW_PRIVATE", True)
+    responses = FakeResponses("Requirements: Python, FastAPI")
+
+    async def run():
+        async with httpx.AsyncClient() as client:
+            service = LetterService(container=fake_container(responses, client))
+            return await service._get_job_requirements(f"{job_site}/json_ld.html")
+
+    assert asyncio.run(run()) == "Requirements: Python, FastAPI"
+    assert "Acme Data" in responses.calls[0]["input"]
@@ -0,0 +1,129 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.job_page import UnsafeURLError, fetch_page_html, is_public_ip, resolve_public_address
+
+PUBLIC_IP = "93.184.215.14"
+HTML = {"content-type": "text/html; charset=utf-8"}
+
+
+@pytest.mark.parametrize("address, public", [
+    (PUBLIC_IP, True),
+    ("2606:4700::1111", True),
+    ("127.0.0.1", False),
+    ("10.1.2.3", False),
+    ("172.16.0.1", False),
+    ("192.168.1.1", False),
+    ("169.254.169.254", False),
+    ("100.64.0.1", False),
+    ("0.0.0.0", False),
+    ("::1", False),
+    ("fe80::1%eth0", False),
+    ("fd00::1", False),
+    ("::ffff:127.0.0.1", False),
+    ("224.0.0.1", False),
+])
+def test_is_public_ip(address, public):
+    assert is_public_ip(address) is public
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1/",
+    "http://localhost:6333/collections",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/",
+    "http://[::ffff:10.0.0.1]/",
+    f"https://{PUBLIC_IP}:8443/",
+    f"http://{PUBLIC_IP}:443/",
+    "ftp://example.com/job",
+    "file:///etc/passwd",
+    "http:///job",
+    "http://example.com:99999/",
+])
+def test_resolve_rejects_unsafe_urls(url):
+    with pytest.raises(UnsafeURLError):
+        asyncio.run(resolve_public_address(url, allow_private=False))
+
+
+def test_resolve_returns_public_address():
+    assert asyncio.run(resolve_public_address(f"https://{PUBLIC_IP}/job", allow_private=False)) == PUBLIC_IP
+
+
+def test_allow_private_lifts_address_and_port_checks():
+    assert asyncio.run(resolve_public_address("http://127.0.0.1:8080/", allow_private=True)) == "127.0.0.1"
+    with pytest.raises(UnsafeURLError):
+        asyncio.run(resolve_public_address("ftp://127.0.0.1/", allow_private=True))
+
+
+def _fetch(handler, url, **kwargs):
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            return await fetch_page_html(client, url, allow_private=False, **kwargs)
+
+    return asyncio.run(run())
+
+
+def test_fetch_connects_to_checked_address_with_original_host():
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, headers=HTML, text="<p>job</p>")
+
+    assert _fetch(handler, f"http://{PUBLIC_IP}/jobs/1?x=1") == "<p>job</p>"
+    assert seen[0].url.host == PUBLIC_IP
+    assert seen[0].url.path == "/jobs/1"
+    assert seen[0].headers["host"] == PUBLIC_IP
+    assert seen[0].extensions["sni_hostname"] == PUBLIC_IP
+
+
+def test_fetch_rechecks_redirect_targets():
+    seen = []
+
+    def handler(request):
+        seen.append(str(request.url))
+        return httpx.Response(302, headers={"location": "http://169.254.169.254/latest/meta-data/"})
+
+    assert _fetch(handler, f"http://{PUBLIC_IP}/job") is None
+    assert seen == [f"http://{PUBLIC_IP}/job"]
+
+
+def test_fetch_follows_safe_relative_redirects():
+    def handler(request):
+        if request.url.path == "/old":
+            return httpx.Response(301, headers={"location": "/new"})
+        return httpx.Response(200, headers=HTML, text="moved")
+
+    assert _fetch(handler, f"http://{PUBLIC_IP}/old") == "moved"
+
+
+def test_fetch_stops_redirect_loops():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(302, headers={"location": "/loop"})
+
+    assert _fetch(handler, f"http://{PUBLIC_IP}/loop") is None
+    assert len(calls) == 6
+
+
+def test_fetch_rejects_non_html_and_errors():
+    assert _fetch(lambda request: httpx.Response(200, headers={"content-type": "application/pdf"}),
+                  f"http://{PUBLIC_IP}/") is None
+    assert _fetch(lambda request: httpx.Response(403, headers=HTML), f"http://{PUBLIC_IP}/") is None
+
+
+def test_fetch_truncates_large_pages():
+    html = _fetch(lambda request: httpx.Response(200, headers=HTML, text="x" * 10_000),
+                  f"http://{PUBLIC_IP}/", max_bytes=100)
+    assert html == "x" * 100
+
+
+def test_fetch_refuses_private_urls_without_connecting():
+    def handler(request):
+        raise AssertionError("must not connect")
+
+    assert _fetch(handler, "http://localhost:6333/collections") is None
@@ -0,0 +1,127 @@
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from app.services import job_page as job_page_module
+from app.services import job_requirements as job_requirements_module
+from app.services.job_requirements import URL_KEY_MAX_LENGTH, JobRequirementsCache, text_hash
+from tests.fakes import CharEncoding, fake_container
+
+PAGE = (Path(__file__).parent / "fixtures" / "job_pages" / "readability.html").read_text()
+DIMS = 8
+
+
+class FakeEmbedder:
+    encoding = CharEncoding()
+
+    def __init__(self, vector):
+        self.vector = vector
+        self.texts = []
+
+    async def embed(self, texts):
+        self.texts.extend(texts)
+        return [list(self.vector) for _ in texts]
+
+
+class FakeRepository:
+    def __init__(self, entries):
+        self.entries = {entry.id: entry for entry in entries}
+        self.saved = []
+
+    async def get_fresh_by_url_key(self, url_key):
+        return None
+
+    async def get_fresh_by_text_hash(self, page_hash):
+        return next((entry for entry in self.entries.values() if entry.text_hash == page_hash), None)
+
+    async def get_fresh_embeddings(self, limit):
+        return [(entry.id, entry.embedding) for entry in self.entries.values()][:limit]
+
+    async def get_by_id(self, entry_id):
+        return self.entries.get(entry_id)
+
+    async def record_hit(self, entry):
+        return entry
+
+    async def save(self, url_key, url, requirements, ttl, page_hash=None, embedding=None):
+        self.saved.append((url_key, requirements, page_hash, embedding))
+
+
+class NoLetters:
+    async def get_recent_job_requirements_by_url(self, url_key, ttl):
+        return None
+
+
+def _unit(*values):
+    vector = np.zeros(DIMS, dtype=np.float32)
+    vector[:len(values)] = values
+    return vector / np.linalg.norm(vector)
+
+
+def _cache(monkeypatch, query, entries):
+    async def fetch(client, url):
+        return PAGE
+
+    monkeypatch.setattr(job_requirements_module, "fetch_page_html", fetch)
+    container = fake_container()
+    container.job_embedder = FakeEmbedder(query)
+    cache = JobRequirementsCache(None, container)
+    cache.repository = FakeRepository(entries)
+    cache.letter_repository = NoLetters()
+    return cache, container.job_embedder
+
+
+def _entry(entry_id, vector, requirements):
+    return SimpleNamespace(id=entry_id, embedding=vector.tobytes(), text_hash=None, requirements=requirements,
+                           url_key=f"https://board-{entry_id}.example/job")
+
+
+def _parse_never(job_url, posting):
+    raise AssertionError("must be served from the cache")
+
+
+def test_near_duplicate_posting_is_reused(monkeypatch):
+    entries = [_entry(1, _unit(0, 1), "Other vacancy"), _entry(2, _unit(1, 0.05), "Backend requirements")]
+    cache, embedder = _cache(monkeypatch, _unit(1, 0), entries)
+    assert asyncio.run(cache.get_or_parse("https://example.com/job", _parse_never)) == "Backend requirements"
+    # The posting is embedded, not the navigation, cookie banner and footer around it
+    assert embedder.texts[0].startswith("Backend Engineer\n")
+    assert "cookies" not in embedder.texts[0] and "Copyright" not in embedder.texts[0]
+    saved_hash, saved_embedding = cache.repository.saved[0][2:]
+    assert saved_hash == text_hash(embedder.texts[0])
+    assert np.array_equal(np.frombuffer(saved_embedding, dtype=np.float32), _unit(1, 0))
+
+
+def test_distinct_posting_is_parsed_from_one_extraction(monkeypatch):
+    entries = [_entry(1, _unit(0, 1), "Other vacancy")]
+    cache, embedder = _cache(monkeypatch, _unit(1, 0), entries)
+    extract = job_page_module.extract_job_posting
+    extracted = []
+
+    def counting_extract(html):
+        extracted.append(html)
+        return extract(html)
+
+    monkeypatch.setattr(job_page_module, "extract_job_posting", counting_extract)
+
+    async def parse(job_url, posting):
+        assert posting == embedder.texts[0]
+        return "Parsed requirements"
+
+    assert asyncio.run(cache.get_or_parse("https://example.com/job", parse)) == "Parsed requirements"
+    assert cache.repository.saved[0][1] == "Parsed requirements"
+    assert extracted == [PAGE]
+
+
+def test_long_url_is_keyed_by_hash(monkeypatch):
+    cache, _ = _cache(monkeypatch, _unit(1, 0), [])
+
+    async def parse(job_url, posting):
+        return "Parsed requirements"
+
+    job_url = "https://example.com/job?q=" + "x" * 5000
+    assert asyncio.run(cache.get_or_parse(job_url, parse)) == "Parsed requirements"
+    url_key = cache.repository.saved[0][0]
+    assert url_key.startswith("sha256:") and len(url_key) <= URL_KEY_MAX_LENGTH
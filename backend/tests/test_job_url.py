@@ -0,0 +1,32 @@
+import pytest
+
+from app.services.job_requirements import URL_KEY_MAX_LENGTH, job_url_key, normalize_job_url, text_hash
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.Example.com/jobs/123/", "https://example.com/jobs/123"),
+    ("http://example.com/jobs/123#apply", "https://example.com/jobs/123"),
+    ("https://example.com", "https://example.com/"),
+    ("https://example.com:443/jobs", "https://example.com/jobs"),
+    ("https://example.com:8080/jobs", "https://example.com:8080/jobs"),
+    ("https://example.com/jobs?utm_source=tg&id=5&gclid=abc", "https://example.com/jobs?id=5"),
+    ("https://example.com/jobs?fbclid=x&utm_campaign=y&yclid=z&trk=feed", "https://example.com/jobs"),
+    ("https://example.com/job?source=board&from=search&ref=42&src=a&referrer=b",
+     "https://example.com/job?from=search&ref=42&referrer=b&source=board&src=a"),
+    ("https://example.com/jobs?b=2&a=1", "https://example.com/jobs?a=1&b=2"),
+    ("  https://example.com/jobs?empty=  ", "https://example.com/jobs?empty="),
+])
+def test_normalize_job_url(url, expected):
+    assert normalize_job_url(url) == expected
+
+
+def test_text_hash_ignores_case_and_whitespace():
+    assert text_hash("Senior  Python\nDeveloper") == text_hash("senior python developer")
+    assert text_hash("a") != text_hash("b")
+
+
+def test_job_url_key_hashes_long_urls():
+    assert job_url_key("https://www.example.com/jobs/123/") == "https://example.com/jobs/123"
+    long_url = "https://example.com/jobs?q=" + "x" * 3000
+    assert job_url_key(long_url) == job_url_key(long_url + "&utm_source=tg")
+    assert job_url_key(long_url).startswith("sha256:") and len(job_url_key(long_url)) <= URL_KEY_MAX_LENGTH
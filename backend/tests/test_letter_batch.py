@@ -0,0 +1,54 @@
+import json
+
+from app.services.letter_batch import batch_request_line, parse_batch_output, response_output_text
+
+
+def _line(custom_id, status_code=200, body=None, error=None):
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {"status_code": status_code, "body": body or {}} if status_code is not None else None,
+        "error": error,
+    })
+
+
+def _body(*texts):
+    return {"output": [
+        {"type": "reasoning"},
+        {"type": "message", "content": [{"type": "output_text", "text": text} for text in texts] + [{"type": "refusal"}]},
+    ]}
+
+
+def test_batch_request_line_targets_responses_endpoint():
+    line = json.loads(batch_request_line("item-1", "gpt-4o", "Привет"))
+    assert line["custom_id"] == "item-1"
+    assert line["url"] == "/v1/responses"
+    assert line["body"]["input"] == "Привет"
+    assert "\\u" not in batch_request_line("item-1", "gpt-4o", "Привет")
+
+
+def test_response_output_text_joins_output_text_parts():
+    assert response_output_text(_body("Hello, ", "world")) == "Hello, world"
+    assert response_output_text({}) == ""
+    assert response_output_text({"output": None}) == ""
+
+
+def test_parse_batch_output_success_and_errors():
+    text = "\n".join([
+        _line("ok", body=_body("Letter")),
+        "",
+        _line("http-error", status_code=500, body={"error": {"message": "Server error"}}),
+        _line("http-no-message", status_code=429),
+        _line("request-error", status_code=None, error={"code": "x", "message": "Invalid request"}),
+        _line("request-error-no-message", status_code=None, error={"code": "x"}),
+        "   ",
+    ])
+    results = parse_batch_output(text)
+    assert results["ok"] == ("Letter", None)
+    assert results["http-error"] == (None, "Server error")
+    assert results["http-no-message"] == (None, "HTTP 429")
+    assert results["request-error"] == (None, "Invalid request")
+    assert results["request-error-no-message"] == (None, "{'code': 'x'}")
+
+
+def test_parse_batch_output_empty():
+    assert parse_batch_output("") == {}
@@ -0,0 +1,143 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import app.services.prompt as prompt_module
+from app.core.config import settings
+from app.schemas.rag import RAGSearchResult
+from app.services import letter as letter_module
+from app.services.letter import LetterService
+from tests.fakes import CharEncoding, fake_container
+
+OUTPUT = json.dumps({
+    "custom_id": "item-0",
+    "response": {"status_code": 200, "body": {"output": [
+        {"type": "message", "content": [{"type": "output_text", "text": "Letter"}]},
+    ]}},
+})
+
+
+class FakeBatches:
+    def __init__(self):
+        self.retrieved = 0
+
+    async def create(self, **kwargs):
+        return SimpleNamespace(id="batch-1", status="validating")
+
+    async def retrieve(self, batch_id):
+        self.retrieved += 1
+        await asyncio.sleep(0)
+        return SimpleNamespace(status="completed", output_file_id="file-out", error_file_id=None)
+
+
+class FakeFiles:
+    def __init__(self):
+        self.uploaded = []
+
+    async def content(self, file_id):
+        await asyncio.sleep(0)
+        return SimpleNamespace(text=OUTPUT)
+
+    async def create(self, file, purpose):
+        self.uploaded.append(file[1].decode("utf-8"))
+        return SimpleNamespace(id="file-in")
+
+
+class FakeBatchRepository:
+    """One shared row: claim_completion succeeds for the first caller only"""
+
+    def __init__(self, batch):
+        self.batch = batch
+
+    async def get_batch_by_id(self, batch_id):
+        return self.batch
+
+    async def claim_completion(self, batch_id, stale_after):
+        if self.batch.status in ("completing", "completed"):
+            return False
+        self.batch.status = "completing"
+        return True
+
+    async def update_batch(self, batch, data):
+        for key, value in data.items():
+            setattr(batch, key, value)
+        return batch
+
+    async def create_batch(self, cv_id, source_id, items, results, openai_batch_id=None, status="validating"):
+        return SimpleNamespace(cv_id=cv_id, source_id=source_id, items=items, results=results,
+                               openai_batch_id=openai_batch_id, status=status)
+
+
+class FakeCVRepository:
+    def __init__(self, owner_id):
+        self.cv = SimpleNamespace(id=1, source_id="7", user_id=owner_id, profile=None)
+
+    async def get_cv_by_id(self, cv_id):
+        return self.cv
+
+    async def get_cv_by_source_id(self, source_id):
+        return self.cv
+
+
+def _service(owner_id=5):
+    container = fake_container()
+    container.openai.batches = FakeBatches()
+    container.openai.files = FakeFiles()
+    service = LetterService(container=container)
+    batch = SimpleNamespace(id=3, cv_id=1, source_id="7", openai_batch_id="batch-1", status="in_progress",
+                            results={}, error=None,
+                            items=[{"index": 0, "custom_id": "item-0", "url": None, "job_requirements": "Python"}])
+    service.letter_batch_repository = FakeBatchRepository(batch)
+    service.cv_repository = FakeCVRepository(owner_id)
+    saved = []
+
+    async def save_letter(*args, **kwargs):
+        saved.append(args)
+
+    service._save_letter = save_letter
+    return service, batch, saved, container.openai.batches
+
+
+def test_poll_of_another_users_batch_is_not_found():
+    service, batch, saved, batches = _service(owner_id=99)
+    assert asyncio.run(service.poll_bulk_batch(3, user_id=5)) is None
+    assert batches.retrieved == 0
+    assert batch.status == "in_progress"
+
+
+def test_overlapping_polls_save_results_once():
+    service, batch, saved, _ = _service()
+
+    async def run():
+        return await asyncio.gather(*(service.poll_bulk_batch(3, user_id=5) for _ in range(3)))
+
+    asyncio.run(run())
+    assert batch.status == "completed"
+    assert batch.results == {"0": {"status": "done", "letter_content": "Letter"}}
+    assert len(saved) == 1
+
+
+def test_failed_item_does_not_fail_batch_submission(monkeypatch):
+    monkeypatch.setattr(prompt_module.tiktoken, "encoding_for_model", lambda model: CharEncoding())
+    monkeypatch.setattr(letter_module, "get_prompt_builder", prompt_module.PromptBuilder)
+    monkeypatch.setattr(settings, "LETTER_CACHE_ENABLED", False)
+    service, _, _, _ = _service()
+
+    async def job_requirements(url):
+        if "broken" in url:
+            raise RuntimeError("connection reset")
+        return "Python developer"
+
+    async def search_resume_data(source_id, job_requirements, user_id):
+        return RAGSearchResult(contexts=["Python, 5 years"], sources=[{"source_id": "7"}], scores=[1.0])
+
+    service._get_job_requirements = job_requirements
+    service._search_resume_data = search_resume_data
+    items = [{"url": "https://example.com/broken"}, {"url": "https://example.com/ok"}]
+    batch = asyncio.run(service.submit_bulk_batch(items, 7, user_id=5))
+
+    assert batch.results["0"]["status"] == "error"
+    assert "connection reset" in batch.results["0"]["error"]
+    assert [item["custom_id"] for item in batch.items] == ["item-1"]
+    assert batch.openai_batch_id == "batch-1"
+    assert len(service.client.files.uploaded[0].splitlines()) == 1
@@ -0,0 +1,58 @@
+import asyncio
+
+from app.services.letter import LetterService
+from tests.fakes import FakeResponses, fake_container
+
+
+def _service(cached):
+    responses = FakeResponses()
+    service = LetterService(container=fake_container(responses))
+    lookups = []
+
+    async def get_job_requirements(job_url):
+        return "Python developer"
+
+    async def profile_context(source_id):
+        return None
+
+    async def letter_cache_key(source_id, job_requirements):
+        return "key", 1
+
+    async def get_cached_letter(cache_key):
+        lookups.append(cache_key)
+        return cached
+
+    async def search_resume_data(*args, **kwargs):
+        raise AssertionError("retrieval must not run on a cache hit")
+
+    service._get_job_requirements = get_job_requirements
+    service._profile_context = profile_context
+    service._letter_cache_key = letter_cache_key
+    service._get_cached_letter = get_cached_letter
+    service._search_resume_data = search_resume_data
+    return service, responses, lookups
+
+
+def test_cache_hit_skips_retrieval_and_generation():
+    service, responses, lookups = _service("Cached letter")
+    assert asyncio.run(service.generate_by_url("https://example.com/job", 7, user_id=5)) == "Cached letter"
+    assert service.last_usage == {"cached": True}
+    assert service.last_letter_id is None
+    assert lookups == [("key", 1)]
+    assert responses.calls == []
+    assert {"requirements", "profile", "cache", "context", "letter"} <= set(service.last_timings)
+
+
+def test_regenerate_skips_cache_stage():
+    service, _, lookups = _service("Cached letter")
+
+    async def generate_letter(job_requirements, source_id, user_id, regenerate, resume_data, job_url):
+        return "Fresh letter", {"cached": False}
+
+    async def search_resume_data(*args, **kwargs):
+        return "context"
+
+    service._search_resume_data = search_resume_data
+    service._generate_letter = generate_letter
+    assert asyncio.run(service.generate_by_url("https://example.com/job", 7, user_id=5, regenerate=True)) == "Fresh letter"
+    assert lookups == []
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.prompt as prompt_module
+from app.core.config import settings
+from app.schemas.rag import RAGSearchResult
+from app.services import letter as letter_module
+from app.services.letter import LetterService, cv_version, letter_cache_key
+from tests.fakes import CharEncoding, FakeResponses, fake_container
+
+RESUME = RAGSearchResult(contexts=["Python, 5 years"], sources=[{"source_id": "7"}], scores=[1.0])
+
+
+@pytest.fixture(autouse=True)
+def char_encoding(monkeypatch):
+    monkeypatch.setattr(prompt_module.tiktoken, "encoding_for_model", lambda model: CharEncoding())
+    monkeypatch.setattr(letter_module, "get_prompt_builder", prompt_module.PromptBuilder)
+    monkeypatch.setattr(settings, "LETTER_CACHE_ENABLED", True)
+
+
+class FakeLetterCache:
+    def __init__(self):
+        self.entries = {}
+
+    async def get_fresh(self, key):
+        return self.entries.get(key)
+
+    async def record_hit(self, entry):
+        return entry
+
+    async def save(self, key, cv_id, model, prompt_version, letter_content, ttl):
+        self.entries[key] = SimpleNamespace(cv_id=cv_id, letter_content=letter_content)
+
+
+class FakeCVRepository:
+    def __init__(self, cv):
+        self.cv = cv
+
+    async def get_cv_by_source_id(self, source_id):
+        return self.cv
+
+
+def _service(cv, *letters):
+    responses = FakeResponses(*letters)
+    service = LetterService(container=fake_container(responses))
+    service.cv_repository = FakeCVRepository(cv)
+    service.letter_cache_repository = FakeLetterCache()
+    service.letter_repository = None
+    return service, responses
+
+
+def _generate(service, requirements="Python developer"):
+    return asyncio.run(service._generate_letter(requirements, 7, user_id=5, resume_data=RESUME))
+
+
+def test_same_cv_and_requirements_hit_the_cache():
+    cv = SimpleNamespace(id=1, content_hash="v1", updated_at=datetime(2026, 1, 1))
+    service, responses = _service(cv, "Letter v1")
+    assert _generate(service)[0] == "Letter v1"
+    # Requirements are compared case- and whitespace-insensitively
+    assert _generate(service, "python   Developer") == ("Letter v1", {"cached": True})
+    assert len(responses.calls) == 1
+
+
+def test_new_cv_version_misses_the_cache():
+    cv = SimpleNamespace(id=1, content_hash="v1", updated_at=datetime(2026, 1, 1))
+    service, responses = _service(cv, "Letter v1", "Letter v2")
+    _generate(service)
+    cv.content_hash = "v2"
+    assert _generate(service)[0] == "Letter v2"
+    assert len(responses.calls) == 2
+
+
+def test_cv_without_content_hash_is_versioned_by_update_time():
+    cv = SimpleNamespace(id=1, content_hash=None, updated_at=datetime(2026, 1, 1))
+    first = cv_version(cv)
+    cv.updated_at = datetime(2026, 1, 2)
+    assert cv_version(cv) != first
+    assert letter_cache_key(first, "Python") != letter_cache_key(cv_version(cv), "Python")
+
+
+def test_regenerate_skips_the_cache():
+    cv = SimpleNamespace(id=1, content_hash="v1", updated_at=datetime(2026, 1, 1))
+    service, responses = _service(cv, "Letter v1", "Letter v1b")
+    _generate(service)
+    letter, _ = asyncio.run(service._generate_letter("Python developer", 7, user_id=5, regenerate=True,
+                                                     resume_data=RESUME))
+    assert letter == "Letter v1b"
+    assert _generate(service)[0] == "Letter v1b"
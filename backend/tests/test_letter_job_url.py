@@ -0,0 +1,25 @@
+import asyncio
+
+import pytest
+
+from app.services.letter import LetterService
+from tests.fakes import FakeResponses, fake_container
+
+
+class NoHttp:
+    async def send(self, *args, **kwargs):
+        raise AssertionError("must not fetch")
+
+
+@pytest.mark.parametrize("url", [
+    "http://169.254.169.254/latest/meta-data/",
+    "http://localhost:6333/collections",
+    "http://10.0.0.5/admin",
+    "https://example.com:8443/job",
+])
+def test_unsafe_job_urls_are_rejected_before_fetch_and_web_search(url):
+    responses = FakeResponses()
+    service = LetterService(container=fake_container(responses, NoHttp()))
+    requirements = asyncio.run(service._get_job_requirements(url))
+    assert requirements.startswith("Ошибка")
+    assert responses.calls == []
@@ -0,0 +1,64 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.prompt as prompt_module
+from app.api.v1.endpoints.letter import _event_stream
+from app.schemas.rag import RAGSearchResult
+from app.services import letter as letter_module
+from app.services.letter import LetterService
+from tests.fakes import CharEncoding, FakeResponses, fake_container
+
+RESUME = RAGSearchResult(contexts=["Python, 5 years"], sources=[{"source_id": "7"}], scores=[1.0])
+
+
+@pytest.fixture(autouse=True)
+def char_encoding(monkeypatch):
+    monkeypatch.setattr(prompt_module.tiktoken, "encoding_for_model", lambda model: CharEncoding())
+    monkeypatch.setattr(letter_module, "get_prompt_builder", prompt_module.PromptBuilder)
+
+
+def _collect(events):
+    async def run():
+        return [event async for event in events]
+    return asyncio.run(run())
+
+
+def _events(*events):
+    service = LetterService(container=fake_container(FakeResponses(list(events))))
+    return _collect(service.stream_cover_letter("Python developer", 7, user_id=5, resume_data=RESUME))
+
+
+def test_deltas_then_done():
+    usage = SimpleNamespace(input_tokens=10, output_tokens=2)
+    events = _events(
+        SimpleNamespace(type="response.output_text.delta", delta="Hello, "),
+        SimpleNamespace(type="response.output_text.delta", delta="world"),
+        SimpleNamespace(type="response.completed", response=SimpleNamespace(usage=usage)),
+    )
+    assert [event["event"] for event in events][-3:] == ["delta", "delta", "done"]
+    assert events[-1]["data"]["letter_content"] == "Hello, world"
+
+
+def test_failed_response_reports_its_error_message():
+    failed = SimpleNamespace(type="response.failed",
+                             response=SimpleNamespace(error=SimpleNamespace(message="Rate limit reached")))
+    events = _events(SimpleNamespace(type="response.output_text.delta", delta="Hel"), failed)
+    assert events[-1]["event"] == "error"
+    assert "Rate limit reached" in events[-1]["data"]["message"]
+
+
+def test_event_stream_turns_exceptions_into_error_event():
+    async def events():
+        yield {"event": "stage", "data": {"stage": "parsing", "status": "started"}}
+        raise RuntimeError("database is gone")
+
+    async def run():
+        response = _event_stream(events())
+        return [chunk async for chunk in response.body_iterator]
+
+    chunks = asyncio.run(run())
+    assert chunks[0].startswith("event: stage\n")
+    assert chunks[-1].startswith("event: error\n")
+    assert "database is gone" in chunks[-1]
@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+from app.services.letter import NO_RESUME_MESSAGE, LetterService
+from tests.fakes import FakeResponses, fake_container
+
+
+class FakeCVRepository:
+    def __init__(self, owner_id):
+        self.cv = SimpleNamespace(id=1, source_id="7", user_id=owner_id, profile=None, content_hash=None)
+
+    async def get_cv_by_source_id(self, source_id):
+        return self.cv
+
+
+class RecordingStorage:
+    def __init__(self):
+        self.calls = []
+
+    async def search_batch(self, query_vectors, **kwargs):
+        self.calls.append(kwargs)
+        return [[] for _ in query_vectors]
+
+
+def _service(owner_id=None):
+    responses = FakeResponses()
+    container = fake_container(responses)
+    container.storage = RecordingStorage()
+    service = LetterService(container=container)
+    if owner_id is not None:
+        service.cv_repository = FakeCVRepository(owner_id)
+
+    async def embed_texts(texts):
+        return [[1.0, 0.0] for _ in texts]
+
+    service.pdf_service = SimpleNamespace(embed_texts=embed_texts)
+    return service, responses, container.storage
+
+
+def test_letter_for_another_users_cv_is_refused():
+    service, responses, storage = _service(owner_id=99)
+    assert asyncio.run(service.generate_cover_letter("Python developer", 7, user_id=5)) == NO_RESUME_MESSAGE
+    assert storage.calls == []
+    assert responses.calls == []
+
+
+def test_stream_for_another_users_cv_is_refused():
+    service, responses, storage = _service(owner_id=99)
+
+    async def run():
+        return [event async for event in service.stream_cover_letter("Python developer", 7, user_id=5)]
+
+    assert asyncio.run(run()) == [{"event": "error", "data": {"message": NO_RESUME_MESSAGE}}]
+    assert storage.calls == []
+
+
+def test_retrieval_is_scoped_to_requesting_user():
+    service, _, storage = _service(owner_id=5)
+    asyncio.run(service._search_resume_data(7, "Python\nFastAPI", user_id=5))
+    assert storage.calls and all(call["user_id"] == 5 and call["source_id"] == 7 for call in storage.calls)
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from app.storage.repository import numpy_storage as numpy_module
+from app.storage.repository.numpy_storage import NumpyStorage
+
+
+def _storage(tmp_path, **kwargs):
+    return NumpyStorage(path=str(tmp_path), collection_name="cvs", dim=3, **kwargs)
+
+
+def _point(point_id, vector, source_id, user_id):
+    return point_id, vector, {"source_id": source_id, "user_id": user_id, "text": f"chunk {point_id}"}
+
+
+async def _upsert(storage, *points):
+    ids, vectors, payloads = zip(*points)
+    await storage.upsert(list(ids), list(vectors), list(payloads))
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = _storage(tmp_path)
+    asyncio.run(_upsert(
+        storage,
+        _point("a", [1.0, 0.0, 0.0], "cv-1", 1),
+        _point("b", [0.9, 0.1, 0.0], "cv-1", 1),
+        _point("c", [1.0, 0.0, 0.1], "cv-2", 2),
+        _point("d", [0.0, 1.0, 0.0], "cv-2", 2),
+    ))
+    return storage
+
+
+def test_filtered_search(storage):
+    found = asyncio.run(storage.search([1.0, 0.0, 0.0], top_k=2, user_id=2))
+    assert found["contexts"] == ["chunk c", "chunk d"]
+    assert {source["source_id"] for source in found["sources"]} == {"cv-2"}
+
+    hits = asyncio.run(storage.search_batch([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]], top_k=1, source_id="cv-1"))
+    assert [[hit.id for hit in query_hits] for query_hits in hits] == [["a"], ["b"]]
+
+
+def test_upsert_overwrites_point(storage):
+    asyncio.run(_upsert(storage, _point("a", [0.0, 0.0, 1.0], "cv-1", 1)))
+    found = asyncio.run(storage.search([0.0, 0.0, 1.0], top_k=1, source_id="cv-1"))
+    assert found["contexts"] == ["chunk a"]
+    assert asyncio.run(storage.get_point_ids_by_source_id("cv-1")) == {"a", "b"}
+
+
+def test_delete_is_scoped_by_user(storage):
+    asyncio.run(storage.delete_points(["a", "c"], user_id=1))
+    asyncio.run(storage.delete_by_source_id("cv-2", user_id=1))
+    assert asyncio.run(storage.get_point_ids_by_source_id("cv-1")) == {"b"}
+    assert asyncio.run(storage.get_point_ids_by_source_id("cv-2")) == {"c", "d"}
+
+    asyncio.run(storage.delete_by_source_id("cv-2", user_id=2))
+    assert asyncio.run(storage.get_point_ids_by_source_id("cv-2")) == set()
+
+
+def test_scroll_returns_vectors_and_payloads(storage):
+    points = asyncio.run(storage.get_points_by_source_id("cv-2", user_id=2))
+    by_id = {point.id: point for point in points}
+    assert set(by_id) == {"c", "d"}
+    assert by_id["d"].vector == pytest.approx([0.0, 1.0, 0.0])
+    assert by_id["d"].payload["text"] == "chunk d"
+
+
+def test_reopened_storage_keeps_points(storage, tmp_path):
+    reopened = _storage(tmp_path)
+    assert asyncio.run(reopened.get_point_ids_by_source_id("cv-1", user_id=1)) == {"a", "b"}
+
+
+def test_storage_grows_past_initial_capacity(tmp_path, monkeypatch):
+    monkeypatch.setattr(numpy_module, "INITIAL_CAPACITY", 4)
+    storage = _storage(tmp_path)
+    asyncio.run(_upsert(storage, *[_point(f"p{i}", [1.0, float(i), 0.0], "cv-1", 1) for i in range(10)]))
+    assert len(asyncio.run(storage.get_point_ids_by_source_id("cv-1"))) == 10
+    assert asyncio.run(storage.search([1.0, 9.0, 0.0], top_k=1))["contexts"] == ["chunk p9"]
+
+
+def test_two_processes_share_a_directory(tmp_path, monkeypatch):
+    """API and worker instances on one directory see each other's writes and never reuse a row"""
+    monkeypatch.setattr(numpy_module, "INITIAL_CAPACITY", 2)
+    api = _storage(tmp_path)
+    worker = _storage(tmp_path)
+
+    asyncio.run(_upsert(worker, _point("a", [1.0, 0.0, 0.0], "cv-1", 1)))
+    assert asyncio.run(api.search_batch([[1.0, 0.0, 0.0]], top_k=1))[0][0].id == "a"
+
+    asyncio.run(_upsert(api, _point("b", [0.0, 1.0, 0.0], "cv-1", 1)))
+    asyncio.run(_upsert(worker, _point("c", [0.0, 0.0, 1.0], "cv-1", 1)))
+    for storage in (api, worker):
+        assert asyncio.run(storage.get_point_ids_by_source_id("cv-1")) == {"a", "b", "c"}
+    rows = api._db.execute("SELECT id, row FROM points ORDER BY id").fetchall()
+    assert len({row for _, row in rows}) == 3
+    assert asyncio.run(api.search([0.0, 0.0, 1.0], top_k=1))["contexts"] == ["chunk c"]
+
+    asyncio.run(worker.delete_points(["a"]))
+    assert asyncio.run(api.get_point_ids_by_source_id("cv-1")) == {"b", "c"}
+
+
+def test_ivf_search_finds_nearest(tmp_path, monkeypatch):
+    monkeypatch.setattr(numpy_module, "IVF_MIN_ROWS", 1)
+    storage = _storage(tmp_path, index="ivf", ivf_lists=2, ivf_probes=1)
+    asyncio.run(_upsert(
+        storage,
+        _point("x1", [1.0, 0.0, 0.0], "cv-1", 1),
+        _point("x2", [0.9, 0.1, 0.0], "cv-1", 1),
+        _point("y1", [0.0, 1.0, 0.0], "cv-1", 1),
+        _point("y2", [0.0, 0.9, 0.1], "cv-1", 1),
+    ))
+    assert asyncio.run(storage.search([0.0, 1.0, 0.0], top_k=1))["contexts"] == ["chunk y1"]
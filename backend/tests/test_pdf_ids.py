@@ -0,0 +1,22 @@
+import uuid
+
+from app.services.pdf import chunk_hash, chunk_point_id
+
+
+def test_chunk_hash_is_sha256_of_utf8_text():
+    assert chunk_hash("") == "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+    assert chunk_hash("опыт") == chunk_hash("опыт")
+    assert chunk_hash("опыт") != chunk_hash("Опыт")
+
+
+def test_chunk_point_id_is_deterministic_uuid():
+    point_id = chunk_point_id("cv-1", 0, chunk_hash("text"))
+    assert point_id == chunk_point_id("cv-1", 0, chunk_hash("text"))
+    assert uuid.UUID(point_id).version == 5
+
+
+def test_chunk_point_id_depends_on_every_part():
+    base = chunk_point_id("cv-1", 0, "h")
+    assert base != chunk_point_id("cv-2", 0, "h")
+    assert base != chunk_point_id("cv-1", 1, "h")
+    assert base != chunk_point_id("cv-1", 0, "g")
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import pdf_parsing
+from app.services.pdf_parsing import PdfParser
+
+
+def _hang(path):
+    time.sleep(60)
+
+
+@pytest.fixture
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_PARSE_WORKERS", 1)
+    pdf_parsing.shutdown_process_pool()
+    yield
+    pdf_parsing.shutdown_process_pool()
+
+
+def test_timeout_kills_pool_workers(fresh_pool, monkeypatch):
+    monkeypatch.setattr(pdf_parsing, "count_pages", _hang)
+    pool = pdf_parsing.get_process_pool()
+    workers = []
+    recycle = pdf_parsing.recycle_process_pool
+
+    def spy(stuck_pool):
+        workers.extend(stuck_pool._processes.values())
+        recycle(stuck_pool)
+
+    monkeypatch.setattr(pdf_parsing, "recycle_process_pool", spy)
+    with pytest.raises(TimeoutError):
+        asyncio.run(PdfParser(mode="process", timeout=1).load_and_chunk("cv.pdf"))
+
+    assert workers
+    for process in workers:
+        process.join(timeout=5)
+        assert not process.is_alive()
+    assert pdf_parsing._process_pool is None
+    assert pdf_parsing.get_process_pool() is not pool
+
+
+def test_new_pool_after_timeout_parses(fresh_pool, monkeypatch):
+    monkeypatch.setattr(pdf_parsing, "count_pages", _hang)
+    with pytest.raises(TimeoutError):
+        asyncio.run(PdfParser(mode="process", timeout=1).load_and_chunk("cv.pdf"))
+
+    monkeypatch.setattr(pdf_parsing, "count_pages", len)
+    monkeypatch.setattr(pdf_parsing, "parse_and_chunk_pages", _pages)
+    parser = PdfParser(mode="process", timeout=10)
+    assert asyncio.run(parser.load_and_chunk("ab")) == ["page 0", "page 1"]
+
+
+def _pages(path, pages, chunk_size, chunk_overlap):
+    return [[f"page {page}"] for page in pages]
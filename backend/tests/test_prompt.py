@@ -0,0 +1,76 @@
+import pytest
+
+import app.services.prompt as prompt_module
+from app.services.prompt import LETTER_PROMPT, TRIMMED_MARK, PromptBuilder
+from tests.fakes import CharEncoding
+
+
+@pytest.fixture(autouse=True)
+def char_encoding(monkeypatch):
+    monkeypatch.setattr(prompt_module.tiktoken, "encoding_for_model", lambda model: CharEncoding())
+
+
+def _builder(max_input_tokens, max_requirements_tokens=1000):
+    return PromptBuilder("gpt-4o", max_input_tokens=max_input_tokens, max_requirements_tokens=max_requirements_tokens)
+
+
+def test_unknown_model_falls_back_to_o200k(monkeypatch):
+    def unknown(model):
+        raise KeyError(model)
+
+    monkeypatch.setattr(prompt_module.tiktoken, "encoding_for_model", unknown)
+    monkeypatch.setattr(prompt_module.tiktoken, "get_encoding", lambda name: CharEncoding())
+    assert isinstance(PromptBuilder("future-model").encoding, CharEncoding)
+
+
+def test_all_chunks_fit():
+    builder = _builder(10_000)
+    packed = builder.build("Python developer", ["first chunk", "second chunk"])
+    assert packed.chunks_used == 2
+    assert packed.chunks_dropped == 0
+    assert not packed.requirements_trimmed
+    assert "- first chunk\n\n- second chunk" in packed.prompt
+    assert packed.input_tokens == len(packed.prompt)
+
+
+def test_chunks_are_packed_by_score():
+    builder = _builder(10_000)
+    packed = builder.build("req", ["low", "high"], scores=[0.1, 0.9])
+    assert packed.prompt.index("- high") < packed.prompt.index("- low")
+
+
+def test_chunk_that_does_not_fit_is_skipped_for_smaller_ones():
+    builder = _builder(0)
+    budget = 60
+    builder.max_input_tokens = builder.template_tokens + len("req") + budget
+    packed = builder.build("req", ["x" * 100, "small", "y" * 40], scores=[0.9, 0.5, 0.4])
+    assert "x" * 100 not in packed.prompt
+    assert "- small" in packed.prompt
+    assert "y" * 40 in packed.prompt
+    assert packed.chunks_used == 2
+    assert packed.chunks_dropped == 1
+    assert packed.context_tokens <= budget
+
+
+def test_no_room_for_chunks():
+    builder = _builder(0)
+    packed = builder.build("req", ["chunk"])
+    assert packed.chunks_used == 0
+    assert packed.chunks_dropped == 1
+    assert packed.prompt == LETTER_PROMPT.format(job_requirements="req", resume_context="")
+
+
+def test_long_requirements_are_trimmed_at_line_boundary():
+    builder = _builder(10_000, max_requirements_tokens=50)
+    requirements = "\n".join(f"line {i} of the requirements" for i in range(10))
+    packed = builder.build(requirements, [])
+    assert packed.requirements_trimmed
+    assert packed.requirements_tokens <= 50
+    trimmed = packed.prompt[packed.prompt.index("line 0"):packed.prompt.index(TRIMMED_MARK)]
+    assert trimmed.splitlines()[-1].endswith("requirements")
+
+
+def test_usage_excludes_prompt():
+    usage = _builder(10_000).build("req", ["a"]).usage()
+    assert "prompt" not in usage
+    assert usage["chunks_used"] == 1
@@ -0,0 +1,104 @@
+import asyncio
+import warnings
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Distance, PointStruct, ScalarQuantization, VectorParams
+
+from app.storage.repository import qdrant as qdrant_module
+from app.storage.repository.qdrant import TENANT_FIELD, QdrantStorage
+
+
+@pytest.fixture
+def local_client(monkeypatch):
+    """QdrantStorage on an in-memory Qdrant instead of a server"""
+    client = AsyncQdrantClient(location=":memory:")
+    monkeypatch.setattr(qdrant_module, "get_qdrant_client", lambda url, prefer_grpc: client)
+    return client
+
+
+def _storage(url, **kwargs):
+    return QdrantStorage(url=url, collection_name="cvs", dim=4, tenancy=True, **kwargs)
+
+
+async def _legacy_collection(client, points):
+    await client.create_collection("cvs", vectors_config=VectorParams(size=4, distance=Distance.COSINE))
+    if points:
+        await client.upsert("cvs", points=points)
+
+
+def test_tenancy_backfills_legacy_points(local_client):
+    async def run():
+        points = [
+            PointStruct(id=i, vector=[1.0, float(i), 0.0, 1.0], payload={"user_id": i % 2 + 1, "source_id": "7", "text": f"chunk {i}"})
+            for i in range(1200)
+        ]
+        points.append(PointStruct(id=5000, vector=[1.0, 1.0, 1.0, 1.0], payload={"text": "no owner"}))
+        client = local_client
+        await _legacy_collection(client, points)
+        storage = _storage("http://tenancy-backfill")
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # local Qdrant has no payload indexes
+            await storage.setup()
+        records, _ = await client.scroll("cvs", limit=2000, with_payload=True)
+        found = await storage.search([1.0, 2.0, 0.0, 1.0], top_k=3, user_id=1)
+        return records, found
+
+    records, found = asyncio.run(run())
+    tenants = {record.id: (record.payload or {}).get(TENANT_FIELD) for record in records}
+    assert tenants[0] == "1" and tenants[1] == "2"
+    assert tenants[5000] is None
+    assert sum(tenant is not None for tenant in tenants.values()) == 1200
+    assert len(found["contexts"]) == 3
+    assert {source["user_id"] for source in found["sources"]} == {1}
+
+
+def test_tenancy_refuses_shard_groups_on_unsharded_collection(local_client):
+    async def run():
+        await _legacy_collection(local_client, [])
+        await _storage("http://tenancy-shards", tenant_shard_groups=4).setup()
+
+    with pytest.raises(RuntimeError, match="custom sharding"):
+        asyncio.run(run())
+
+
+def _record_updates(client, monkeypatch):
+    updates = []
+
+    async def update_collection(collection_name, **changes):
+        updates.append(changes)
+        return True
+
+    monkeypatch.setattr(client, "update_collection", update_collection)
+    return updates
+
+
+def test_existing_collection_is_updated_to_profile(local_client, monkeypatch):
+    updates = _record_updates(local_client, monkeypatch)
+
+    async def run():
+        await _legacy_collection(local_client, [])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            await _storage("http://profile-sync", profile="scalar", on_disk=None).setup()
+
+    asyncio.run(run())
+    assert len(updates) == 1
+    changes = updates[0]
+    assert isinstance(changes["quantization_config"], ScalarQuantization)
+    assert changes["vectors_config"][""].on_disk is True
+    assert (changes["hnsw_config"].m, changes["hnsw_config"].payload_m) == (0, 16)
+
+
+def test_matching_collection_is_left_alone(local_client, monkeypatch):
+    updates = _record_updates(local_client, monkeypatch)
+
+    async def run():
+        await _legacy_collection(local_client, [])
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            await QdrantStorage(url="http://profile-match", collection_name="cvs", dim=4, profile="full",
+                                on_disk=None, tenancy=False).setup()
+
+    asyncio.run(run())
+    assert updates == []
@@ -0,0 +1,94 @@
+from app.services.retrieval import merge_hits, mmr, split_requirements
+from app.storage.repository.vector_storage import SearchHit
+
+
+def test_split_requirements_strips_bullets_and_drops_short_fragments():
+    text = """
+    ## Требования
+    - **3+ years** of Python experience
+    * Experience with PostgreSQL and Redis;
+    1. Strong async programming skills. Docker and Kubernetes in production.
+    • ok
+    """
+    assert split_requirements(text) == [
+        "3+ years of Python experience",
+        "Experience with PostgreSQL and Redis",
+        "Strong async programming skills.",
+        "Docker and Kubernetes in production.",
+    ]
+
+
+def test_split_requirements_deduplicates_case_insensitively():
+    text = "- Experience with FastAPI services\n- experience with fastapi services"
+    assert split_requirements(text) == ["Experience with FastAPI services"]
+
+
+def test_split_requirements_limits_statements():
+    text = "\n".join(f"- requirement number {i} here" for i in range(10))
+    assert len(split_requirements(text, max_statements=4)) == 4
+
+
+def test_split_requirements_empty():
+    assert split_requirements("") == []
+
+
+def _hit(point_id, score, vector=None):
+    return SearchHit(id=point_id, score=score, payload={"text": point_id}, vector=vector)
+
+
+def test_merge_hits_keeps_best_score_per_point():
+    merged = merge_hits([
+        [_hit("a", 0.5), _hit("b", 0.9)],
+        [_hit("a", 0.8), _hit("c", 0.1)],
+        [],
+    ])
+    assert [(hit.id, hit.score) for hit in merged] == [("b", 0.9), ("a", 0.8), ("c", 0.1)]
+
+
+def test_merge_hits_empty():
+    assert merge_hits([]) == []
+
+
+def test_mmr_returns_all_hits_when_not_more_than_top_k():
+    hits = [_hit("a", 0.9, [1, 0]), _hit("b", 0.8, [1, 0])]
+    assert mmr(hits, top_k=5) == hits
+
+
+def test_mmr_without_vectors_ranks_by_order():
+    hits = [_hit("a", 0.9), _hit("b", 0.8), _hit("c", 0.7)]
+    assert [hit.id for hit in mmr(hits, top_k=2)] == ["a", "b"]
+
+
+def test_mmr_prefers_diverse_hits():
+    hits = [
+        _hit("a", 0.90, [1.0, 0.0]),
+        _hit("a-copy", 0.89, [1.0, 0.01]),
+        _hit("b", 0.80, [0.0, 1.0]),
+    ]
+    assert [hit.id for hit in mmr(hits, top_k=2, diversity=0.5)] == ["a", "b"]
+
+
+def test_mmr_zero_diversity_is_relevance_order():
+    hits = [
+        _hit("a", 0.90, [1.0, 0.0]),
+        _hit("a-copy", 0.89, [1.0, 0.01]),
+        _hit("b", 0.80, [0.0, 1.0]),
+    ]
+    assert [hit.id for hit in mmr(hits, top_k=2, diversity=0.0)] == ["a", "a-copy"]
+
+
+def test_mmr_handles_zero_vectors():
+    hits = [_hit("a", 0.9, [0.0, 0.0]), _hit("b", 0.8, [0.0, 0.0]), _hit("c", 0.7, [1.0, 0.0])]
+    selected = mmr(hits, top_k=2)
+    assert len(selected) == 2
+    assert selected[0].id == "a"
+
+
+def test_mmr_top_k_one_picks_most_relevant():
+    hits = [_hit("a", 0.5, [1, 0]), _hit("b", 0.9, [0, 1]), _hit("c", 0.1, [1, 1])]
+    assert [hit.id for hit in mmr(hits, top_k=1)] == ["b"]
+
+
+def test_mmr_top_k_zero_selects_nothing():
+    hits = [_hit("a", 0.5, [1, 0]), _hit("b", 0.9, [0, 1])]
+    assert mmr(hits, top_k=0) == []
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.stages import StageGraph
+
+
+def test_independent_stages_run_concurrently():
+    async def sleep(seconds, value):
+        await asyncio.sleep(seconds)
+        return value
+
+    async def combine(a, b):
+        return a + b
+
+    graph = StageGraph()
+    graph.add("a", lambda: sleep(0.2, 1))
+    graph.add("b", lambda: sleep(0.2, 2))
+    graph.add("sum", combine, depends_on=("a", "b"))
+
+    started = time.perf_counter()
+    results = asyncio.run(graph.run())
+    elapsed = time.perf_counter() - started
+
+    assert results == {"a": 1, "b": 2, "sum": 3}
+    assert elapsed < 0.35
+    assert set(graph.timings) == {"a", "b", "sum", "total"}
+    assert graph.timings["sum"] < 0.05
+
+
+def test_unknown_dependency_is_rejected():
+    async def stage():
+        return None
+
+    with pytest.raises(ValueError):
+        StageGraph().add("b", stage, depends_on=("a",))
+
+
+def test_failure_cancels_other_stages():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    async def run():
+        graph = StageGraph()
+        graph.add("slow", slow)
+        graph.add("fail", fail)
+        with pytest.raises(RuntimeError, match="boom"):
+            await graph.run()
+        await asyncio.sleep(0)
+        return graph
+
+    graph = asyncio.run(run())
+    assert cancelled.is_set()
+    assert "total" in graph.timings
+
+
+def test_empty_graph():
+    graph = StageGraph()
+    assert asyncio.run(graph.run()) == {}
+    assert "total" in graph.timings
@@ -1,23 +1,47 @@
+import hashlib
+import os
+import tempfile
 
+from fastapi import HTTPException, UploadFile
 
-from http.client import HTTPException
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+READ_CHUNK_SIZE = 64 * 1024
 
-from fastapi import UploadFile
 
-async def validate_pdf_and_get_path(file: UploadFile) -> dict:
+async def validate_pdf_and_get_path(file: UploadFile, directory: str = None) -> dict:
+    """
+    Stream an uploaded PDF to disk in fixed-size chunks.
+
+    The size limit is enforced while streaming and the sha256 of the content is
+    computed on the fly, so the payload is never held in memory as a whole.
+    The file is written to `directory` (system temp dir by default); the caller owns it.
+    Oversized request bodies are already cut off while they arrive by
+    BodySizeLimitMiddleware, before Starlette spools the multipart body.
+    """
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
-    # Validate file size (max 10MB)
-    file_content = await file.read()
-    if len(file_content) > 10 * 1024 * 1024:
+    # Reject early when the client declared the size
+    if file.size is not None and file.size > MAX_FILE_SIZE:
         raise HTTPException(status_code=400, detail="File size must be less than 10MB")
 
-    # Save file temporarily
-    import tempfile
-    import os
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    digest = hashlib.sha256()
+    file_size = 0
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf', dir=directory) as temp_file:
+        file_path = temp_file.name
+        try:
+            while chunk := await file.read(READ_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise HTTPException(status_code=400, detail="File size must be less than 10MB")
+                digest.update(chunk)
+                temp_file.write(chunk)
+        except BaseException:
+            temp_file.close()
+            os.unlink(file_path)
+            raise
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-        temp_file.write(file_content)
-        temp_file_path = temp_file.name
-    return {"temp_file_path": temp_file_path, "file_content": file_content}
\ No newline at end of file
+    return {"file_path": file_path, "file_size": file_size, "content_hash": digest.hexdigest()}